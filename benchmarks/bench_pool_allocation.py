@@ -0,0 +1,96 @@
+"""
+Pool Allocation Benchmark
+=========================
+N concurrent assign_pool_strategy calls (worker processes x threads, released
+together by a barrier) against a scratch DATA_ROOT, then checks that the
+round-robin stayed fair: every allocation counted once, per-pool started
+counters equal to the records' assigned_pool, pool sizes within 1 of each other.
+
+Usage:
+    python benchmarks/bench_pool_allocation.py [--allocations 50] [--processes 5]
+    STORAGE_BACKEND=sqlite python benchmarks/bench_pool_allocation.py
+"""
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _worker(user_ids, barrier, results):
+    from core import ownership_manager
+
+    latencies = []
+    start_line = threading.Barrier(len(user_ids))
+
+    def allocate(user_id):
+        start_line.wait()
+        start = time.perf_counter()
+        ownership_manager.assign_pool_strategy(user_id)
+        latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=allocate, args=(uid,)) for uid in user_ids]
+    barrier.wait()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--allocations", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before config is imported (also inherited by the workers)
+        os.environ['DATA_ROOT'] = tmp
+        os.environ.pop('SQLITE_DB_PATH', None)
+        from core import ownership_manager
+
+        user_ids = [ownership_manager.init_participant_file({"participant_id": f"bench{i}"})
+                    for i in range(args.allocations)]
+        chunks = [chunk for chunk in (user_ids[i::args.processes] for i in range(args.processes)) if chunk]
+
+        barrier = mp.Barrier(len(chunks) + 1)
+        results = mp.Queue()
+        workers = [mp.Process(target=_worker, args=(chunk, barrier, results)) for chunk in chunks]
+        for w in workers:
+            w.start()
+        barrier.wait()
+        start = time.perf_counter()
+        latencies = []
+        for _ in workers:
+            latencies.extend(results.get())
+        wall = time.perf_counter() - start
+        for w in workers:
+            w.join()
+
+        status = ownership_manager._get_pool_status()
+        assigned = Counter(ownership_manager.load_participant_record(uid)['assigned_pool'] for uid in user_ids)
+        started = {pid: counts['started'] for pid, counts in status.items() if counts['started']}
+        sizes = [started.get(pid, 0) for pid in status]
+
+        print(f"backend         : {os.getenv('STORAGE_BACKEND', 'json')}")
+        print(f"allocations     : {len(latencies)} ({len(workers)} processes)")
+        print(f"wall time       : {wall * 1000:.1f} ms")
+        print(f"latency p50/max : {statistics.median(latencies) * 1000:.1f} / {max(latencies) * 1000:.1f} ms")
+        print(f"per pool        : {dict(sorted(started.items(), key=lambda kv: int(kv[0])))}")
+        ok = (sum(started.values()) == args.allocations
+              and started == dict(assigned)
+              and max(sizes) - min(sizes) <= 1)
+        print(f"consistency     : {'OK' if ok else 'FAILED'}")
+        return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
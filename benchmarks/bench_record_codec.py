@@ -0,0 +1,94 @@
+"""
+Record Codec Benchmark
+======================
+Per-save and per-read cost of a 25-scene participant record for each
+on-disk encoding supported by core/json_codec.py.
+
+    save : encode the whole record + write it to disk
+    read : read the file + decode it (what get_next_scene pays)
+
+Usage:
+    python benchmarks/bench_record_codec.py [--iterations N]
+"""
+import argparse
+import importlib
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import config
+from core import json_codec
+
+
+def make_record(num_scenes=25, objects_per_scene=12):
+    """A completed participant with realistic demographics and slider results."""
+    scenes = [f"batch_{i}" for i in range(num_scenes)]
+    experiments = []
+    for scene in scenes:
+        experiments.append({
+            "scene": scene,
+            "save_timestamp": datetime.now().isoformat(),
+            "duration_ms": random.randint(10_000, 90_000),
+            "results": [
+                {
+                    "object_id": f"obj_{j}",
+                    "agent_left_id": f"agent_{random.randint(0, 5)}",
+                    "agent_right_id": f"agent_{random.randint(0, 5)}",
+                    "slider_value": random.randint(0, 100),
+                }
+                for j in range(objects_per_scene)
+            ],
+        })
+    return {
+        "user_id": "bench_20260101_000000_abcd",
+        "start_time": datetime.now().isoformat(),
+        "demographics": {"participant_id": "P-0001", "age": "25", "gender": "女", "language": "zh"},
+        "assigned_pool": "1",
+        "scene_order": scenes,
+        "completed_scenes": scenes,
+        "experiments": experiments,
+        "is_fully_completed": True,
+    }
+
+
+def bench(record, path, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        path.write_bytes(json_codec.dumps(record))
+    save_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json_codec.load_file(path)
+    read_us = (time.perf_counter() - start) / iterations * 1e6
+    return save_us, read_us, path.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    record = make_record()
+    variants = [("pretty", "json"), ("compact", "json")]
+    if json_codec.orjson is not None:
+        variants.append(("compact", "orjson"))
+    else:
+        print("(orjson not installed, skipping the orjson variant)")
+
+    print(f"{'format':<10}{'codec':<8}{'bytes':>8}{'save us':>10}{'read us':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "record.json"
+        for fmt, codec in variants:
+            config.RECORD_JSON_FORMAT, config.RECORD_JSON_CODEC = fmt, codec
+            importlib.reload(json_codec)
+            save_us, read_us, size = bench(record, path, args.iterations)
+            print(f"{fmt:<10}{codec:<8}{size:>8}{save_us:>10.1f}{read_us:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,37 @@ import secrets
 BASE_DIR = Path(__file__).resolve().parent
 SCENES_ROOT = BASE_DIR / 'question_pool'
 SCENES_ROOT = BASE_DIR / 'question_pool'
+GUIDE_ROOT = BASE_DIR / 'guide_data'
+# 预编译的场景清单 (python manage.py build-manifest 生成)。文件存在时 worker 启动直接加载，
+# 请求路径不再扫描/stat question_pool；场景有增删改后重新生成
+SCENE_MANIFEST_FILE = Path(os.getenv('SCENE_MANIFEST_FILE', BASE_DIR / 'scene_manifest.json'))
+# 热更新: 每个 worker 的后台线程每隔 N 秒 stat 轮询 question_pool (或 manifest 文件)，
+# 增删/替换的场景无需重启即可生效。0 = 关闭
+SCENE_WATCH_INTERVAL_S = float(os.getenv('SCENE_WATCH_INTERVAL_S', '5'))
+
+# ==================== Storage ====================
+# 'json'   : one file per participant under participants_data/records (default)
+# 'sqlite' : single SQLite database in WAL mode (see core/sqlite_backend.py)
+# Migrate existing JSON records with: python manage.py migrate-sqlite
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
+DATA_ROOT = Path(os.getenv('DATA_ROOT', BASE_DIR / 'participants_data'))
+# 参与者记录目录布局: 'flat' (records/<user_id>.json) | 'sharded' (records/ab/cd/<user_id>.json)
+# 切换前先迁移: python manage.py migrate-records-layout sharded
+RECORDS_LAYOUT = os.getenv('RECORDS_LAYOUT', 'flat').lower()
+SQLITE_DB_PATH = Path(os.getenv('SQLITE_DB_PATH', DATA_ROOT / 'ownership.db'))
+# JSON 文件原子写入的组提交窗口 (毫秒)。0 = 每次写入单独 fsync (默认)；
+# >0 = 窗口内的并发写入 (记录替换和 journal 追加) 合并成一批，由一个线程逐个 fsync，
+# 每个目录只 fsync 一次。每次保存多等一个窗口，只在并发高且 fsync 很贵的磁盘上才划算，开启前先实测
+GROUP_COMMIT_WINDOW_MS = float(os.getenv('GROUP_COMMIT_WINDOW_MS', '0'))
+# JSON 数据文件的磁盘编码 (见 core/json_codec.py)。导出 (ZIP 下载) 始终是缩进格式
+RECORD_JSON_FORMAT = os.getenv('RECORD_JSON_FORMAT', 'compact').lower()  # 'compact' | 'pretty'
+RECORD_JSON_CODEC = os.getenv('RECORD_JSON_CODEC', 'json').lower()       # 'json' | 'orjson' (pip install orjson)
+# 保存走 write-behind (仅 JSON 后端): 请求只追加并 fsync 参与者 journal 就返回，
+# 后台线程再合并进主记录 / 更新 summary。SQLite 后端本身就是单事务写入，忽略此项
+SAVE_WRITE_BEHIND = os.getenv('SAVE_WRITE_BEHIND', 'false').lower() == 'true'
+# 参与者记录压缩存储: 'none' (<user_id>.json) | 'gzip' (.json.gz) | 'lzma' (.json.xz)
+# 读取时按后缀自动识别，已有记录保持原格式；统一转换: python manage.py recompress-records
+RECORD_COMPRESSION = os.getenv('RECORD_COMPRESSION', 'none').lower()
 
 # ==================== Server ====================
 SERVER_HOST = '0.0.0.0'
@@ -35,6 +66,12 @@ if SECRET_KEY is None:
 
 # ==================== Scene Processing ====================
 SCENE_DATA_FILENAME = "scene_data.json"
+# 每个 worker 解析后的 scene_data.json 的 LRU 缓存上限 (MB, 按解析后对象的内存估算)
+SCENE_DATA_CACHE_MB = float(os.getenv('SCENE_DATA_CACHE_MB', '64'))
+# process_scene_data 结果的投影缓存: 每个 worker 内存中的条目数 + 所有 worker 共享的磁盘目录
+# (PROJECTION_CACHE_DIR 设为空字符串则只用内存)
+PROJECTION_CACHE_ENTRIES = int(os.getenv('PROJECTION_CACHE_ENTRIES', '512'))
+PROJECTION_CACHE_DIR = os.getenv('PROJECTION_CACHE_DIR', str(BASE_DIR / 'projection_cache'))
 IMAGE_WIDTH = 4096
 IMAGE_HEIGHT = 4096
 FOV = 90.0
@@ -182,15 +219,8 @@ def scan_scenes(base_path):
 
 def get_scenes_in_pool(pool_id):
     """
-    专门获取某个 Pool (如 '1', '2') 下的所有场景名称
+    专门获取某个 Pool (如 '1', '2') 下的所有场景名称 (来自 core/scene_catalog.py 的索引)
     """
-    pool_path = SCENES_ROOT / str(pool_id)
-    if not pool_path.exists():
-        return []
-    
-    scene_names = []
-    for item in sorted(pool_path.iterdir()):
-        if item.is_dir() and (item / SCENE_DATA_FILENAME).exists():
-            scene_names.append(item.name)
-    return scene_names
+    from core.scene_catalog import get_scene_catalog
+    return get_scene_catalog().scenes_in_pool(pool_id)
 
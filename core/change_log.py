@@ -0,0 +1,82 @@
+"""
+Change Log
+==========
+Append-only log of participant changes for incremental exports.
+
+Every state-changing call in ownership_manager appends (user_id, action),
+and the log's sequence number is the export cursor: an export "since N"
+contains exactly the participants with a change whose seq is greater
+than N. Exports may also start from an ISO timestamp.
+
+The first time the log is opened every existing participant is logged as
+'seed', so cursor 0 means "everything".
+"""
+from datetime import datetime
+
+from core.sqlite_backend import SQLiteStore
+
+
+CHANGE_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id    TEXT NOT NULL,
+    action     TEXT NOT NULL,
+    changed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_changes_time ON changes(changed_at);
+
+CREATE TABLE IF NOT EXISTS change_log_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ChangeLog(SQLiteStore):
+    """Participant change log shared by all workers."""
+
+    schema = CHANGE_LOG_SCHEMA
+
+    def is_built(self):
+        row = self._conn().execute("SELECT value FROM change_log_meta WHERE key = 'built'").fetchone()
+        return row is not None
+
+    def seed(self, user_ids):
+        """Log every existing participant once. Returns the count."""
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM change_log_meta WHERE key = 'built'").fetchone():
+                return 0
+            rows = [(user_id, 'seed', now) for user_id in user_ids]
+            conn.executemany("INSERT INTO changes (user_id, action, changed_at) VALUES (?, ?, ?)", rows)
+            conn.execute("INSERT INTO change_log_meta (key, value) VALUES ('built', '1')")
+            return len(rows)
+
+    def record(self, user_id, action):
+        self._conn().execute(
+            "INSERT INTO changes (user_id, action, changed_at) VALUES (?, ?, ?)",
+            (user_id, action, datetime.now().isoformat()))
+
+    def cursor(self):
+        """Current head of the log (0 if empty)."""
+        row = self._conn().execute("SELECT MAX(seq) FROM changes").fetchone()
+        return row[0] or 0
+
+    def seq_at(self, timestamp):
+        """Cursor just before the first change at or after an ISO timestamp."""
+        row = self._conn().execute(
+            "SELECT MIN(seq) FROM changes WHERE changed_at >= ?", (timestamp,)).fetchone()
+        return row[0] - 1 if row[0] is not None else self.cursor()
+
+    def changes_between(self, after, upto):
+        """
+        Latest action per participant with after < seq <= upto.
+
+        Returns:
+            dict: {user_id: action}
+        """
+        rows = self._conn().execute(
+            """SELECT user_id, action FROM changes
+               WHERE seq IN (SELECT MAX(seq) FROM changes WHERE seq > ? AND seq <= ? GROUP BY user_id)""",
+            (after, upto))
+        return {row['user_id']: row['action'] for row in rows}
@@ -198,6 +198,14 @@ def process_scene_agents(scene_data, rotation_matrix, intrinsic_matrix, camera_l
     return agents_data, agent_labels
 
 
+def find_camera(scene_data, camera_id):
+    """Camera dict with this id from a scene's 'cameras' list, or None."""
+    for camera in scene_data.get('cameras', []):
+        if camera.get('id') == camera_id:
+            return camera
+    return None
+
+
 def process_scene_data(scene_data, camera_data, use_display_mapping=True, filter_empty_plates=True, lang='en'):
     """
     Complete scene data processing pipeline.
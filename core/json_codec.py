@@ -0,0 +1,91 @@
+"""
+JSON Codec
+==========
+On-disk encoding for participant records and the other JSON data files.
+
+    RECORD_JSON_FORMAT = 'compact'  no whitespace (default)
+                         'pretty'   indent=2, the historical layout
+    RECORD_JSON_CODEC  = 'json'     stdlib (default)
+                         'orjson'   orjson if installed, otherwise stdlib
+
+Every combination reads every file ever written, so settings can be changed
+without migrating data. Pretty-printing for humans belongs to the export
+paths (ZIP download), which use dumps_pretty().
+
+Files named *.gz / *.xz are gzip / lzma compressed on write and decompressed
+on read (participant records when RECORD_COMPRESSION is set).
+"""
+import gzip
+import json
+import lzma
+
+import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_use_orjson = config.RECORD_JSON_CODEC == 'orjson' and orjson is not None
+_pretty = config.RECORD_JSON_FORMAT == 'pretty'
+
+if config.RECORD_JSON_CODEC == 'orjson' and orjson is None:
+    print("[WARNING] RECORD_JSON_CODEC=orjson but orjson is not installed, using the stdlib json module")
+
+# Same separators json.dumps uses with indent, so 'pretty' output is unchanged
+_STDLIB_KWARGS = {"indent": 2, "ensure_ascii": False} if _pretty else {"separators": (',', ':'), "ensure_ascii": False}
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if _pretty else 0)) if orjson is not None else 0
+
+
+def dumps(data):
+    """Encode a data file in the configured format. Returns UTF-8 bytes."""
+    if _use_orjson:
+        return orjson.dumps(data, option=_ORJSON_OPTIONS)
+    return json.dumps(data, **_STDLIB_KWARGS).encode('utf-8')
+
+
+def dumps_line(data):
+    """One compact JSON line (journals / logs), newline included. Returns UTF-8 bytes."""
+    if _use_orjson:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(data, separators=(',', ':'), ensure_ascii=False) + "\n").encode('utf-8')
+
+
+def loads(raw):
+    """Decode bytes or str. Errors are json.JSONDecodeError (orjson's is a subclass)."""
+    if _use_orjson:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# suffix -> (compress, decompress)
+COMPRESSORS = {
+    '.gz': (lambda raw: gzip.compress(raw, compresslevel=6, mtime=0), gzip.decompress),
+    '.xz': (lambda raw: lzma.compress(raw, preset=6), lzma.decompress),
+}
+
+
+def encode_file(file_path, data):
+    """Bytes to store at file_path: dumps(data), compressed if the name ends in .gz / .xz."""
+    raw = dumps(data)
+    codec = COMPRESSORS.get(str(file_path)[-3:])
+    return codec[0](raw) if codec else raw
+
+
+def read_raw(file_path):
+    """Uncompressed JSON bytes of a file."""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    codec = COMPRESSORS.get(str(file_path)[-3:])
+    return codec[1](raw) if codec else raw
+
+
+def load_file(file_path):
+    """Read and decode a whole JSON file (transparently decompressing .gz / .xz)."""
+    return loads(read_raw(file_path))
+
+
+def dumps_pretty(data):
+    """Human-readable export format (indent=2, UTF-8 text)."""
+    return json.dumps(data, indent=2, ensure_ascii=False)
@@ -8,12 +8,21 @@ import json
 import os
 import sys
 import uuid
+import hashlib
+import ipaddress
 import random
 import threading
 import statistics
+import queue
+import atexit
+import tempfile
+import time
+import weakref
 from pathlib import Path
 from datetime import datetime
 from contextlib import contextmanager
+from collections import OrderedDict
+from itertools import chain, islice
 
 
 # Cross-platform file locking
@@ -43,92 +52,297 @@ import sys as _sys
 from pathlib import Path as _Path
 _sys.path.insert(0, str(_Path(__file__).parent.parent))
 import config
-
-DATA_ROOT = Path(__file__).parent.parent / "participants_data"
+from core.sqlite_backend import normalize_participant_id
+from core.summary_index import ParticipantSummaryIndex, participant_status, PARTICIPANT_STATUSES, SORT_COLUMNS
+from core.pool_stats import PoolStatsAccumulator
+from core import json_codec
+from core.change_log import ChangeLog
+from core.scene_catalog import get_scene_catalog
+
+DATA_ROOT = config.DATA_ROOT
 DATA_ROOT.mkdir(exist_ok=True)
 
 # New folder structure: individual participant records go in records/
 PARTICIPANTS_DIR = DATA_ROOT / "records"
 PARTICIPANTS_DIR.mkdir(exist_ok=True)
 
+# Lock files (<path relative to DATA_ROOT>.lock), kept out of records/ so they
+# don't double the number of entries in the record directories
+LOCKS_DIR = DATA_ROOT / "locks"
+
 # Global state files remain in DATA_ROOT
 BLOCKED_FILE = DATA_ROOT / "blocked_users.json"
+# Round-robin index + per-pool counters in one file, updated in one critical section
+POOL_STATE_FILE = DATA_ROOT / "pool_state.json"
+# Legacy split pool state, imported into POOL_STATE_FILE on first use
 GLOBAL_STATE_FILE = DATA_ROOT / "global_pool_state.json"
 POOL_STATUS_FILE = DATA_ROOT / "pool_status.json"
+PAYMENT_LEDGER_FILE = DATA_ROOT / "payment_ledger.jsonl"
+# Legacy full-rewrite payment summary, still read by get_payment_summary()
 PAYMENT_SUMMARY_FILE = DATA_ROOT / "payment_summary.json"
 
+# Participant-ID uniqueness index: one marker file per normalized participant_id
+PARTICIPANT_ID_INDEX_DIR = DATA_ROOT / "participant_ids"
+
+# Materialized admin summary (JSON backend only)
+SUMMARY_DB_FILE = DATA_ROOT / "summary.db"
+
+# Streaming per-pool slider statistics (all backends)
+POOL_STATS_DB_FILE = DATA_ROOT / "pool_stats.db"
+
+# Participant change log for incremental exports (all backends)
+CHANGE_LOG_DB_FILE = DATA_ROOT / "changes.db"
+
 # Use centralized config for target per pool
 TARGET_COMPLETED_PER_POOL = config.TARGET_COMPLETED_PER_POOL
 
+# Optional SQLite backend (STORAGE_BACKEND=sqlite). When set, the public functions
+# below dispatch to it; otherwise the per-participant JSON files are used.
+_backend = None
+if config.STORAGE_BACKEND == 'sqlite':
+    from core.sqlite_backend import SQLiteBackend
+    _backend = SQLiteBackend(config.SQLITE_DB_PATH)
+
 # ==================== Admin/Stats Functions ====================
 
-def get_admin_stats():
+_summary = None
+_summary_lock = threading.Lock()
+
+
+def _summary_index():
+    """Materialized participant summary; built from the records on first use."""
+    global _summary
+    if _summary is None:
+        # 并发的首批请求只让一个线程扫描全部记录
+        with _summary_lock:
+            if _summary is None:
+                index = ParticipantSummaryIndex(SUMMARY_DB_FILE)
+                if not index.is_built():
+                    count = index.rebuild(_iter_participant_records())
+                    print(f"[SUMMARY] Built participant summary ({count} rows)")
+                _summary = index
+    return _summary
+
+
+def _update_summary(action, *args, **kwargs):
+    """Apply an incremental summary update (JSON backend). Never fails the caller."""
+    if _backend is not None:
+        return
+    try:
+        getattr(_summary_index(), action)(*args, **kwargs)
+    except Exception as e:
+        print(f"[SUMMARY] Failed to update participant summary ({action}): {e}")
+
+
+def rebuild_participant_summary():
+    """
+    Recreate the admin summary from the participant records.
+    
+    Returns:
+        int: Number of summary rows
+    """
+    if _backend is not None:
+        return 0
+    return _summary_index().rebuild(_iter_participant_records())
+
+
+# ==================== Change Log ====================
+
+_changes = None
+_changes_lock = threading.Lock()
+
+
+def _change_log():
+    """Participant change log; seeded with every existing participant on first use."""
+    global _changes
+    if _changes is None:
+        with _changes_lock:
+            if _changes is None:
+                log = ChangeLog(CHANGE_LOG_DB_FILE)
+                if not log.is_built():
+                    count = log.seed(get_all_participant_ids())
+                    print(f"[CHANGES] Seeded change log ({count} participants)")
+                _changes = log
+    return _changes
+
+
+def _log_change(user_id, action):
+    """Record that a participant changed (for ?since= exports). Never fails the caller."""
+    try:
+        _change_log().record(user_id, action)
+    except Exception as e:
+        print(f"[CHANGES] Failed to log {action} for {user_id}: {e}")
+
+
+def _parse_since(since):
+    """Export cursor from an integer cursor or an ISO timestamp."""
+    since = str(since).strip()
+    if since.isdigit():
+        return int(since)
+    try:
+        timestamp = datetime.fromisoformat(since)
+    except ValueError:
+        raise ValueError(f"since must be an export cursor or an ISO timestamp, got {since!r}")
+    return _change_log().seq_at(timestamp.isoformat())
+
+
+def export_participants(since=None):
+    """
+    Participant records for a ZIP export, optionally only those changed since a cursor.
+    
+    Args:
+        since: None for everything, an export cursor (int) or an ISO timestamp
+    
+    Returns:
+        (entries, cursor): entries yields (arcname, data) pairs lazily, ending with
+        _export_manifest.json; pass cursor as `since` next time. Compressed
+        records are yielded as their raw .json.gz / .json.xz bytes.
+    
+    Raises:
+        ValueError: If `since` cannot be parsed
+    """
+    log = _change_log()
+    # Read the head first: anything written during the export is exported again next time
+    cursor = log.cursor()
+    if since is None:
+        after, user_ids, deleted = None, get_all_participant_ids(), []
+    else:
+        after = _parse_since(since)
+        changes = log.changes_between(after, cursor)
+        user_ids = sorted(uid for uid, action in changes.items() if action != 'delete')
+        deleted = sorted(uid for uid, action in changes.items() if action == 'delete')
+    
+    def entries():
+        exported = 0
+        for user_id in user_ids:
+            # Compressed records without pending journal entries go out byte-for-byte
+            # (<user_id>.json.gz / .xz, stored uncompressed in the ZIP)
+            stored = _compressed_record_bytes(user_id)
+            if stored is not None:
+                exported += 1
+                yield stored
+                continue
+            # Merged view (record + pending journal), one <user_id>.json per participant
+            record = load_participant_record(user_id)
+            if record is None:
+                deleted.append(user_id)
+                continue
+            exported += 1
+            yield f"{user_id}.json", json_codec.dumps_pretty(record)
+        manifest = {"since": after, "cursor": cursor, "exported": exported, "deleted": deleted,
+                    "generated_at": datetime.now().isoformat()}
+        yield "_export_manifest.json", json_codec.dumps_pretty(manifest)
+    
+    return entries(), cursor
+
+
+def _participant_summary(user_id, pool, completed_count, total_count, is_completed, start_time, demographics):
+    """Build one row of the admin participants table."""
+    return {
+        "user_id": user_id,
+        "pool": pool or "-",
+        "completed": completed_count,
+        "total": total_count,
+        "status": participant_status(pool, is_completed, completed_count),
+        "start_time": (start_time or 'N/A')[:16].replace('T', ' '),
+        "demographics": demographics or {}
+    }
+
+
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 500
+
+
+def get_participants_page(page=1, size=ADMIN_PAGE_SIZE, status=None, pool=None, q=None,
+                          sort='start_time', descending=True):
+    """
+    One page of the admin participants table, filtered and sorted by the summary index
+    (SQLite backend: by SQL). Status / pool filters with the start_time or user_id order
+    read the page straight off an index; the total is a COUNT over the matching index
+    entries, and the q substring search scans the rows.
+    
+    Args:
+        page: 1-based page number
+        size: rows per page (1..ADMIN_MAX_PAGE_SIZE)
+        status: 'Tutorial' | 'Completed' | 'In-Progress' | 'Abandoned'
+        pool: pool id
+        q: substring of the user_id or participant_id
+        sort: 'start_time' (default, newest first) | 'user_id' | 'pool' | 'status'
+    
+    Returns:
+        dict: {"participants", "page", "size", "total", "pages", "filters"}
+    
+    Raises:
+        ValueError: On an unknown status / sort key or an out-of-range page / size
+    """
+    if page < 1 or not 1 <= size <= ADMIN_MAX_PAGE_SIZE:
+        raise ValueError(f"page must be >= 1 and size between 1 and {ADMIN_MAX_PAGE_SIZE}")
+    if status and status not in PARTICIPANT_STATUSES:
+        raise ValueError(f"status must be one of {PARTICIPANT_STATUSES}")
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {tuple(SORT_COLUMNS)}")
+    
+    query = dict(limit=size, offset=(page - 1) * size, status=status or None, pool=pool or None,
+                 q=(q or '').strip() or None, sort=sort, descending=descending)
+    if _backend is not None:
+        rows, total = _backend.participant_summaries(**query)
+    else:
+        rows, total = _summary_index().page(**query)
+    participants = [_participant_summary(
+        row['user_id'], row['assigned_pool'], row['completed_count'], row['total_count'],
+        row['is_fully_completed'], row['start_time'], row['demographics']) for row in rows]
+    return {
+        "participants": participants,
+        "page": page,
+        "size": size,
+        "total": total,
+        "pages": max(1, -(-total // size)),
+        "filters": {"status": query['status'], "pool": query['pool'], "q": query['q'],
+                    "sort": sort, "order": "desc" if descending else "asc"},
+    }
+
+
+def get_admin_stats(**page_args):
     """
     获取管理员仪表板所需的所有统计数据。
-    Returns: (pool_status, participants_summary, config_info)
+    Returns: (pool_status, participants_page, config_info)
+    participants_page 见 get_participants_page (page_args 原样传入，默认第一页)
     """
     # 1. Pool status
     pool_status = _get_pool_status()
-    
-    # 2. Participants summary - now reads from records/ folder
-    participants = []
-    for user_file in sorted(PARTICIPANTS_DIR.glob("*.json"), reverse=True):
-        try:
-            with open(user_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Determine status
-            pool = data.get('assigned_pool')
-            completed_count = len(data.get('completed_scenes', []))
-            total_count = len(data.get('scene_order', []))
-            is_completed = data.get('is_fully_completed', False)
-            
-            if pool is None:
-                status = "Tutorial"
-            elif is_completed:
-                status = "Completed"
-            elif completed_count > 0:
-                status = "In-Progress"
-            else:
-                status = "Abandoned"
-            
-            participants.append({
-                "user_id": data.get('user_id', user_file.stem),
-                "pool": pool or "-",
-                "completed": completed_count,
-                "total": total_count,
-                "status": status,
-                "start_time": data.get('start_time', 'N/A')[:16].replace('T', ' '),
-                "demographics": data.get('demographics', {})
-            })
-        except Exception as e:
-            print(f"Error reading {user_file}: {e}")
-            continue
+
+    # 2. Participants - one page of materialized summary rows
+    participants_page = get_participants_page(**page_args)
     
     # 3. Config info
-    scenes = config.scan_scenes(config.SCENES_ROOT)
+    total_scenes = len(get_scene_catalog())
     available_pools = _detect_available_pools()
     num_pools = len(available_pools)
     config_info = {
         "scenes_root": str(config.SCENES_ROOT),
-        "total_scenes": len(scenes),
+        "total_scenes": total_scenes,
         "num_pools": num_pools,
-        "scenes_per_pool": len(scenes) // num_pools if scenes and num_pools > 0 else 20,
+        "scenes_per_pool": total_scenes // num_pools if total_scenes and num_pools > 0 else 20,
         "target_per_pool": TARGET_COMPLETED_PER_POOL
     }
     
-    return pool_status, participants[:50], config_info  # 最多返回50个最近的用户
+    return pool_status, participants_page, config_info
+
+
+def get_pool_status():
+    """Started / completed counters per pool, without the admin page and config (public API)."""
+    return _get_pool_status()
 
 
 def reset_pool_status():
     """重置所有池子的计数（管理员用）"""
     available_pools = _detect_available_pools()
+    if _backend is not None:
+        return _backend.reset_pool_status(available_pools)
     initial_status = {pid: {"started": 0, "completed": 0} for pid in available_pools}
-    with open(POOL_STATUS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(initial_status, f, indent=2)
     # 同时重置全局索引
-    with open(GLOBAL_STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump({"last_pool_index": -1}, f, indent=2)
+    with _get_file_lock(POOL_STATE_FILE):
+        _write_pool_state_locked({"last_pool_index": -1, "pools": initial_status})
     return initial_status
 
 
@@ -143,25 +357,19 @@ def get_participant_details(user_id):
         Dict with user data including experiments and demographics,
         or None if user not found.
     """
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
-    
-    if not file_path.exists():
-        return None
-    
     try:
-        with safe_file_access(file_path, 'r') as f:
-            if f:
-                data = json.load(f)
-                return {
-                    "user_id": data.get("user_id"),
-                    "start_time": data.get("start_time"),
-                    "assigned_pool": data.get("assigned_pool"),
-                    "demographics": data.get("demographics", {}),
-                    "experiments": data.get("experiments", []),
-                    "completed_scenes": data.get("completed_scenes", []),
-                    "total_scenes": len(data.get("scene_order", [])),
-                    "is_fully_completed": data.get("is_fully_completed", False)
-                }
+        data = load_participant_record(user_id)
+        if data:
+            return {
+                "user_id": data.get("user_id"),
+                "start_time": data.get("start_time"),
+                "assigned_pool": data.get("assigned_pool"),
+                "demographics": data.get("demographics", {}),
+                "experiments": data.get("experiments", []),
+                "completed_scenes": data.get("completed_scenes", []),
+                "total_scenes": len(data.get("scene_order", [])),
+                "is_fully_completed": data.get("is_fully_completed", False)
+            }
     except Exception as e:
         print(f"Error reading participant {user_id}: {e}")
         return None
@@ -169,9 +377,45 @@ def get_participant_details(user_id):
     return None
 
 
+_pool_stats = None
+_pool_stats_lock = threading.Lock()
+
+
+def _pool_stats_store():
+    """Welford accumulators; built from the completed records on first use."""
+    global _pool_stats
+    if _pool_stats is None:
+        with _pool_stats_lock:
+            if _pool_stats is None:
+                store = PoolStatsAccumulator(POOL_STATS_DB_FILE)
+                if not store.is_built():
+                    count = store.rebuild(_iter_participant_records(completed_only=True))
+                    print(f"[POOL STATS] Built pool statistics ({count} completed participants)")
+                _pool_stats = store
+    return _pool_stats
+
+
+def rebuild_pool_aggregate_stats():
+    """
+    Recompute the pool statistics accumulators from the records.
+    
+    Returns:
+        int: Number of completed participants folded in
+    """
+    return _pool_stats_store().rebuild(_iter_participant_records(completed_only=True))
+
+
 def get_pool_aggregate_stats(pool_id):
     """
-    获取特定池子的聚合统计数据。
+    获取特定池子的聚合统计数据 (预计算的 Welford 累加器, 每个对象 O(1))。
+    结构与 compute_pool_aggregate_stats (全量扫描) 相同。
+    """
+    return _pool_stats_store().pool_stats(str(pool_id))
+
+
+def compute_pool_aggregate_stats(pool_id):
+    """
+    全量扫描计算特定池子的聚合统计数据（用于校验累加器）。
     
     Args:
         pool_id: 池子ID字符串 (e.g., "1", "2")
@@ -189,12 +433,9 @@ def get_pool_aggregate_stats(pool_id):
     pool_id = str(pool_id)
     aggregated = {}  # scene_name -> object_id -> list of values
     
-    # Iterate through all participant files in records/ folder
-    for user_file in PARTICIPANTS_DIR.glob("*.json"):
+    # Iterate through all participant records
+    for user_data in _iter_participant_records(pool_id=pool_id, completed_only=True):
         try:
-            with open(user_file, 'r', encoding='utf-8') as f:
-                user_data = json.load(f)
-            
             # Filter by pool
             if user_data.get('assigned_pool') != pool_id:
                 continue
@@ -225,7 +466,7 @@ def get_pool_aggregate_stats(pool_id):
                     aggregated[scene_name][obj_id].append(slider_val)
                     
         except Exception as e:
-            print(f"Error processing {user_file}: {e}")
+            print(f"Error processing {user_data.get('user_id')}: {e}")
             continue
     
     # Calculate mean, std_dev, n for each object
@@ -257,90 +498,175 @@ def get_all_participant_files():
     Returns:
         List of Path objects for all participant JSON files.
     """
-    files = []
-    for user_file in PARTICIPANTS_DIR.glob("*.json"):
-        files.append(user_file)
-    return files
+    return list(_iter_record_files())
+
+
+def get_all_participant_ids():
+    """获取所有参与者的 user_id 列表（用于打包下载，适用于所有存储后端）。"""
+    if _backend is not None:
+        return _backend.all_user_ids()
+    return [_user_id_from_path(user_file) for user_file in get_all_participant_files()]
+
+
+def _iter_participant_records(pool_id=None, completed_only=False):
+    """
+    Yield merged participant records from the active backend.
+    Filters are applied by the SQLite backend in SQL, and in Python for JSON.
+    """
+    if _backend is not None:
+        yield from _backend.iter_records(pool_id=pool_id, completed_only=completed_only)
+        return
+
+    for user_file in _iter_record_files():
+        try:
+            user_data = _read_record(_user_id_from_path(user_file))
+        except Exception as e:
+            print(f"Error reading {user_file}: {e}")
+            continue
+        if user_data is None:
+            continue
+        if pool_id is not None and user_data.get('assigned_pool') != str(pool_id):
+            continue
+        if completed_only and not user_data.get('is_fully_completed', False):
+            continue
+        yield user_data
 
 # ==================== Pool Status Functions ====================
+# 池子列表来自 core/scene_catalog.py (question_pool 目录变化时重建)。
+# _pool_state_cache: pool_state.json 的内容，按文件 inode/mtime/size 校验；
+#                    本进程写入后直接更新，其他进程写入 (os.replace 换 inode) 后重新读取
+
+_pool_state_cache = None  # (stat token, state)
+
+
+def _stat_token(path):
+    """(inode, mtime_ns, size) of a path, or None if it does not exist."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
 
 def _detect_available_pools():
-    """动态检测 question_pool 文件夹中有多少个池子"""
-    pool_ids = []
-    if config.SCENES_ROOT.exists():
-        for item in sorted(config.SCENES_ROOT.iterdir()):
-            if item.is_dir() and item.name.isdigit():
-                pool_ids.append(item.name)
+    """question_pool 文件夹中有哪些池子 (数字命名的目录，来自场景索引)"""
+    pool_ids = list(get_scene_catalog().pool_ids)
     return pool_ids if pool_ids else ["1"]  # 至少返回一个默认池子
 
 
-def _get_pool_status():
-    """读取池子状态，如果不存在则根据实际池子数量初始化"""
-    available_pools = _detect_available_pools()
-    
-    if not POOL_STATUS_FILE.exists():
-        # 根据实际检测到的池子数量初始化
-        initial_status = {pid: {"started": 0, "completed": 0} for pid in available_pools}
-        with safe_file_access(POOL_STATUS_FILE, 'w') as f:
-            json.dump(initial_status, f, indent=2)
-        return initial_status
-    
-    with safe_file_access(POOL_STATUS_FILE, 'r') as f:
-        existing_status = json.load(f)
+def _copy_pool_state(state):
+    return {"last_pool_index": state["last_pool_index"],
+            "pools": {pid: dict(counts) for pid, counts in state["pools"].items()}}
+
+
+def _cached_pool_state():
+    """Copy of the cached pool state if pool_state.json is unchanged since, else None."""
+    cached = _pool_state_cache
+    if cached is None or cached[0] is None or cached[0] != _stat_token(POOL_STATE_FILE):
+        return None
+    return _copy_pool_state(cached[1])
+
+
+def _write_pool_state_locked(state):
+    """Write pool_state.json and remember it (caller holds its lock)."""
+    global _pool_state_cache
+    _write_json_atomic(POOL_STATE_FILE, state)
+    _pool_state_cache = (_stat_token(POOL_STATE_FILE), _copy_pool_state(state))
+
+
+def _load_pool_state_locked(available_pools):
+    """
+    Read pool_state.json (caller holds its lock), importing the legacy
+    pool_status.json + global_pool_state.json pair the first time.
+    Pools that appeared in question_pool are added with zero counters.
+    """
+    global _pool_state_cache
+    state = _cached_pool_state()
+    if state is not None:
+        changed = False
+    elif POOL_STATE_FILE.exists():
+        token = _stat_token(POOL_STATE_FILE)
+        state = json_codec.load_file(POOL_STATE_FILE)
+        _pool_state_cache = (token, _copy_pool_state(state))
+        changed = False
+    else:
+        pools = json_codec.load_file(POOL_STATUS_FILE) if POOL_STATUS_FILE.exists() else {}
+        last_index = -1
+        if GLOBAL_STATE_FILE.exists():
+            last_index = json_codec.load_file(GLOBAL_STATE_FILE).get("last_pool_index", -1)
+        state = {"last_pool_index": last_index, "pools": pools}
+        changed = True
     
     # 确保所有检测到的池子都在状态中
-    updated = False
     for pid in available_pools:
-        if pid not in existing_status:
-            existing_status[pid] = {"started": 0, "completed": 0}
-            updated = True
+        if pid not in state["pools"]:
+            state["pools"][pid] = {"started": 0, "completed": 0}
+            changed = True
     
-    if updated:
-        with safe_file_access(POOL_STATUS_FILE, 'w') as f:
-            json.dump(existing_status, f, indent=2)
+    if changed:
+        _write_pool_state_locked(state)
+    return state
+
+
+@contextmanager
+def _pool_state_transaction():
+    """
+    Hold the pool-state lock, yield {"last_pool_index", "pools"} and write it back.
+    One lock + one read + one write per allocation / counter update.
+    """
+    available_pools = _detect_available_pools()
+    with _get_file_lock(POOL_STATE_FILE):
+        state = _load_pool_state_locked(available_pools)
+        yield state
+        _write_pool_state_locked(state)
+
+
+def _get_pool_status():
+    """读取池子状态，如果不存在则根据实际池子数量初始化"""
+    available_pools = _detect_available_pools()
+    if _backend is not None:
+        return _backend.get_pool_status(available_pools)
     
-    return existing_status
+    # 快速路径: 文件未变化且没有新池子时不加锁、不解析
+    state = _cached_pool_state()
+    if state is not None and all(pid in state["pools"] for pid in available_pools):
+        return state["pools"]
+    
+    with _get_file_lock(POOL_STATE_FILE):
+        return _load_pool_state_locked(available_pools)["pools"]
+
 
 def _update_pool_status(pool_id, action="started"):
     """
     更新池子计数。
     action: "started" (分配时+1) 或 "completed" (全部做完时+1)
     """
-    with safe_file_access(POOL_STATUS_FILE, 'r+') as f:
-        if f is None:
-            print(f"[ERROR] Pool status file not found, initializing...")
-            _get_pool_status()  # This will create the file
-            return
-        data = json.load(f)
+    if _backend is not None:
+        _backend.update_pool_status(pool_id, action)
+        return
+    with _pool_state_transaction() as state:
         pool_key = str(pool_id)
-        
-        if pool_key in data:
-            data[pool_key][action] += 1
-            
-        f.seek(0)
-        json.dump(data, f, indent=2)
-        f.truncate()
+        if pool_key in state["pools"]:
+            state["pools"][pool_key][action] += 1
 
-def assign_pool_strategy(user_id):
+def _choose_pool(status, last_index):
     """
-    [核心逻辑] 严格轮询分配策略：
-    1. 动态检测可用池子数量
-    2. 使用全局计数器严格按顺序分配 (1 -> 2 -> 3 -> ... -> N -> 1)
-    3. 如果某个池子已达到完成上限，跳过它
+    严格轮询选池 (纯函数，不做任何 I/O)。
+    
+    Args:
+        status: {"1": {"started": 5, "completed": 3}, ...}
+        last_index: 上次分配的池子索引
+    
+    Returns:
+        (best_pool, new_index) - new_index 为 None 表示全局计数器不变（兜底分配）
     """
-    # 1. 获取当前状态和可用池子
-    status = _get_pool_status()  # {"1": {"started": 5, "completed": 3}, ...}
     available_pools = sorted(status.keys(), key=int)  # ["1", "2", "3", ...]
     num_pools = len(available_pools)
     
     if num_pools == 0:
         raise Exception("No pools available in question_pool folder!")
     
-    # 2. 获取全局计数器 (上次分配的池子索引)
-    last_index = _get_global_pool_index()
-    
-    # 3. 从上次位置开始，找下一个可用的池子
-    best_pool = None
+    # 从上次位置开始，找下一个可用的池子
     attempts = 0
     
     while attempts < num_pools:
@@ -353,80 +679,99 @@ def assign_pool_strategy(user_id):
         
         if pool_completed < TARGET_COMPLETED_PER_POOL:
             # 这个池子还没满，选中它
-            best_pool = candidate_pool
-            _set_global_pool_index(next_index)  # 更新全局计数器
-            break
+            return candidate_pool, next_index
         else:
             # 这个池子满了，尝试下一个
             last_index = next_index
             attempts += 1
     
     # 如果所有池子都满了，使用完成数最少的那个（兜底逻辑）
-    if best_pool is None:
-        print(f"[WARNING] All pools have reached target ({TARGET_COMPLETED_PER_POOL}). Using least-filled pool.")
-        pools_sorted = sorted(status.items(), key=lambda x: x[1].get("completed", 0))
-        best_pool = pools_sorted[0][0]
-    
-    # 4. 更新该 Pool 的 started 计数
-    _update_pool_status(best_pool, "started")
+    print(f"[WARNING] All pools have reached target ({TARGET_COMPLETED_PER_POOL}). Using least-filled pool.")
+    pools_sorted = sorted(status.items(), key=lambda x: x[1].get("completed", 0))
+    return pools_sorted[0][0], None
+
+
+def assign_pool_strategy(user_id):
+    """
+    [核心逻辑] 严格轮询分配策略：
+    1. 动态检测可用池子数量
+    2. 使用全局计数器严格按顺序分配 (1 -> 2 -> 3 -> ... -> N -> 1)
+    3. 如果某个池子已达到完成上限，跳过它
+    """
+    if _backend is not None:
+        if not _backend.participant_exists(user_id):
+            raise Exception(f"User not found: {user_id}. Please ensure the user has completed login.")
+        # 选池 + started 计数在同一个事务里完成
+        best_pool, status = _backend.allocate_pool(_detect_available_pools(), _choose_pool)
+        all_scenes_in_pool = config.get_scenes_in_pool(best_pool)
+        random.shuffle(all_scenes_in_pool)
+        _backend.update_participant(user_id, assigned_pool=best_pool, scene_order=all_scenes_in_pool)
+        _log_change(user_id, 'assign')
+        pool_completed = status.get(best_pool, {}).get("completed", 0)
+        print(f"[ALLOCATION] User {user_id} assigned to Pool {best_pool} (Completed: {pool_completed}/{TARGET_COMPLETED_PER_POOL})")
+        return best_pool
+    
+    user_file = _record_path(user_id)
+    if not user_file.exists():
+        raise Exception(f"User file not found: {user_file}. Please ensure the user has completed login.")
+    
+    # 1-4. 读状态 + 全局计数器、选池、更新索引和 started 计数：同一把锁、一次读写
+    with _pool_state_transaction() as state:
+        status = state["pools"]  # {"1": {"started": 5, "completed": 3}, ...}
+        best_pool, next_index = _choose_pool(status, state["last_pool_index"])
+        if next_index is not None:
+            state["last_pool_index"] = next_index  # 更新全局计数器
+        status[best_pool]["started"] += 1
     
     # 5. 更新用户的 assigned_pool 字段并写入题目
     all_scenes_in_pool = config.get_scenes_in_pool(best_pool)
     random.shuffle(all_scenes_in_pool)
     
-    user_file = PARTICIPANTS_DIR / f"{user_id}.json"
-    
-    with safe_file_access(user_file, 'r+') as f:
-        if f is None:
+    with _get_file_lock(user_file):
+        if not user_file.exists():
             raise Exception(f"User file not found: {user_file}. Please ensure the user has completed login.")
-        user_data = json.load(f)
+        user_data = json_codec.load_file(user_file)
         user_data['assigned_pool'] = best_pool
         user_data['scene_order'] = all_scenes_in_pool
         # 此时才有了题目，之前是空的
         
-        f.seek(0)
-        json.dump(user_data, f, indent=2, ensure_ascii=False)
-        f.truncate()
+        token_before = _progress_token(user_id)
+        _write_json_atomic(user_file, user_data)
+        _write_through_progress(user_id, token_before, scene_order=all_scenes_in_pool, pool=best_pool)
+    
+    _update_summary('set_fields', user_id, pool=best_pool, total=len(all_scenes_in_pool))
+    _log_change(user_id, 'assign')
     
     pool_completed = status.get(best_pool, {}).get("completed", 0)
     print(f"[ALLOCATION] User {user_id} assigned to Pool {best_pool} (Completed: {pool_completed}/{TARGET_COMPLETED_PER_POOL})")
     return best_pool
 
 
-def _get_global_pool_index():
-    """获取全局池子分配索引（上次分配的是哪个池子）"""
-    if not GLOBAL_STATE_FILE.exists():
-        return -1  # 初始值，第一次分配时 +1 = 0，即从第一个池子开始
-    
-    try:
-        with safe_file_access(GLOBAL_STATE_FILE, 'r') as f:
-            if f:
-                data = json.load(f)
-                return data.get("last_pool_index", -1)
-    except Exception:
-        pass
-    return -1
-
-
-def _set_global_pool_index(index):
-    """更新全局池子分配索引"""
-    with safe_file_access(GLOBAL_STATE_FILE, 'w') as f:
-        json.dump({"last_pool_index": index}, f, indent=2)
-
 def mark_user_completed(user_id):
     """
     当用户做完所有题目时调用。
     更新 pool_status 的 completed 计数。
     """
-    user_file = PARTICIPANTS_DIR / f"{user_id}.json"
+    if _backend is not None:
+        pool_id, newly_marked = _backend.mark_completed(user_id)
+        if newly_marked:
+            _add_to_pool_stats(user_id)
+            _log_change(user_id, 'completed')
+        if pool_id and newly_marked:
+            print(f"[COMPLETION] User {user_id} finished Pool {pool_id}. Stats updated.")
+        return
+    
+    user_file = _record_path(user_id)
     pool_id = None
     already_marked = False
     
-    with safe_file_access(user_file, 'r+') as f:
-        if f is None:
+    with _get_file_lock(user_file):
+        if not user_file.exists():
             print(f"[ERROR] User file not found for mark_user_completed: {user_file}")
             return
-        user_data = json.load(f)
+        # 完赛时把 journal 压缩回主记录
+        journal_entries = _read_journal(user_id)
+        user_data = _apply_journal(json_codec.load_file(user_file), journal_entries)
         pool_id = user_data.get('assigned_pool')
         
         # 防止重复刷新导致重复计数
@@ -434,68 +779,634 @@ def mark_user_completed(user_id):
             already_marked = True
         else:
             user_data['is_fully_completed'] = True
-            f.seek(0)
-            json.dump(user_data, f, indent=2)
-            f.truncate()
+        
+        if journal_entries or not already_marked:
+            token_before = _progress_token(user_id)
+            _write_json_atomic(user_file, user_data)
+            if journal_entries:
+                _journal_path(user_id).unlink()
+            _write_through_progress(user_id, token_before)
             
+    if not already_marked:
+        _update_summary('set_fields', user_id, is_fully_completed=1)
+        _add_to_pool_stats(user_id)
+        _log_change(user_id, 'completed')
+    
     if pool_id and not already_marked:
         _update_pool_status(pool_id, "completed")
         print(f"[COMPLETION] User {user_id} finished Pool {pool_id}. Stats updated.")
 
 
-# Thread lock for additional safety
-_file_locks = {}
+def _add_to_pool_stats(user_id):
+    """Fold a newly completed participant into the pool statistics."""
+    try:
+        record = load_participant_record(user_id)
+        if record:
+            _pool_stats_store().add_record(record)
+    except Exception as e:
+        print(f"[POOL STATS] Failed to add {user_id}: {e}")
+
+
+def _remove_from_pool_stats(record):
+    """Fold a deleted participant back out of the pool statistics."""
+    if not record or not record.get('is_fully_completed'):
+        return
+    try:
+        _pool_stats_store().remove_record(record)
+    except Exception as e:
+        print(f"[POOL STATS] Failed to remove {record.get('user_id')}: {e}")
+
+
+# ==================== Lock Manager ====================
+# 每个被读改写的文件 <path> 对应一把锁: 进程内 RLock + locks/<相对路径>.lock 上的 OS 锁
+# (fcntl / msvcrt)。这样 gunicorn 多 worker 之间也互斥，且同一线程可重入。
+
+_file_locks = weakref.WeakValueDictionary()
 _lock_mutex = threading.Lock()
 
+# Wait-time statistics, keyed by lock kind ("records" or the global file name)
+_lock_stats = {}
+_lock_stats_mutex = threading.Lock()
+
+
+def _acquire_os_lock(f):
+    """Blocking exclusive OS-level lock on an open sidecar file."""
+    while True:
+        try:
+            f.seek(0)
+            _lock_file(f, exclusive=True)
+            return
+        except OSError:
+            if sys.platform != 'win32':
+                raise
+            time.sleep(0.005)  # msvcrt LK_NBLCK fails immediately while another process holds it
+
+
+def _record_lock_wait(key, wait_s):
+    with _lock_stats_mutex:
+        stats = _lock_stats.setdefault(key, {"acquired": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0})
+        wait_ms = wait_s * 1000
+        stats["acquired"] += 1
+        stats["total_wait_ms"] += wait_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+
+
+def get_lock_stats():
+    """Lock wait-time statistics for this process (admin diagnostics)."""
+    with _lock_stats_mutex:
+        return {
+            key: {
+                "acquired": stats["acquired"],
+                "avg_wait_ms": round(stats["total_wait_ms"] / stats["acquired"], 3) if stats["acquired"] else 0.0,
+                "max_wait_ms": round(stats["max_wait_ms"], 3),
+            }
+            for key, stats in _lock_stats.items()
+        }
+
+
+def _lock_path(file_path):
+    """OS lock file of a data file: mirrored under LOCKS_DIR, or '<path>.lock' outside DATA_ROOT."""
+    path = Path(file_path)
+    try:
+        relative = path.relative_to(DATA_ROOT)
+    except ValueError:
+        return Path(f"{path}.lock")
+    return LOCKS_DIR / f"{relative}.lock"
+
+
+class _FileLock:
+    """Reentrant thread lock + cross-process lock on its lock file (see _lock_path)."""
+
+    def __init__(self, file_path):
+        self.file_path = str(file_path)
+        self.lock_path = _lock_path(self.file_path)
+        path = Path(self.file_path)
+        self.stats_key = "records" if PARTICIPANTS_DIR in path.parents else path.name
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def acquire(self):
+        start = time.perf_counter()
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                try:
+                    handle = open(self.lock_path, 'a+')
+                except FileNotFoundError:
+                    # First lock in this (shard) directory
+                    self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+                    handle = open(self.lock_path, 'a+')
+                try:
+                    _acquire_os_lock(handle)
+                except OSError:
+                    # Locking unsupported (e.g. some network filesystems): thread lock only
+                    handle.close()
+                    handle = None
+                self._handle = handle
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            _record_lock_wait(self.stats_key, time.perf_counter() - start)
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._handle is not None:
+            try:
+                _unlock_file(self._handle)
+            except OSError:
+                pass
+            self._handle.close()
+            self._handle = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
 
 def _get_file_lock(file_path):
-    """Get or create a threading lock for a specific file."""
+    """Get or create the (thread + process) lock for a specific file."""
+    file_path = str(file_path)
     with _lock_mutex:
-        if file_path not in _file_locks:
-            _file_locks[file_path] = threading.Lock()
-        return _file_locks[file_path]
+        lock = _file_locks.get(file_path)
+        if lock is None:
+            lock = _FileLock(file_path)
+            _file_locks[file_path] = lock
+        return lock
 
 
 @contextmanager
 def safe_file_access(file_path, mode='r'):
     """
     Context manager for safe concurrent file access.
-    Uses both threading lock and file system lock.
+    Holds the file's lock (thread lock + OS lock on its lock file)
+    for the whole block, so read-modify-write is atomic across workers.
     Works on both Windows and Unix.
     
     Usage:
-        with safe_file_access(path, 'r+') as f:
-            data = json.load(f)
+        with _get_file_lock(path):
+            with safe_file_access(path, 'r') as f:
+                data = json.load(f)
             # modify data
-            f.seek(0)
-            json.dump(data, f)
-            f.truncate()
+            _write_json_atomic(path, data)
     """
-    thread_lock = _get_file_lock(str(file_path))
-    
-    with thread_lock:
+    with _get_file_lock(file_path):
         # Ensure file exists for reading modes
         if 'r' in mode and not Path(file_path).exists():
             yield None
             return
-            
+        
         with open(file_path, mode, encoding='utf-8') as f:
+            yield f
+
+
+# ==================== Atomic Writes ====================
+# 写临时文件 -> fsync -> os.replace，崩溃时记录要么是旧版本要么是新版本，不会半截。
+# GROUP_COMMIT_WINDOW_MS > 0 时并发写入 (原子替换和 journal/ledger 追加) 在窗口内合并：
+# 由一个 leader 对整批逐个 fsync 文件、rename，再对涉及的每个目录只 fsync 一次。
+# 每个调用者仍然等到自己的数据落盘才返回。
+
+def _fsync_path(path, directory=False):
+    """fsync a file (or, on POSIX, a directory entry) by path."""
+    if directory and sys.platform == 'win32':
+        return  # directories can't be opened for fsync on Windows
+    fd = os.open(path, os.O_RDONLY if directory else os.O_RDWR)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_temp(file_path, data, sync):
+    """Serialize data into a temp file next to file_path. Returns the temp path."""
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; keep records readable like before
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json_codec.encode_file(file_path, data))
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return tmp_path
+
+
+class _GroupCommitter:
+    """Coalesce the durability steps of concurrent writes into one leader pass per batch."""
+
+    def __init__(self, window_s):
+        self.window_s = window_s
+        self._cond = threading.Condition()
+        self._pending = []
+        self._leader_active = False
+
+    def commit(self, tmp_path, file_path):
+        """Make tmp_path durable, rename it over file_path and sync the directory entry."""
+        self._submit({"tmp": tmp_path, "path": file_path})
+
+    def sync(self, fd, directory=None):
+        """Make data already written to an open file durable (plus its directory entry, if given)."""
+        self._submit({"fd": fd, "dir": directory})
+
+    def _submit(self, entry):
+        entry.update(done=False, error=None)
+        with self._cond:
+            self._pending.append(entry)
+            while not entry["done"] and self._leader_active:
+                self._cond.wait()
+            if not entry["done"]:
+                self._leader_active = True
+
+        if not entry["done"]:
+            time.sleep(self.window_s)  # let concurrent saves join this batch
+            with self._cond:
+                batch, self._pending = self._pending, []
             try:
-                exclusive = 'w' in mode or '+' in mode
-                _lock_file(f, exclusive)
-                yield f
-            except (OSError, IOError):
-                # Locking failed, proceed without file lock (thread lock still active)
-                yield f
+                self._flush(batch)
             finally:
-                try:
-                    _unlock_file(f)
-                except:
-                    pass
+                with self._cond:
+                    for item in batch:
+                        item["done"] = True
+                    self._leader_active = False
+                    self._cond.notify_all()
+
+        if entry["error"] is not None:
+            raise entry["error"]
+
+    @staticmethod
+    def _flush(batch):
+        # 只 fsync 这一批自己的文件，每个目录只 fsync 一次
+        directories = set()
+        for item in batch:
+            try:
+                if "fd" in item:
+                    os.fsync(item["fd"])
+                    if item["dir"] is not None:
+                        directories.add(item["dir"])
+                else:
+                    _fsync_path(item["tmp"])
+                    os.replace(item["tmp"], item["path"])
+                    directories.add(item["path"].parent)
+            except OSError as e:
+                item["error"] = e
+                if "tmp" in item:
+                    Path(item["tmp"]).unlink(missing_ok=True)
+        for directory in directories:
+            try:
+                _fsync_path(directory, directory=True)
+            except OSError:
+                pass
+
+
+_group_committer = _GroupCommitter(config.GROUP_COMMIT_WINDOW_MS / 1000) if config.GROUP_COMMIT_WINDOW_MS > 0 else None
+
+
+def _write_json_atomic(file_path, data):
+    """
+    Crash-safe replacement of a JSON file (temp file + fsync + os.replace),
+    encoded as configured in core/json_codec.py.
+    Takes the file's lock, so callers doing read-modify-write should already hold it.
+    """
+    file_path = Path(file_path)
+    with _get_file_lock(file_path):
+        if _group_committer is not None:
+            tmp_path = _write_temp(file_path, data, sync=False)
+            _group_committer.commit(tmp_path, file_path)
+            return
+        
+        tmp_path = _write_temp(file_path, data, sync=True)
+        try:
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        try:
+            _fsync_path(file_path.parent, directory=True)
+        except OSError:
+            pass
+
+
+# ==================== Records Layout ====================
+# config.RECORDS_LAYOUT:
+#   'flat'    : records/<user_id>.json
+#   'sharded' : records/ab/cd/<user_id>.json, ab/cd = sha1(user_id) 前 4 位十六进制
+# 分片后每个目录只有几个文件，目录查找/创建/遍历不会随参与者数量退化。
+# 现有数据用 python manage.py migrate-records-layout sharded 迁移。
+
+RECORDS_LAYOUTS = ('flat', 'sharded')
+# config.RECORD_COMPRESSION -> 记录文件后缀 (core/json_codec.py 按后缀压缩/解压)
+RECORD_SUFFIXES = {'none': '.json', 'gzip': '.json.gz', 'lzma': '.json.xz'}
+
+
+def _shard_dir(user_id, layout=None):
+    """Directory holding a participant's record + journal for the given (default: configured) layout."""
+    layout = layout or config.RECORDS_LAYOUT
+    if layout == 'sharded':
+        digest = hashlib.sha1(user_id.encode('utf-8')).hexdigest()
+        return PARTICIPANTS_DIR / digest[:2] / digest[2:4]
+    return PARTICIPANTS_DIR
+
+
+def _record_glob(layout=None):
+    return "*/*/*" if (layout or config.RECORDS_LAYOUT) == 'sharded' else "*"
+
+
+def _iter_record_files(layout=None):
+    """All canonical record files (<user_id>.json[.gz|.xz]) of a layout."""
+    pattern = _record_glob(layout)
+    return chain.from_iterable(PARTICIPANTS_DIR.glob(pattern + suffix) for suffix in RECORD_SUFFIXES.values())
+
+
+def _iter_journal_files(layout=None):
+    return PARTICIPANTS_DIR.glob(_record_glob(layout) + ".journal.jsonl")
+
+
+def _user_id_from_path(record_file):
+    """user_id of a record file, whatever its compression suffix."""
+    name = record_file.name
+    for suffix in RECORD_SUFFIXES.values():
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return record_file.stem
+
+
+if config.RECORDS_LAYOUT not in RECORDS_LAYOUTS:
+    raise ValueError(f"RECORDS_LAYOUT must be one of {RECORDS_LAYOUTS}, got {config.RECORDS_LAYOUT!r}")
+if config.RECORD_COMPRESSION not in RECORD_SUFFIXES:
+    raise ValueError(f"RECORD_COMPRESSION must be one of {tuple(RECORD_SUFFIXES)}, got {config.RECORD_COMPRESSION!r}")
+if config.RECORDS_LAYOUT == 'sharded' and next(_iter_record_files('flat'), None) is not None:
+    print("[WARNING] RECORDS_LAYOUT=sharded but flat records exist. Run: python manage.py migrate-records-layout sharded")
+
+
+def migrate_records_layout(layout):
+    """
+    Move every record + journal into the given layout (idempotent).
+    Run with the server stopped, then set RECORDS_LAYOUT to match.
+
+    Returns:
+        int: Number of participants moved
+    """
+    if layout not in RECORDS_LAYOUTS:
+        raise ValueError(f"layout must be one of {RECORDS_LAYOUTS}")
+    moved = 0
+    for source_layout in RECORDS_LAYOUTS:
+        if source_layout == layout:
+            continue
+        for user_file in list(_iter_record_files(source_layout)):
+            user_id = _user_id_from_path(user_file)
+            target_dir = _shard_dir(user_id, layout)
+            target_dir.mkdir(parents=True, exist_ok=True)
+            with _get_file_lock(user_file):
+                journal = user_file.with_name(f"{user_id}.journal.jsonl")
+                if journal.exists():
+                    os.replace(journal, target_dir / journal.name)
+                os.replace(user_file, target_dir / user_file.name)
+            _lock_path(user_file).unlink(missing_ok=True)
+            moved += 1
+    # 把已清空的旧分片目录删掉
+    if layout == 'flat':
+        for shard in sorted(PARTICIPANTS_DIR.glob("*/*"), reverse=True):
+            if shard.is_dir() and not any(shard.iterdir()):
+                shard.rmdir()
+        for shard in PARTICIPANTS_DIR.glob("*"):
+            if shard.is_dir() and not any(shard.iterdir()):
+                shard.rmdir()
+    return moved
+
+
+def recompress_records(compression=None):
+    """
+    Rewrite every record whose suffix does not match the given (default: configured)
+    RECORD_COMPRESSION. Run with the server stopped; idempotent.
+
+    Returns:
+        int: Number of records rewritten
+    """
+    compression = compression or config.RECORD_COMPRESSION
+    if compression not in RECORD_SUFFIXES:
+        raise ValueError(f"compression must be one of {tuple(RECORD_SUFFIXES)}")
+    suffix = RECORD_SUFFIXES[compression]
+    converted = 0
+    for user_file in list(_iter_record_files()):
+        if user_file.name.endswith(suffix):
+            continue
+        target = user_file.with_name(_user_id_from_path(user_file) + suffix)
+        with _get_file_lock(user_file):
+            _write_json_atomic(target, json_codec.load_file(user_file))
+            user_file.unlink()
+        _lock_path(user_file).unlink(missing_ok=True)
+        converted += 1
+    return converted
+
+
+# ==================== Record Journal ====================
+# 每个参与者: <user_id>.json (主记录) + <user_id>.journal.jsonl (追加日志)，位置见 _shard_dir
+# save_participant_results 只追加一行场景结果，完成时再压缩回主记录。
+
+def _record_path(user_id):
+    """
+    Path of the canonical participant record.
+    An existing record keeps its suffix (and thus its lock) until recompress_records
+    rewrites it; new records use the configured RECORD_COMPRESSION.
+    """
+    shard = _shard_dir(user_id)
+    path = shard / f"{user_id}{RECORD_SUFFIXES[config.RECORD_COMPRESSION]}"
+    if path.exists():
+        return path
+    for suffix in RECORD_SUFFIXES.values():
+        other = shard / f"{user_id}{suffix}"
+        if other != path and other.exists():
+            return other
+    return path
+
+
+def _journal_path(user_id):
+    """Path of the append-only scene journal for a participant."""
+    return _shard_dir(user_id) / f"{user_id}.journal.jsonl"
+
+
+def _line_start(f, size):
+    """Offset just past the last newline of an open binary file (0 if there is none)."""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - 65536)
+        f.seek(start)
+        newline = f.read(pos - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        pos = start
+    return 0
+
+
+def _append_line(path, line, sync=False):
+    """
+    Append one JSON line to a .jsonl file. Caller must hold the file's lock.
+
+    A partial last line (crash mid-append, so never acknowledged) is truncated
+    first; otherwise the new line would be glued onto it and be unreadable.
+
+    Returns:
+        int: Offset at which the line was written
+    """
+    with open(path, 'a+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        start = size
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                start = _line_start(f, size)
+                print(f"[WARNING] Dropping {size - start} byte partial last line of {path}")
+                f.truncate(start)
+        f.write(line)
+        if sync:
+            f.flush()
+            if _group_committer is not None:
+                # 新建的文件连同目录项一起落盘
+                _group_committer.sync(f.fileno(), Path(path).parent if size == 0 else None)
+                return start
+            os.fsync(f.fileno())
+    if sync and size == 0:
+        # 新建的文件: 目录项也要落盘
+        try:
+            _fsync_path(Path(path).parent, directory=True)
+        except OSError:
+            pass
+    return start
+
+
+def _read_journal(user_id):
+    """
+    Read all journal entries for a participant.
+    A partial last line (append in progress, or a crash mid-append) is not an
+    entry yet; any other unreadable line raises ValueError.
+    """
+    journal_path = _journal_path(user_id)
+    if not journal_path.exists():
+        return []
+
+    entries = []
+    with open(journal_path, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            if not line.endswith(b"\n"):
+                break
+            if not line.strip():
+                continue
+            try:
+                entries.append(json_codec.loads(line))
+            except ValueError as e:  # JSONDecodeError / UnicodeDecodeError (orjson raises its own subclass)
+                raise ValueError(f"Corrupt journal line {number} for {user_id}: {e}") from e
+    return entries
+
+
+def _apply_journal(user_data, entries):
+    """Fold journal entries into a record (same semantics as an in-place save)."""
+    experiments = user_data.setdefault("experiments", [])
+    completed = user_data.setdefault("completed_scenes", [])
+    for entry in entries:
+        scene_name = entry.get("scene")
+        # 重复提交: 新结果覆盖旧结果
+        experiments[:] = [exp for exp in experiments if exp.get("scene") != scene_name]
+        experiments.append(entry)
+        if scene_name not in completed:
+            completed.append(scene_name)
+    return user_data
+
+
+def _read_record(user_id):
+    """
+    Merged view of a participant: canonical record + pending journal entries.
+    Returns None if the participant does not exist.
+    Caller is responsible for holding the record lock if consistency is needed.
+    """
+    file_path = _record_path(user_id)
+    if not file_path.exists():
+        return None
+    user_data = json_codec.load_file(file_path)
+    return _apply_journal(user_data, _read_journal(user_id))
+
+
+def load_participant_record(user_id):
+    """Thread-safe merged participant record (used by exports)."""
+    if _backend is not None:
+        return _backend.load_record(user_id)
+    thread_lock = _get_file_lock(str(_record_path(user_id)))
+    with thread_lock:
+        return _read_record(user_id)
+
+
+def _compressed_record_bytes(user_id):
+    """
+    (file name, raw bytes) of a compressed record with no pending journal, so exports
+    can ship it as is. None if the record is uncompressed, missing or needs merging.
+    """
+    if _backend is not None:
+        return None
+    file_path = _record_path(user_id)
+    if file_path.suffix not in json_codec.COMPRESSORS:
+        return None
+    with _get_file_lock(str(file_path)):
+        if _journal_path(user_id).exists() or not file_path.exists():
+            return None
+        return file_path.name, file_path.read_bytes()
+
+
+def _compact_record_locked(user_id):
+    """Fold the journal into the canonical record. Caller must hold the record lock."""
+    entries = _read_journal(user_id)
+    if not entries:
+        return False
+
+    file_path = _record_path(user_id)
+    user_data = json_codec.load_file(file_path)
+    _apply_journal(user_data, entries)
+
+    token_before = _progress_token(user_id)
+    _write_json_atomic(file_path, user_data)
+    _journal_path(user_id).unlink()
+    _write_through_progress(user_id, token_before)
+    return True
+
+
+def compact_participant_record(user_id):
+    """
+    Fold a participant's journal back into records/<user_id>.json.
+
+    Returns:
+        bool: True if there was anything to compact
+    """
+    file_path = _record_path(user_id)
+    if _backend is not None or not file_path.exists():
+        return False
+
+    thread_lock = _get_file_lock(str(file_path))
+    with thread_lock:
+        return _compact_record_locked(user_id)
+
+
+def compact_all_participant_records():
+    """Compact every participant that has a pending journal. Returns the count."""
+    count = 0
+    for journal_file in _iter_journal_files():
+        user_id = journal_file.name[:-len(".journal.jsonl")]
+        try:
+            if compact_participant_record(user_id):
+                count += 1
+        except Exception as e:
+            print(f"[ERROR] Failed to compact {user_id}: {e}")
+    return count
 
 
 def get_blocked_list():
     """Thread-safe blocked list retrieval."""
+    if _backend is not None:
+        return _backend.blocked_list_detailed()
     if not BLOCKED_FILE.exists():
         return []
     with safe_file_access(BLOCKED_FILE, 'r') as f:
@@ -505,7 +1416,12 @@ def get_blocked_list():
 
 
 def block_user(ip_address, reason=None):
-    """Thread-safe IP blocking with optional reason."""
+    """Thread-safe IP blocking with optional reason. ip_address may also be a CIDR range (e.g. "10.2.0.0/16")."""
+    if _backend is not None:
+        _backend.block_ip(ip_address, reason, datetime.now().isoformat())
+        _invalidate_blocked_cache()
+        return
+    
     thread_lock = _get_file_lock(str(BLOCKED_FILE))
     
     with thread_lock:
@@ -532,12 +1448,17 @@ def block_user(ip_address, reason=None):
                 "blocked_at": datetime.now().isoformat()
             }
             blocked.append(new_entry)
-            with open(BLOCKED_FILE, 'w', encoding='utf-8') as f:
-                json.dump(blocked, f, indent=2)
+            _write_json_atomic(BLOCKED_FILE, blocked)
+            _invalidate_blocked_cache()
 
 
 def unblock_user(ip_address):
     """Remove an IP address from the blocked list."""
+    if _backend is not None:
+        found = _backend.unblock_ip(ip_address)
+        _invalidate_blocked_cache()
+        return found
+    
     thread_lock = _get_file_lock(str(BLOCKED_FILE))
     
     with thread_lock:
@@ -566,14 +1487,16 @@ def unblock_user(ip_address):
                     found = True
         
         if found:
-            with open(BLOCKED_FILE, 'w', encoding='utf-8') as f:
-                json.dump(new_blocked, f, indent=2)
+            _write_json_atomic(BLOCKED_FILE, new_blocked)
+            _invalidate_blocked_cache()
         
         return found
 
 
 def get_blocked_list_detailed():
     """Get blocked list with full details (IP, reason, timestamp)."""
+    if _backend is not None:
+        return _backend.blocked_list_detailed()
     if not BLOCKED_FILE.exists():
         return []
     
@@ -605,39 +1528,57 @@ def delete_participant(user_id):
     Returns:
         dict with status and message
     """
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
+    if _backend is not None:
+        record = _backend.load_record(user_id)
+        deleted = _backend.delete_participant(user_id)
+        if deleted is None:
+            return {"status": "error", "message": "Participant not found"}
+        _remove_from_pool_stats(record)
+        _log_change(user_id, 'delete')
+        pool_id, _ = deleted
+        print(f"[DELETE] Participant {user_id} deleted. Pool {pool_id} stats updated.")
+        return {"status": "success", "message": f"Participant {user_id} deleted successfully"}
+    
+    file_path = _record_path(user_id)
     
     if not file_path.exists():
         return {"status": "error", "message": "Participant not found"}
     
     try:
-        # First, read the participant data to get pool info
-        with open(file_path, 'r', encoding='utf-8') as f:
-            user_data = json.load(f)
-        
-        pool_id = user_data.get('assigned_pool')
-        was_completed = user_data.get('is_fully_completed', False)
-        
-        # Delete the file
-        file_path.unlink()
+        with _get_file_lock(str(file_path)):
+            # First, read the participant data to get pool info
+            user_data = load_participant_record(user_id)
+            if user_data is None:
+                return {"status": "error", "message": "Participant not found"}
+            
+            pool_id = user_data.get('assigned_pool')
+            was_completed = user_data.get('is_fully_completed', False)
+            
+            # Delete the file (and any pending journal), then free the participant_id
+            file_path.unlink()
+            journal_path = _journal_path(user_id)
+            if journal_path.exists():
+                journal_path.unlink()
+            # user_id 不会复用 (时间戳 + 随机后缀)，持锁时删除锁文件是安全的
+            _lock_path(file_path).unlink(missing_ok=True)
+            _invalidate_progress(user_id)
+        _release_participant_id(user_data.get('demographics', {}).get('participant_id', ''), user_id)
+        _update_summary('delete', user_id)
+        _log_change(user_id, 'delete')
+        _remove_from_pool_stats(user_data)
         
         # Update pool status if user was assigned to a pool
         if pool_id:
-            with safe_file_access(POOL_STATUS_FILE, 'r+') as f:
-                if f:
-                    pool_status = json.load(f)
-                    
-                    if pool_id in pool_status:
-                        # Decrement started count
-                        pool_status[pool_id]['started'] = max(0, pool_status[pool_id].get('started', 1) - 1)
-                        
-                        # Decrement completed count if they had finished
-                        if was_completed:
-                            pool_status[pool_id]['completed'] = max(0, pool_status[pool_id].get('completed', 1) - 1)
+            with _pool_state_transaction() as state:
+                pool_status = state["pools"]
+                
+                if pool_id in pool_status:
+                    # Decrement started count
+                    pool_status[pool_id]['started'] = max(0, pool_status[pool_id].get('started', 1) - 1)
                     
-                    f.seek(0)
-                    json.dump(pool_status, f, indent=2)
-                    f.truncate()
+                    # Decrement completed count if they had finished
+                    if was_completed:
+                        pool_status[pool_id]['completed'] = max(0, pool_status[pool_id].get('completed', 1) - 1)
         
         print(f"[DELETE] Participant {user_id} deleted. Pool {pool_id} stats updated.")
         return {"status": "success", "message": f"Participant {user_id} deleted successfully"}
@@ -647,106 +1588,292 @@ def delete_participant(user_id):
         return {"status": "error", "message": str(e)}
 
 
+# ==================== Payment Ledger ====================
+# payment_ledger.jsonl: 每次提交追加一行 (OS 锁 + fsync)，不再整文件重写。
+# 每个进程维护已提交 user_id 的内存索引，并记住读到的文件偏移;
+# 加锁后只读其他 worker 新追加的部分，所以重复提交检查是 O(新增行数)。
+# 旧的 payment_summary.json (如果有) 只读，和账本一起折叠成汇总。
+
+_payment_index = {"offset": 0, "user_ids": None}
+
+
+def _read_legacy_payment_summary():
+    if not PAYMENT_SUMMARY_FILE.exists():
+        return []
+    try:
+        return json_codec.load_file(PAYMENT_SUMMARY_FILE)
+    except (json.JSONDecodeError, OSError):
+        return []
+
+
+def _iter_ledger_lines(offset=0):
+    """
+    Yield (entry, end_offset) for complete ledger lines starting at a byte offset.
+    A partial last line (append in progress, or a crash mid-append) is not an
+    entry yet; any other unreadable line raises ValueError.
+    """
+    if not PAYMENT_LEDGER_FILE.exists():
+        return
+    with open(PAYMENT_LEDGER_FILE, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            start, offset = offset, offset + len(line)
+            try:
+                entry = json_codec.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Corrupt payment ledger line at byte {start}: {e}") from e
+            yield entry, offset
+
+
+def _refresh_payment_index_locked():
+    """Bring this process's submitted-user index up to date. Caller holds the ledger lock."""
+    if _payment_index["user_ids"] is None:
+        _payment_index["user_ids"] = {entry.get('user_id') for entry in _read_legacy_payment_summary()}
+        _payment_index["offset"] = 0
+    for entry, offset in _iter_ledger_lines(_payment_index["offset"]):
+        _payment_index["user_ids"].add(entry.get('user_id'))
+        _payment_index["offset"] = offset
+    return _payment_index["user_ids"]
+
+
+def payment_already_submitted(user_id):
+    """Whether a payment entry exists for this user (any worker)."""
+    with _get_file_lock(PAYMENT_LEDGER_FILE):
+        return user_id in _refresh_payment_index_locked()
+
+
 def save_payment_to_summary(user_id, payment_info):
     """
-    Append payment information to a central summary file.
+    Append payment information to the central payment ledger.
     
     Args:
         user_id: The user ID
         payment_info: Dict containing payment fields
+    
+    Returns:
+        bool: False if this user already has a payment entry (nothing written)
     """
-    thread_lock = _get_file_lock(str(PAYMENT_SUMMARY_FILE))
+    # Add entry with user_id and timestamp
+    entry = {
+        "user_id": user_id,
+        "real_name": payment_info.get('real_name', ''),
+        "phone": payment_info.get('phone', ''),
+        "id_number": payment_info.get('id_number', ''),
+        "bank_branch": payment_info.get('bank_branch', ''),
+        "bank_account": payment_info.get('bank_account', ''),
+        "submitted_at": payment_info.get('submitted_at', datetime.now().isoformat())
+    }
+    line = json_codec.dumps_line(entry)
     
-    with thread_lock:
-        summary = []
-        if PAYMENT_SUMMARY_FILE.exists():
-            try:
-                with open(PAYMENT_SUMMARY_FILE, 'r', encoding='utf-8') as f:
-                    summary = json.load(f)
-            except (json.JSONDecodeError, Exception):
-                summary = []
-        
-        # Add entry with user_id and timestamp
-        entry = {
-            "user_id": user_id,
-            "real_name": payment_info.get('real_name', ''),
-            "phone": payment_info.get('phone', ''),
-            "id_number": payment_info.get('id_number', ''),
-            "bank_branch": payment_info.get('bank_branch', ''),
-            "bank_account": payment_info.get('bank_account', ''),
-            "submitted_at": payment_info.get('submitted_at', datetime.now().isoformat())
-        }
-        summary.append(entry)
-        
-        with open(PAYMENT_SUMMARY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
+    with _get_file_lock(PAYMENT_LEDGER_FILE):
+        submitted = _refresh_payment_index_locked()
+        if user_id in submitted:
+            print(f"[PAYMENT SUMMARY] Duplicate submission ignored for user {user_id}")
+            return False
         
-        print(f"[PAYMENT SUMMARY] Added payment for user {user_id}")
+        # 截掉崩溃留下的半行后再追加，偏移以实际写入位置为准
+        start = _append_line(PAYMENT_LEDGER_FILE, line, sync=True)
+        submitted.add(user_id)
+        _payment_index["offset"] = start + len(line)
+    
+    print(f"[PAYMENT SUMMARY] Added payment for user {user_id}")
+    return True
 
 
 def get_payment_summary():
-    """Get all payment entries from the summary file."""
-    if not PAYMENT_SUMMARY_FILE.exists():
-        return []
+    """Get all payment entries (legacy summary file + ledger), one per user, oldest first."""
+    entries = {}
+    for entry in _read_legacy_payment_summary():
+        entries.setdefault(entry.get('user_id'), entry)
+    for entry, _ in _iter_ledger_lines():
+        entries.setdefault(entry.get('user_id'), entry)
+    return list(entries.values())
+
+
+# ==================== Blocked IP Cache ====================
+# is_blocked 在每次 /login 时调用: 进程内缓存解析后的黑名单,
+# 只有文件 (mtime, size, inode) 或 SQLite 的 blocked_version 变化时才重新加载。
+
+class _BlockedIPSet:
+    """
+    Hashed set of blocked IPs plus CIDR ranges (e.g. "10.2.0.0/16").
+    Ranges are grouped by (ip version, prefix length), so a lookup masks the
+    address once per distinct prefix length and does a set membership test.
+    """
+
+    def __init__(self, entries):
+        self.exact = set()
+        self.networks = {}  # (version, prefixlen) -> set of network addresses as ints
+        for entry in entries:
+            entry = entry.strip()
+            if '/' in entry:
+                try:
+                    network = ipaddress.ip_network(entry, strict=False)
+                except ValueError:
+                    self.exact.add(entry)
+                    continue
+                key = (network.version, network.prefixlen)
+                self.networks.setdefault(key, set()).add(int(network.network_address))
+            else:
+                self.exact.add(entry)
+
+    def __contains__(self, ip_address):
+        if ip_address in self.exact:
+            return True
+        if not self.networks:
+            return False
+        try:
+            address = ipaddress.ip_address(ip_address.strip())
+        except ValueError:
+            return False
+        value = int(address)
+        bits = address.max_prefixlen
+        for (version, prefixlen), networks in self.networks.items():
+            if version != address.version:
+                continue
+            mask = ((1 << prefixlen) - 1) << (bits - prefixlen)
+            if value & mask in networks:
+                return True
+        return False
+
+
+_blocked_cache = {"token": None, "ips": None}
+_blocked_cache_lock = threading.Lock()
+
+
+def _blocked_token():
+    """Cheap change token for the blocked list."""
+    if _backend is not None:
+        return _backend.blocked_version()
+    try:
+        st = BLOCKED_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _invalidate_blocked_cache():
+    """Drop this process's cached blocked set (after block_user / unblock_user)."""
+    with _blocked_cache_lock:
+        _blocked_cache["ips"] = None
+
+
+def _get_blocked_ip_set():
+    token = _blocked_token()
+    with _blocked_cache_lock:
+        if _blocked_cache["ips"] is not None and _blocked_cache["token"] == token:
+            return _blocked_cache["ips"]
     
-    with safe_file_access(PAYMENT_SUMMARY_FILE, 'r') as f:
-        if f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
+    entries = [entry['ip'] for entry in get_blocked_list_detailed() if entry.get('ip')]
+    ips = _BlockedIPSet(entries)
+    with _blocked_cache_lock:
+        _blocked_cache["token"] = token
+        _blocked_cache["ips"] = ips
+    return ips
 
 
 def is_blocked(ip_address):
-    """Check if an IP is blocked (supports both old and new format)."""
-    blocked_list = get_blocked_list()
-    for entry in blocked_list:
-        if isinstance(entry, str) and entry == ip_address:
-            return True
-        elif isinstance(entry, dict) and entry.get('ip') == ip_address:
-            return True
-    return False
+    """Check if an IP is blocked, either listed exactly or inside a blocked CIDR range."""
+    if not ip_address:
+        return False
+    return ip_address in _get_blocked_ip_set()
+
+
+# ==================== Participant ID Index ====================
+# participant_ids/<sha1(normalized id)> 标记文件, 内容为 {"participant_id", "user_id"}。
+# 用 O_CREAT|O_EXCL 创建，跨 gunicorn worker 原子地占用 ID，查重为 O(1) 的 exists()。
+
+_ID_INDEX_READY_FILE = PARTICIPANT_ID_INDEX_DIR / "_index_complete"
 
 
-def _get_next_pool_assignment():
+def _id_index_path(participant_id):
+    """Marker path for a participant_id, or None for empty IDs (never unique-checked)."""
+    normalized = normalize_participant_id(participant_id)
+    if normalized is None:
+        return None
+    return PARTICIPANT_ID_INDEX_DIR / hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def _reserve_participant_id(participant_id, user_id):
     """
-    获取下一个要分配的 Pool ID (1-6)，并更新全局计数器。
-    线程安全 + 进程安全。
+    Atomically claim a participant_id for user_id.
+    
+    Returns:
+        bool: False if the ID is already taken
     """
-    # 确保文件存在
-    if not GLOBAL_STATE_FILE.exists():
-        with safe_file_access(GLOBAL_STATE_FILE, 'w') as f:
-            json.dump({"next_pool": 1}, f)
+    marker = _id_index_path(participant_id)
+    if marker is None:
+        return True
+    try:
+        fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({"participant_id": participant_id, "user_id": user_id}, f, ensure_ascii=False)
+    return True
 
-    assigned_pool = 1
-    
-    with safe_file_access(GLOBAL_STATE_FILE, 'r+') as f:
-        if f:
-            try:
-                data = json.load(f)
-                current = data.get("next_pool", 1)
-                assigned_pool = current
-                
-                # 计算下一个 (1->2->3->4->5->6->1)
-                next_val = current + 1
-                if next_val > 6:
-                    next_val = 1
-                
-                # 写回
-                f.seek(0)
-                json.dump({"next_pool": next_val}, f)
-                f.truncate()
-            except Exception as e:
-                print(f"Error rotating pool: {e}")
-                pass
+
+def _release_participant_id(participant_id, user_id):
+    """Remove the marker for participant_id if it belongs to user_id."""
+    marker = _id_index_path(participant_id)
+    if marker is None or not marker.exists():
+        return
+    try:
+        with open(marker, 'r', encoding='utf-8') as f:
+            owner = json.load(f).get('user_id')
+    except (OSError, json.JSONDecodeError):
+        owner = None
+    if owner in (None, user_id):
+        marker.unlink(missing_ok=True)
+
+
+def _build_participant_id_index(clear=False):
+    """Populate the index from records/. Caller must hold the index lock."""
+    if clear:
+        for marker in PARTICIPANT_ID_INDEX_DIR.iterdir():
+            marker.unlink(missing_ok=True)
+    
+    count = 0
+    for user_file in _iter_record_files():
+        try:
+            data = json_codec.load_file(user_file)
+        except Exception:
+            continue
+        participant_id = data.get('demographics', {}).get('participant_id', '')
+        if _reserve_participant_id(participant_id, data.get('user_id', _user_id_from_path(user_file))):
+            count += 1
+    _ID_INDEX_READY_FILE.touch()
+    return count
+
+
+def _ensure_participant_id_index():
+    """Build the index once (first start after upgrading from the glob-based check)."""
+    if _ID_INDEX_READY_FILE.exists():
+        return
+    PARTICIPANT_ID_INDEX_DIR.mkdir(exist_ok=True)
+    with _get_file_lock(PARTICIPANT_ID_INDEX_DIR):
+        if not _ID_INDEX_READY_FILE.exists():
+            count = _build_participant_id_index()
+            print(f"[ID INDEX] Built participant-ID index ({count} entries)")
+
+
+def rebuild_participant_id_index():
+    """
+    Recreate the participant-ID index from the records (admin / CLI).
     
-    return str(assigned_pool)
+    Returns:
+        int: Number of indexed participant IDs
+    """
+    PARTICIPANT_ID_INDEX_DIR.mkdir(exist_ok=True)
+    with _get_file_lock(PARTICIPANT_ID_INDEX_DIR):
+        return _build_participant_id_index(clear=True)
 
 
 def check_participant_id_exists(participant_id):
     """
-    Check if a participant_id already exists in the records folder.
+    Check if a participant_id already exists (O(1) index lookup).
     
     Args:
         participant_id: The user-provided participant ID to check
@@ -754,20 +1881,12 @@ def check_participant_id_exists(participant_id):
     Returns:
         bool: True if participant_id already exists, False otherwise
     """
-    participant_id_lower = participant_id.lower().strip()
-    
-    for user_file in PARTICIPANTS_DIR.glob("*.json"):
-        try:
-            with open(user_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            existing_pid = data.get('demographics', {}).get('participant_id', '')
-            if existing_pid and existing_pid.lower().strip() == participant_id_lower:
-                return True
-        except Exception:
-            continue
+    if _backend is not None:
+        return _backend.participant_id_exists(participant_id)
     
-    return False
+    _ensure_participant_id_index()
+    marker = _id_index_path(participant_id)
+    return marker is not None and marker.exists()
 
 
 def init_participant_file(demographics):
@@ -782,7 +1901,7 @@ def init_participant_file(demographics):
     # 使用用户填写的 participant_id，加上时间戳确保唯一性
     participant_id = demographics.get('participant_id', 'unknown')
     
-    # Check for duplicate participant_id
+    # Check for duplicate participant_id (SQLite backend re-checks inside its insert transaction)
     if check_participant_id_exists(participant_id):
         raise ValueError(f"Participant ID '{participant_id}' already exists. Please use a different ID.")
     
@@ -803,35 +1922,164 @@ def init_participant_file(demographics):
         "is_fully_completed": False # 标记是否完赛
     }
     
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    if _backend is not None:
+        _backend.create_participant(data)
+        _log_change(user_id, 'create')
+        return user_id
+    
+    # 原子占用 ID: 两个 worker 同时用同一个 ID 登录时只有一个成功
+    if not _reserve_participant_id(participant_id, user_id):
+        raise ValueError(f"Participant ID '{participant_id}' already exists. Please use a different ID.")
+    
+    file_path = _record_path(user_id)
+    try:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(file_path, data)
+    except Exception:
+        _release_participant_id(participant_id, user_id)
+        raise
+    
+    _update_summary('upsert_record', data)
+    _log_change(user_id, 'create')
         
     return user_id
 
 
+def participant_exists(user_id):
+    """Check whether a participant record exists (any storage backend)."""
+    if _backend is not None:
+        return _backend.participant_exists(user_id)
+    return _record_path(user_id).exists()
+
+
+# ==================== Progress Cache ====================
+# get_next_scene / get_upcoming_scenes 只需要 scene_order 和已完成集合 (is_user_terminated 只需要终止标记)。
+# 每个进程缓存这些 (加一个指向第一个未完成场景的游标)，用记录文件 + journal 的
+# (mtime_ns, size, inode) 校验; 本进程的保存直接写穿 (write-through) 更新缓存，
+# 其他 worker 的写入会改变 token，下次访问时重新读取。SQLite 后端本身就是索引查询，不走缓存。
+
+PROGRESS_CACHE_SIZE = 4096
+
+
+class _Progress:
+    __slots__ = ("token", "order", "completed", "cursor", "terminated", "pool")
+
+    def __init__(self, token, order, completed_scenes, pool=None, terminated=False):
+        self.token = token
+        self.order = list(order)
+        self.completed = set(completed_scenes)
+        self.cursor = 0
+        self.terminated = terminated
+        self.pool = pool
+
+    def remaining(self):
+        """Iterate over unfinished scenes in order, advancing the cursor past finished ones."""
+        while self.cursor < len(self.order) and self.order[self.cursor] in self.completed:
+            self.cursor += 1
+        for scene in self.order[self.cursor:]:
+            if scene not in self.completed:
+                yield scene
+
+
+_progress_cache = OrderedDict()
+_progress_cache_lock = threading.Lock()
+
+
+def _progress_token(user_id):
+    """Change token for a participant's record + journal, or None if the record is missing."""
+    try:
+        st = _record_path(user_id).stat()
+    except FileNotFoundError:
+        return None
+    try:
+        jst = _journal_path(user_id).stat()
+        journal = (jst.st_mtime_ns, jst.st_size, jst.st_ino)
+    except FileNotFoundError:
+        journal = None
+    return (st.st_mtime_ns, st.st_size, st.st_ino, journal)
+
+
+def _cache_progress(user_id, progress):
+    with _progress_cache_lock:
+        _progress_cache[user_id] = progress
+        _progress_cache.move_to_end(user_id)
+        while len(_progress_cache) > PROGRESS_CACHE_SIZE:
+            _progress_cache.popitem(last=False)
+
+
+def _invalidate_progress(user_id):
+    with _progress_cache_lock:
+        _progress_cache.pop(user_id, None)
+
+
+def _cached_progress(user_id):
+    """_Progress for a JSON-backend participant, or None if the user does not exist."""
+    # Stat before reading: a write racing with the read leaves an older token, forcing a reload next time
+    token = _progress_token(user_id)
+    if token is None:
+        _invalidate_progress(user_id)
+        return None
+    with _progress_cache_lock:
+        progress = _progress_cache.get(user_id)
+        if progress is not None and progress.token == token:
+            _progress_cache.move_to_end(user_id)
+            return progress
+    
+    data = load_participant_record(user_id)
+    if not data:
+        return None
+    progress = _Progress(token, data['scene_order'], data['completed_scenes'], pool=data.get('assigned_pool'),
+                         terminated=data.get('status') == 'terminated' or bool(data.get('is_blocked', False)))
+    _cache_progress(user_id, progress)
+    return progress
+
+
+def _write_through_progress(user_id, token_before, scene_order=None, scene_name=None, pool=None):
+    """
+    Update the cached progress after this process wrote the record (caller holds the record lock).
+    Only applied if the cache was current before the write; otherwise it is dropped.
+    """
+    with _progress_cache_lock:
+        progress = _progress_cache.get(user_id)
+        if progress is None:
+            return
+        if progress.token != token_before:
+            del _progress_cache[user_id]
+            return
+        if scene_order is not None:
+            progress.order = list(scene_order)
+            progress.cursor = 0
+        if pool is not None:
+            progress.pool = pool
+        if scene_name is not None:
+            progress.completed.add(scene_name)
+        progress.token = _progress_token(user_id)
+
+
+def _load_progress(user_id):
+    """_Progress of a participant from the active backend, or None if the user does not exist."""
+    if _backend is not None:
+        progress = _backend.get_progress(user_id)
+        return _Progress(None, *progress) if progress else None
+    return _cached_progress(user_id)
+
+
 def get_next_scene(user_id):
     """
     获取用户的下一个场景 (线程安全)。
     返回: (scene_name, current_index, total_count)
     如果全部做完，返回 (None, -1, total)
     """
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
-    
-    with safe_file_access(file_path, 'r') as f:
-        if not f:
-            return None, 0, 0
-        data = json.load(f)
-    
-    order = data['scene_order']
-    completed = set(data['completed_scenes'])
-    
-    total = len(order)
-    current_idx = len(completed) + 1
+    progress = _load_progress(user_id)
+    if progress is None:
+        return None, 0, 0
     
-    # 按顺序找第一个没做过的
-    for scene in order:
-        if scene not in completed:
+    with _progress_cache_lock:
+        total = len(progress.order)
+        current_idx = len(progress.completed) + 1
+        
+        # 按顺序找第一个没做过的
+        for scene in progress.remaining():
             return scene, current_idx, total
             
     return None, total, total # 全部完成
@@ -842,23 +2090,166 @@ def get_upcoming_scenes(user_id, count=3):
     获取用户接下来的几个场景名称（用于预加载）。
     返回: list of scene_names (不包含当前正在做的)
     """
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
+    progress = _load_progress(user_id)
+    if progress is None:
+        return []
     
-    with safe_file_access(file_path, 'r') as f:
-        if not f:
-            return []
-        data = json.load(f)
+    # 跳过当前正在做的（第一个），返回接下来的几个
+    with _progress_cache_lock:
+        return list(islice(progress.remaining(), 1, count + 1))
+
+
+def get_assigned_pool(user_id):
+    """The participant's assigned pool id (str), or None before assignment / for unknown users."""
+    progress = _load_progress(user_id)
+    return progress.pool if progress is not None else None
+
+
+def _build_scene_entry(scene_name, items_data, duration_ms=None, attention_check_data=None):
+    """Format one scene submission into the stored experiment entry."""
+    # 记录数据
+    formatted_results = []
+    for item in items_data:
+        object_id = item.get('object_id', '')
+        
+        # Check if this is an attention check item
+        if object_id.startswith('attention_check_'):
+            # Enhanced attention check format
+            record = {
+                "type": "attention_check",
+                "object_id": object_id,
+                "question": item.get('question', 'Unknown attention check'),
+                "target_rule": item.get('target_rule', 'unknown'),
+                "slider_value": int(item.get('slider_value', 50)),
+                "passed": item.get('passed', False),
+                "timestamp": datetime.now().isoformat()
+            }
+        else:
+            # Normal object annotation
+            raw_slider = item.get('slider_value')
+            if raw_slider is None:
+                slider_val = 50  # Default to 50 (Unsure) if missing
+            else:
+                slider_val = int(raw_slider)  # Ensure it's always an integer
+            
+            record = {
+                "object_id": object_id,
+                "agent_left_id": item.get('agent_a_id'),
+                "agent_right_id": item.get('agent_b_id'),
+                "slider_value": slider_val  # Always store as int, including 50
+            }
+        formatted_results.append(record)
     
-    order = data['scene_order']
-    completed = set(data['completed_scenes'])
+    new_entry = {
+        "scene": scene_name,
+        "save_timestamp": datetime.now().isoformat(),
+        "duration_ms": duration_ms,
+        "results": formatted_results
+    }
     
-    # 找到所有未完成的场景
-    remaining = [scene for scene in order if scene not in completed]
+    # Add attention check metadata if provided separately
+    if attention_check_data:
+        new_entry["attention_check"] = {
+            "type": "attention_check",
+            "question": attention_check_data.get('question', ''),
+            "target_rule": attention_check_data.get('target_rule', ''),
+            "slider_value": int(attention_check_data.get('slider_value', 50)),
+            "passed": attention_check_data.get('passed', False),
+            "timestamp": datetime.now().isoformat()
+        }
     
-    # 跳过当前正在做的（第一个），返回接下来的几个
-    if len(remaining) > 1:
-        return remaining[1:count+1]
-    return []
+    return new_entry
+
+
+# ==================== Write-Behind ====================
+# SAVE_WRITE_BEHIND=true (JSON 后端): 保存请求只做一次 fsync 过的 journal 追加就返回，
+# 后台线程再把 journal 折叠进主记录并更新 summary。journal 本身就是持久队列，
+# 所以任何 worker 的 get_next_scene 都能立刻读到刚保存的场景 (read-your-writes)。
+# 线程在第一次保存时才启动，并按 PID 区分: fork 前 (预加载) 建的线程不会被 worker 继承。
+
+class _WriteBehindWorker:
+    """Background thread folding saved scenes into the participant records."""
+
+    # Collect saves this long before applying, so a participant's burst is compacted once
+    LINGER_S = 0.5
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self._flush_at_exit)
+
+    def submit(self, user_id, scene_name):
+        self._queue.put((user_id, scene_name))
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far has been applied."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _flush_at_exit(self):
+        # fork() 出的子进程也继承了这个 atexit 回调，但没有这个线程
+        if self.pid == os.getpid():
+            self.flush(10)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            if not isinstance(batch[0], threading.Event):
+                time.sleep(self.LINGER_S)
+            # Drain whatever else is waiting, so a burst compacts each record once
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._apply(batch)
+
+    @staticmethod
+    def _apply(batch):
+        users = []
+        for item in batch:
+            if isinstance(item, threading.Event):
+                continue
+            user_id, scene_name = item
+            _update_summary('record_scene', user_id, scene_name)
+            if user_id not in users:
+                users.append(user_id)
+        for user_id in users:
+            try:
+                compact_participant_record(user_id)
+            except Exception as e:
+                # The journal still holds the data; compaction is retried on the next save / completion
+                print(f"[WRITE-BEHIND] Failed to apply saves for {user_id}: {e}")
+        for item in batch:
+            if isinstance(item, threading.Event):
+                item.set()
+
+
+_write_behind_enabled = config.SAVE_WRITE_BEHIND and _backend is None
+_write_behind = None
+_write_behind_lock = threading.Lock()
+
+
+def _write_behind_worker():
+    """This process's write-behind worker, started on first use."""
+    global _write_behind
+    worker = _write_behind
+    if worker is None or worker.pid != os.getpid():
+        with _write_behind_lock:
+            worker = _write_behind
+            if worker is None or worker.pid != os.getpid():
+                worker = _write_behind = _WriteBehindWorker()
+    return worker
+
+
+def flush_write_behind(timeout=None):
+    """Wait for pending write-behind work in this process (no-op when disabled or nothing was saved)."""
+    worker = _write_behind
+    if worker is not None and worker.pid == os.getpid():
+        worker.flush(timeout)
 
 
 def save_participant_results(user_id, scene_name, items_data, duration_ms=None, attention_check_data=None):
@@ -881,86 +2272,52 @@ def save_participant_results(user_id, scene_name, items_data, duration_ms=None,
     Returns:
         dict: {"status": "success"} or {"status": "rejected", "reason": str}
     """
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
+    new_entry = _build_scene_entry(scene_name, items_data, duration_ms, attention_check_data)
+    
+    if _backend is not None:
+        result = _backend.save_scene_entry(user_id, new_entry)
+        if result.get('status') == 'rejected':
+            print(f"[SECURITY] Rejected save for user {user_id}: {result.get('reason')}")
+        else:
+            _log_change(user_id, 'scene')
+        return result
+    
+    file_path = _record_path(user_id)
     thread_lock = _get_file_lock(str(file_path))
     
     with thread_lock:
-        # Read
-        with open(file_path, 'r', encoding='utf-8') as f:
-            user_data = json.load(f)
-        
-        # SECURITY: Check if user is already terminated/blocked
-        if user_data.get('status') == 'terminated':
-            print(f"[SECURITY] Rejected save for terminated user {user_id}")
-            return {"status": "rejected", "reason": "User already terminated"}
-        
-        if user_data.get('is_blocked', False):
-            print(f"[SECURITY] Rejected save for blocked user {user_id}")
-            return {"status": "rejected", "reason": "User is blocked"}
-        
-        # 记录数据
-        formatted_results = []
-        for item in items_data:
-            object_id = item.get('object_id', '')
+        if _write_behind_enabled:
+            # 终止标记来自进度缓存 (命中时只需 stat，不解析记录)
+            progress = _cached_progress(user_id)
+            if progress is None:
+                raise FileNotFoundError(f"Participant not found: {user_id}")
+            if progress.terminated:
+                print(f"[SECURITY] Rejected save for terminated/blocked user {user_id}")
+                return {"status": "rejected", "reason": "User already terminated"}
+        else:
+            # Read (主记录只含头部信息，场景结果在 journal 中)
+            user_data = json_codec.load_file(file_path)
             
-            # Check if this is an attention check item
-            if object_id.startswith('attention_check_'):
-                # Enhanced attention check format
-                record = {
-                    "type": "attention_check",
-                    "object_id": object_id,
-                    "question": item.get('question', 'Unknown attention check'),
-                    "target_rule": item.get('target_rule', 'unknown'),
-                    "slider_value": int(item.get('slider_value', 50)),
-                    "passed": item.get('passed', False),
-                    "timestamp": datetime.now().isoformat()
-                }
-            else:
-                # Normal object annotation
-                raw_slider = item.get('slider_value')
-                if raw_slider is None:
-                    slider_val = 50  # Default to 50 (Unsure) if missing
-                else:
-                    slider_val = int(raw_slider)  # Ensure it's always an integer
-                
-                record = {
-                    "object_id": object_id,
-                    "agent_left_id": item.get('agent_a_id'),
-                    "agent_right_id": item.get('agent_b_id'),
-                    "slider_value": slider_val  # Always store as int, including 50
-                }
-            formatted_results.append(record)
-        
-        # 移除旧数据（如果重复提交）
-        user_data["experiments"] = [exp for exp in user_data["experiments"] if exp["scene"] != scene_name]
-        
-        new_entry = {
-            "scene": scene_name,
-            "save_timestamp": datetime.now().isoformat(),
-            "duration_ms": duration_ms,
-            "results": formatted_results
-        }
-        
-        # Add attention check metadata if provided separately
-        if attention_check_data:
-            new_entry["attention_check"] = {
-                "type": "attention_check",
-                "question": attention_check_data.get('question', ''),
-                "target_rule": attention_check_data.get('target_rule', ''),
-                "slider_value": int(attention_check_data.get('slider_value', 50)),
-                "passed": attention_check_data.get('passed', False),
-                "timestamp": datetime.now().isoformat()
-            }
-        
-        user_data["experiments"].append(new_entry)
-        
-        # 标记该场景为已完成
-        if scene_name not in user_data["completed_scenes"]:
-            user_data["completed_scenes"].append(scene_name)
+            # SECURITY: Check if user is already terminated/blocked
+            if user_data.get('status') == 'terminated':
+                print(f"[SECURITY] Rejected save for terminated user {user_id}")
+                return {"status": "rejected", "reason": "User already terminated"}
+            
+            if user_data.get('is_blocked', False):
+                print(f"[SECURITY] Rejected save for blocked user {user_id}")
+                return {"status": "rejected", "reason": "User is blocked"}
         
-        # Write
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(user_data, f, indent=2, ensure_ascii=False)
+        # Append to journal (重复提交由 _apply_journal 在读取时覆盖)
+        token_before = _progress_token(user_id)
+        # 结果只存在于 journal 里 (两种模式都是): 落盘后才确认
+        _append_line(_journal_path(user_id), json_codec.dumps_line(new_entry), sync=True)
+        _write_through_progress(user_id, token_before, scene_name=scene_name)
+    
+    _log_change(user_id, 'scene')
+    if _write_behind_enabled:
+        _write_behind_worker().submit(user_id, scene_name)
+    else:
+        _update_summary('record_scene', user_id, scene_name)
         
     return {"status": "success"}
 
@@ -979,35 +2336,37 @@ def save_attention_check_failure(user_id, scene_name, attention_data, current_id
     Returns:
         bool: Success status
     """
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
+    # Record the failure
+    failure_record = {
+        "scene": scene_name,
+        "scene_index": current_idx,
+        "question": attention_data.get('question', ''),
+        "target_rule": attention_data.get('target_rule', ''),
+        "slider_value": int(attention_data.get('slider_value', 50)),
+        "passed": False,
+        "timestamp": datetime.now().isoformat(),
+        "mode": "strict" if current_idx < config.ATTENTION_CHECK_STRICT_THRESHOLD else "soft"
+    }
+    
+    file_path = _record_path(user_id)
     thread_lock = _get_file_lock(str(file_path))
     
     with thread_lock:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                user_data = json.load(f)
-            
-            # Initialize attention_check_failures list if not exists
-            if 'attention_check_failures' not in user_data:
-                user_data['attention_check_failures'] = []
-            
-            # Record the failure
-            failure_record = {
-                "scene": scene_name,
-                "scene_index": current_idx,
-                "question": attention_data.get('question', ''),
-                "target_rule": attention_data.get('target_rule', ''),
-                "slider_value": int(attention_data.get('slider_value', 50)),
-                "passed": False,
-                "timestamp": datetime.now().isoformat(),
-                "mode": "strict" if current_idx < config.ATTENTION_CHECK_STRICT_THRESHOLD else "soft"
-            }
-            user_data['attention_check_failures'].append(failure_record)
-            
-            # Write
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, indent=2, ensure_ascii=False)
+            if _backend is not None:
+                _backend.append_attention_failure(user_id, failure_record)
+            else:
+                user_data = json_codec.load_file(file_path)
+                
+                # Initialize attention_check_failures list if not exists
+                if 'attention_check_failures' not in user_data:
+                    user_data['attention_check_failures'] = []
+                user_data['attention_check_failures'].append(failure_record)
+                
+                # Write
+                _write_json_atomic(file_path, user_data)
             
+            _log_change(user_id, 'attention_failure')
             print(f"[ATTENTION] Saved failure record for user {user_id} at scene {scene_name}")
             return True
             
@@ -1027,22 +2386,30 @@ def mark_user_terminated(user_id, reason="attention_check_failure"):
     Returns:
         bool: Success status
     """
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
+    file_path = _record_path(user_id)
     thread_lock = _get_file_lock(str(file_path))
+    termination_fields = {
+        "status": 'terminated',
+        "termination_reason": reason,
+        "termination_timestamp": datetime.now().isoformat(),
+        "is_blocked": True
+    }
     
     with thread_lock:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                user_data = json.load(f)
-            
-            user_data['status'] = 'terminated'
-            user_data['termination_reason'] = reason
-            user_data['termination_timestamp'] = datetime.now().isoformat()
-            user_data['is_blocked'] = True
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, indent=2, ensure_ascii=False)
+            if _backend is not None:
+                if not _backend.update_participant(user_id, **termination_fields):
+                    raise FileNotFoundError(f"Participant not found: {user_id}")
+            else:
+                user_data = json_codec.load_file(file_path)
+                
+                user_data.update(termination_fields)
+                
+                _write_json_atomic(file_path, user_data)
+                
+                _update_summary('set_fields', user_id, is_terminated=1)
             
+            _log_change(user_id, 'terminated')
             print(f"[TERMINATED] User {user_id} marked as terminated: {reason}")
             return True
             
@@ -1053,17 +2420,89 @@ def mark_user_terminated(user_id, reason="attention_check_failure"):
 
 def is_user_terminated(user_id):
     """Check if a user is terminated."""
-    file_path = PARTICIPANTS_DIR / f"{user_id}.json"
-    
-    if not file_path.exists():
-        return False
+    if _backend is not None:
+        return _backend.is_terminated(user_id)
     
     try:
-        with safe_file_access(file_path, 'r') as f:
-            if f:
-                user_data = json.load(f)
-                return user_data.get('status') == 'terminated' or user_data.get('is_blocked', False)
+        progress = _cached_progress(user_id)
+        return progress is not None and progress.terminated
     except Exception:
         pass
     
-    return False
\ No newline at end of file
+    return False
+
+
+def save_participant_payment(user_id, payment_info):
+    """
+    Attach payment information to the participant record.
+    
+    Returns:
+        bool: False if the participant does not exist
+    """
+    if _backend is not None:
+        updated = _backend.update_participant(user_id, payment_info=payment_info, payment_submitted=True)
+        if updated:
+            _log_change(user_id, 'payment')
+        return updated
+    
+    file_path = _record_path(user_id)
+    thread_lock = _get_file_lock(str(file_path))
+    
+    with thread_lock:
+        if not file_path.exists():
+            return False
+        
+        participant_data = json_codec.load_file(file_path)
+        
+        participant_data['payment_info'] = payment_info
+        participant_data['payment_submitted'] = True
+        
+        _write_json_atomic(file_path, participant_data)
+    
+    _log_change(user_id, 'payment')
+    return True
+
+
+# ==================== Migration ====================
+
+def migrate_json_to_sqlite(db_path=None):
+    """
+    Import the JSON records, pool state and blocked list into a SQLite database.
+    Safe to re-run: existing rows for the same user_id are replaced.
+    
+    Returns:
+        int: Number of participant records imported
+    """
+    from core.sqlite_backend import SQLiteBackend
+    target = SQLiteBackend(db_path or config.SQLITE_DB_PATH)
+    
+    count = 0
+    for user_file in sorted(_iter_record_files()):
+        try:
+            with _get_file_lock(str(user_file)):
+                record = _read_record(_user_id_from_path(user_file))
+            if record is None:
+                continue
+            record.setdefault('user_id', _user_id_from_path(user_file))
+            target.import_record(record)
+            count += 1
+        except Exception as e:
+            print(f"[MIGRATE] Failed to import {user_file.name}: {e}")
+    
+    # Pool counters + round-robin index
+    if POOL_STATE_FILE.exists() or POOL_STATUS_FILE.exists():
+        with _get_file_lock(POOL_STATE_FILE):
+            state = _load_pool_state_locked(_detect_available_pools())
+        target.import_pool_state(state["pools"], state["last_pool_index"])
+    
+    # Blocked IPs (both legacy string and dict formats)
+    if BLOCKED_FILE.exists():
+        with safe_file_access(BLOCKED_FILE, 'r') as f:
+            blocked = json.load(f)
+        for entry in blocked:
+            if isinstance(entry, str):
+                target.block_ip(entry, None, None)
+            elif isinstance(entry, dict) and entry.get('ip'):
+                target.block_ip(entry['ip'], entry.get('reason'), entry.get('blocked_at'))
+    
+    return count
@@ -0,0 +1,152 @@
+"""
+Pool Statistics
+===============
+Streaming (Welford) mean/variance accumulators per (pool, scene, object).
+
+A participant's slider values are folded in once, when mark_user_completed
+flips is_fully_completed, and folded out again if the participant is
+deleted, so /api/pool_stats/<pool_id> reads precomputed moments instead of
+re-reading every participant file. `rebuild()` recomputes everything from
+the records and must give the same numbers as the full scan.
+"""
+import math
+
+from core.sqlite_backend import SQLiteStore
+
+
+POOL_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pool_object_stats (
+    pool_id   TEXT NOT NULL,
+    scene     TEXT NOT NULL,
+    object_id TEXT NOT NULL,
+    n         INTEGER NOT NULL,
+    mean      REAL NOT NULL,
+    m2        REAL NOT NULL,
+    PRIMARY KEY (pool_id, scene, object_id)
+);
+
+-- Participants already folded into the accumulators (exactly-once guard)
+CREATE TABLE IF NOT EXISTS pool_stats_members (
+    user_id TEXT PRIMARY KEY,
+    pool_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS pool_stats_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def iter_slider_values(record):
+    """Yield (scene, object_id, slider_value) for every countable result of a record."""
+    for experiment in record.get('experiments', []):
+        scene_name = experiment.get('scene')
+        if not scene_name:
+            continue
+        for result in experiment.get('results', []):
+            obj_id = result.get('object_id')
+            slider_val = result.get('slider_value')
+            if obj_id is None or slider_val is None:
+                continue
+            yield scene_name, obj_id, slider_val
+
+
+def format_moments(n, mean, m2):
+    """API shape for one object: sample standard deviation, rounded like the full scan."""
+    std_dev = math.sqrt(max(m2, 0.0) / (n - 1)) if n > 1 else 0.0
+    return {"mean": round(mean, 2), "std_dev": round(std_dev, 2), "n": n}
+
+
+class PoolStatsAccumulator(SQLiteStore):
+    """Persistent Welford accumulators shared by all workers."""
+
+    schema = POOL_STATS_SCHEMA
+
+    def is_built(self):
+        row = self._conn().execute("SELECT value FROM pool_stats_meta WHERE key = 'built'").fetchone()
+        return row is not None
+
+    def _fold(self, conn, pool_id, record, sign):
+        """Add (sign=+1) or remove (sign=-1) one record's values."""
+        for scene, obj_id, value in iter_slider_values(record):
+            row = conn.execute(
+                "SELECT n, mean, m2 FROM pool_object_stats WHERE pool_id = ? AND scene = ? AND object_id = ?",
+                (pool_id, scene, obj_id)).fetchone()
+            n, mean, m2 = (row['n'], row['mean'], row['m2']) if row else (0, 0.0, 0.0)
+
+            if sign > 0:
+                n += 1
+                delta = value - mean
+                mean += delta / n
+                m2 += delta * (value - mean)
+            else:
+                if n <= 1:
+                    conn.execute(
+                        "DELETE FROM pool_object_stats WHERE pool_id = ? AND scene = ? AND object_id = ?",
+                        (pool_id, scene, obj_id))
+                    continue
+                n -= 1
+                delta = value - mean
+                mean -= delta / n
+                m2 -= delta * (value - mean)
+
+            conn.execute(
+                """INSERT OR REPLACE INTO pool_object_stats (pool_id, scene, object_id, n, mean, m2)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (pool_id, scene, obj_id, n, mean, m2))
+
+    def add_record(self, record):
+        """
+        Fold a completed participant into its pool's accumulators.
+
+        Returns:
+            bool: False if the participant was already counted
+        """
+        pool_id = record.get('assigned_pool')
+        if not pool_id:
+            return False
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO pool_stats_members (user_id, pool_id) VALUES (?, ?)",
+                                  (record['user_id'], str(pool_id)))
+            if not cursor.rowcount:
+                return False
+            self._fold(conn, str(pool_id), record, +1)
+            return True
+
+    def remove_record(self, record):
+        """Fold a (deleted) participant back out, if it was counted."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT pool_id FROM pool_stats_members WHERE user_id = ?",
+                               (record['user_id'],)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM pool_stats_members WHERE user_id = ?", (record['user_id'],))
+            self._fold(conn, row['pool_id'], record, -1)
+            return True
+
+    def rebuild(self, completed_records):
+        """Recompute every accumulator from the completed records. Returns the participant count."""
+        count = 0
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM pool_object_stats")
+            conn.execute("DELETE FROM pool_stats_members")
+            for record in completed_records:
+                pool_id = record.get('assigned_pool')
+                if not pool_id:
+                    continue
+                conn.execute("INSERT OR IGNORE INTO pool_stats_members (user_id, pool_id) VALUES (?, ?)",
+                             (record['user_id'], str(pool_id)))
+                self._fold(conn, str(pool_id), record, +1)
+                count += 1
+            conn.execute("INSERT OR REPLACE INTO pool_stats_meta (key, value) VALUES ('built', '1')")
+        return count
+
+    def pool_stats(self, pool_id):
+        """{scene: {object_id: {"mean", "std_dev", "n"}}} for one pool."""
+        result = {}
+        for row in self._conn().execute(
+                "SELECT scene, object_id, n, mean, m2 FROM pool_object_stats WHERE pool_id = ?",
+                (str(pool_id),)):
+            result.setdefault(row['scene'], {})[row['object_id']] = format_moments(row['n'], row['mean'], row['m2'])
+        return result
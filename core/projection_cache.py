@@ -0,0 +1,226 @@
+"""
+Projection Cache
+================
+Content-addressed cache of process_scene_data() results, so rendering a
+scene page does no projection math once its scene has been seen.
+
+    key = sha256(fingerprint, sha256(scene_data.json), camera id,
+                 use_display_mapping, filter_empty_plates, lang)
+
+The fingerprint covers the projection / display code, the translations and
+the display mappings in config, so editing a scene file or any of those
+changes the key and a stale result is never served (old files are simply
+orphaned; delete PROJECTION_CACHE_DIR to reclaim the space).
+
+Two layers:
+    memory  per-worker LRU of PROJECTION_CACHE_ENTRIES results
+    disk    one JSON file per key in PROJECTION_CACHE_DIR, shared by all
+            workers and kept across restarts
+
+Entries are filled lazily on first render, or up front with
+`python manage.py warm-projections`.
+
+Results are shared between requests: treat them as read-only (copy a list
+before inserting into it).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import config
+from core.data_processor import find_camera, process_scene_data
+
+# Bump when the on-disk entry layout changes
+CACHE_VERSION = 1
+
+# Modules whose code decides the projection output
+_SOURCE_FILES = ('data_processor.py', 'projection_util.py', 'translations.py')
+
+
+def _fingerprint():
+    """Hash of everything besides the scene file that process_scene_data output depends on."""
+    h = hashlib.sha256(f"projection-cache-v{CACHE_VERSION}".encode())
+    core_dir = Path(__file__).resolve().parent
+    for name in _SOURCE_FILES:
+        h.update((core_dir / name).read_bytes())
+    settings = [sorted(config.EXCLUDED_TYPES), config.AGENT_BLUEPRINT_MAPPING,
+                config.ROLE_COLORS, config.DISPLAY_CATEGORY_MAPPING]
+    h.update(json.dumps(settings, sort_keys=True, ensure_ascii=False, default=sorted).encode('utf-8'))
+    return h.hexdigest()
+
+
+class ProjectionCache:
+    """Memory LRU in front of a directory of {key}.json result files."""
+
+    def __init__(self, cache_dir, max_entries):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max_entries
+        self.fingerprint = _fingerprint()
+        self._memory = OrderedDict()  # key -> (objects_data, agents_data, agent_labels)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, scene_digest, camera_id, use_display_mapping, filter_empty_plates, lang):
+        parts = [self.fingerprint, scene_digest, str(camera_id),
+                 int(bool(use_display_mapping)), int(bool(filter_empty_plates)), lang]
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Cached result for a key, or None."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+        result = self._read(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self._remember_locked(key, result)
+        return result
+
+    def put(self, key, result):
+        """Store a result in memory and on disk."""
+        with self._lock:
+            self._remember_locked(key, result)
+        self._write(key, result)
+
+    def contains(self, key):
+        """Whether a result is already stored (memory or disk), without loading it."""
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self.cache_dir is not None and (self.cache_dir / f"{key}.json").exists()
+
+    def _remember_locked(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ---------- disk layer ----------
+
+    def _read(self, key):
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_dir / f"{key}.json", 'rb') as f:
+                entry = json.loads(f.read())
+            return entry['objects'], entry['agents'], entry['agent_labels']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # 损坏的条目当作未命中，重新计算后会被覆盖
+            print(f"[PROJECTION] Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def _write(self, key, result):
+        if self.cache_dir is None:
+            return
+        objects_data, agents_data, agent_labels = result
+        # stdlib json: the projected coordinates are numpy float64 (a float subclass)
+        raw = json.dumps({"objects": objects_data, "agents": agents_data, "agent_labels": agent_labels},
+                         separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{key}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(raw)
+                os.replace(tmp_path, self.cache_dir / f"{key}.json")
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            # 磁盘层只是加速，写失败不影响页面
+            print(f"[PROJECTION] Could not persist cache entry {key}: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else None,
+                "cache_dir": str(self.cache_dir) if self.cache_dir else None,
+                "fingerprint": self.fingerprint[:12],
+            }
+
+
+_cache = ProjectionCache(config.PROJECTION_CACHE_DIR, config.PROJECTION_CACHE_ENTRIES)
+
+
+def project_scene(scene_data, camera_data, scene_digest=None, use_display_mapping=True,
+                  filter_empty_plates=True, lang='en'):
+    """
+    process_scene_data() through the cache.
+
+    Args:
+        scene_digest: sha256 of the scene_data.json the data was parsed from
+                      (see scene_data_cache.load_scene_file); None bypasses the cache
+
+    Returns:
+        Tuple of (objects_data, agents_data, agent_labels), shared: read-only
+    """
+    if scene_digest is None:
+        return process_scene_data(scene_data, camera_data, use_display_mapping=use_display_mapping,
+                                  filter_empty_plates=filter_empty_plates, lang=lang)
+
+    key = _cache.key(scene_digest, camera_data.get('id'), use_display_mapping, filter_empty_plates, lang)
+    result = _cache.get(key)
+    if result is None:
+        result = process_scene_data(scene_data, camera_data, use_display_mapping=use_display_mapping,
+                                    filter_empty_plates=filter_empty_plates, lang=lang)
+        _cache.put(key, result)
+    return result
+
+
+def projection_cache_stats():
+    """Hit/miss counters of this worker's projection cache."""
+    return _cache.stats()
+
+
+def warm_projection_cache(langs):
+    """
+    Compute and store every experiment and tutorial page projection not yet on disk.
+
+    Returns:
+        tuple: (computed, already cached, skipped: scenes without their camera)
+    """
+    from core.scene_catalog import get_scene_catalog
+    from core.scene_data_cache import load_scene_file
+
+    catalog = get_scene_catalog()
+    # (场景, 渲染选项): 实验页用显示映射并过滤空盘子，教程页都不用
+    targets = [(scene, True, True) for scene in catalog]
+    targets += [(guide, False, False) for guide in catalog.guides()]
+
+    computed = cached = skipped = 0
+    for scene, use_display_mapping, filter_empty_plates in targets:
+        scene_data, digest = load_scene_file(scene.path)
+        camera_data = find_camera(scene_data, scene.camera_id)
+        if camera_data is None:
+            skipped += 1
+            continue
+        for lang in langs:
+            key = _cache.key(digest, camera_data.get('id'), use_display_mapping, filter_empty_plates, lang)
+            if _cache.contains(key):
+                cached += 1
+                continue
+            _cache.put(key, process_scene_data(scene_data, camera_data, use_display_mapping=use_display_mapping,
+                                               filter_empty_plates=filter_empty_plates, lang=lang))
+            computed += 1
+    return computed, cached, skipped
@@ -0,0 +1,467 @@
+"""
+Scene Catalog
+=============
+In-memory index of question_pool/ (and the tutorial scenes in guide_data/),
+built once per worker instead of walking the pool and batch directories on
+every request.
+
+    question_pool/{pool_id}/{scene_name}/scene_data.json + *.png
+    guide_data/{guide_name}/scene_data.json + *.png|*.jpg
+
+Each scene is stored under (pool, scene name) together with its displayed
+image (first non-TopCamera .png) and camera id, so the participant page,
+image preloading, /api/scenes, pool allocation and the admin dashboard are
+all dictionary lookups.
+
+Sources:
+    scene_manifest.json  written by `python manage.py build-manifest`; loaded
+                         once, the tree is never stat'ed at request time
+    directory scan       when there is no manifest
+
+Hot reload: start_scene_watcher() (called per request by the server; the
+thread is started in the worker that first calls it) polls (stat only) every
+SCENE_WATCH_INTERVAL_S and swaps in a new catalog when scene directories are
+added, removed or changed, re-reading only those scenes; with a manifest it
+reloads when the manifest file is rebuilt. Caches derived from scene files
+subscribe with on_scenes_changed(). Without a watcher, a scan-mode catalog
+is rebuilt when the question_pool directory itself changes (one stat per
+lookup).
+"""
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import config
+
+
+MANIFEST_VERSION = 1
+
+# pool is None for tutorial scenes; data_sha256 only comes from a manifest
+SceneInfo = namedtuple("SceneInfo", ["name", "pool", "path", "image", "camera_id", "data_sha256"],
+                       defaults=(None,))
+
+
+def parse_camera_id(filename):
+    """Camera id of a rendered image: 'Cam_5_rgb.png' -> 'Cam_5'."""
+    name = filename.replace('.png', '').replace('.jpg', '')
+    name = re.sub(r'_(rgb|depth|seg|normal)$', '', name)
+    return name
+
+
+def first_image(scene_path):
+    """Image shown for a scene: first .png by name, skipping the top-down camera."""
+    for img in sorted(Path(scene_path).glob('*.png')):
+        if 'TopCamera' not in img.name:
+            return img.name
+    return None
+
+
+def first_guide_image(guide_path):
+    """Image of a tutorial scene: first .png, else first .jpg."""
+    images = sorted(Path(guide_path).glob('*.png')) or sorted(Path(guide_path).glob('*.jpg'))
+    return images[0].name if images else None
+
+
+def image_url(scene):
+    """URL of a scene's image under the /scenes/ route, or None if it has none."""
+    if scene is None or scene.image is None:
+        return None
+    return f"/scenes/{scene.pool}/{scene.name}/{scene.image}"
+
+
+def _scene_info(path, pool, image, data_sha256=None):
+    return SceneInfo(name=path.name, pool=pool, path=path, image=image,
+                     camera_id=parse_camera_id(image) if image else None, data_sha256=data_sha256)
+
+
+class SceneCatalog:
+    """Immutable snapshot of the scene layout."""
+
+    def __init__(self, root, pools, scenes, guides=(), token=None, manifest=None,
+                 listings=None, scene_tokens=None):
+        self.root = Path(root)
+        # Stat token of the source: question_pool/ for a scan, the manifest file otherwise
+        self.token = token
+        # generated_at of the manifest this catalog was loaded from (None: directory scan)
+        self.manifest = manifest
+        # Every directory directly under root, in name order
+        self.pools = tuple(pools)
+        # Numeric pool directories = the pools participants are allocated to
+        self.pool_ids = tuple(pool for pool in self.pools if pool.isdigit())
+        self._scenes = tuple(scenes)
+        self._by_key = {(scene.pool, scene.name): scene for scene in self._scenes}
+        self._by_name = {}
+        self._by_pool = {pool: [] for pool in self.pools}
+        for scene in self._scenes:
+            self._by_name.setdefault(scene.name, scene)  # first pool wins, as the old linear search did
+            self._by_pool[scene.pool].append(scene.name)
+        self._guides = {guide.name: guide for guide in guides}
+        # Scan mode only: {pool: (dir token, subdirectory names)} and {(pool, name): scene token}
+        self._listings = listings or {}
+        self._scene_tokens = scene_tokens or {}
+
+    @classmethod
+    def scan(cls, root, guide_root=None):
+        """Walk root (and guide_root) once and build the catalog."""
+        guides = [_scene_info(guide_dir, None, first_guide_image(guide_dir))
+                  for guide_dir in _guide_dirs(guide_root)]
+        return cls(root, (), (), guides, token=()).refreshed()[0]
+
+    @classmethod
+    def from_manifest(cls, manifest, root, guide_root, token=None):
+        """Catalog described by a build_manifest() dict; touches no files."""
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported scene manifest version: {manifest.get('version')!r}")
+        root, guide_root = Path(root), Path(guide_root)
+        scenes = [_scene_info(root / entry["pool"] / entry["name"], entry["pool"],
+                              entry["image"]["name"] if entry.get("image") else None,
+                              entry["scene_data"]["sha256"])
+                  for entry in manifest["scenes"]]
+        guides = [_scene_info(guide_root / entry["name"], None,
+                              entry["image"]["name"] if entry.get("image") else None,
+                              entry["scene_data"]["sha256"])
+                  for entry in manifest.get("guides", [])]
+        return cls(root, manifest["pools"], scenes, guides, token=token, manifest=manifest.get("generated_at"))
+
+    def refreshed(self):
+        """
+        Re-stat the tree and apply what changed since this (scan-mode) catalog.
+
+        Unchanged scenes are reused; only added or modified scene directories are
+        read again (a scene's token covers its directory listing and scene_data.json).
+
+        Returns:
+            (catalog, changed): the new catalog (self if nothing moved) and the set of
+            (pool, name) keys that were added, removed or modified
+        """
+        root_token = _stat_token(self.root)
+        if root_token == self.token:
+            pools = self.pools
+        else:
+            pools = tuple(_subdirs(self.root))
+
+        listings, scene_tokens, scenes, changed = {}, {}, [], set()
+        for pool in pools:
+            pool_dir = self.root / pool
+            pool_token = _stat_token(pool_dir)
+            listing = self._listings.get(pool)
+            if listing is None or listing[0] != pool_token:
+                listing = (pool_token, tuple(_subdirs(pool_dir)))
+            listings[pool] = listing
+            for name in listing[1]:
+                key = (pool, name)
+                token = scene_tokens[key] = _scene_token(pool_dir / name)
+                if token is None:
+                    continue  # no scene_data.json (yet)
+                scene = self._by_key.get(key)
+                if scene is None or self._scene_tokens.get(key) != token:
+                    scene = _scene_info(pool_dir / name, pool, first_image(pool_dir / name))
+                    changed.add(key)
+                scenes.append(scene)
+        changed |= self._by_key.keys() - {(scene.pool, scene.name) for scene in scenes}
+
+        if (not changed and root_token == self.token and pools == self.pools
+                and listings == self._listings and scene_tokens == self._scene_tokens):
+            return self, changed
+        return SceneCatalog(self.root, pools, scenes, self._guides.values(), token=root_token,
+                            listings=listings, scene_tokens=scene_tokens), changed
+
+    def __len__(self):
+        return len(self._scenes)
+
+    def __iter__(self):
+        return iter(self._scenes)
+
+    def get(self, name, pool=None):
+        """SceneInfo by name (and pool, if given), or None."""
+        if pool is not None:
+            return self._by_key.get((str(pool), name))
+        return self._by_name.get(name)
+
+    def scenes_in_pool(self, pool_id):
+        """Scene names of one pool, in name order (a new list each call)."""
+        return list(self._by_pool.get(str(pool_id), ()))
+
+    def guide(self, name):
+        """SceneInfo of a tutorial scene (guide_data/<name>), or None."""
+        return self._guides.get(name)
+
+    def guides(self):
+        """All tutorial scenes, in name order."""
+        return sorted(self._guides.values(), key=lambda guide: guide.name)
+
+
+def _stat_token(path):
+    try:
+        st = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _scene_token(scene_dir):
+    """Change token of a scene directory (its listing + scene_data.json), None if it is not a scene."""
+    data_token = _stat_token(scene_dir / config.SCENE_DATA_FILENAME)
+    if data_token is None:
+        return None
+    return _stat_token(scene_dir), data_token
+
+
+def _subdirs(path):
+    """Names of the subdirectories of path, sorted ([] if path is gone)."""
+    try:
+        return sorted(entry.name for entry in os.scandir(path) if entry.is_dir())
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _guide_dirs(guide_root):
+    if guide_root is None or not Path(guide_root).exists():
+        return []
+    return [d for d in sorted(Path(guide_root).iterdir())
+            if d.is_dir() and (d / config.SCENE_DATA_FILENAME).exists()]
+
+
+# ==================== Manifest ====================
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _image_size(path):
+    """
+    (width, height) read from the image header, or None if unrecognised.
+    Sniffs the content, not the suffix: some question_pool *.png files are JPEG data.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(24)
+        if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR':
+            return struct.unpack('>II', header[16:24])
+        if header[:2] != b'\xff\xd8':
+            return None
+        # JPEG: walk the segments up to the start-of-frame marker
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack('>H', length_bytes)[0]
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                height, width = struct.unpack('>HH', frame[1:5])
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _file_entry(path):
+    entry = {"name": path.name, "bytes": path.stat().st_size, "sha256": _sha256(path)}
+    size = _image_size(path)
+    if size is not None:
+        entry["width"], entry["height"] = size
+    return entry
+
+
+def _manifest_scene(scene_dir, image):
+    return {
+        "name": scene_dir.name,
+        "image": _file_entry(scene_dir / image) if image else None,
+        "scene_data": _file_entry(scene_dir / config.SCENE_DATA_FILENAME),
+    }
+
+
+def build_manifest(root=None, guide_root=None):
+    """
+    Walk question_pool/ and guide_data/ once and describe them.
+
+    Returns:
+        dict: {"version", "generated_at", "pools", "scenes", "guides"}; each scene has
+        pool, name, the chosen image (name, bytes, sha256, width, height) and the
+        scene_data.json size + sha256
+    """
+    root = Path(root or config.SCENES_ROOT)
+    guide_root = Path(guide_root or config.GUIDE_ROOT)
+    catalog = SceneCatalog.scan(root, guide_root)
+    scenes = []
+    for scene in catalog:
+        entry = _manifest_scene(scene.path, scene.image)
+        entry["pool"] = scene.pool
+        scenes.append(entry)
+    return {
+        "version": MANIFEST_VERSION,
+        "generated_at": datetime.now().isoformat(),
+        "pools": list(catalog.pools),
+        "scenes": scenes,
+        "guides": [_manifest_scene(guide_dir, first_guide_image(guide_dir)) for guide_dir in _guide_dirs(guide_root)],
+    }
+
+
+def write_manifest(manifest, path=None):
+    """Atomically write a manifest (default: config.SCENE_MANIFEST_FILE)."""
+    path = Path(path or config.SCENE_MANIFEST_FILE)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return path
+
+
+# ==================== Worker Catalog ====================
+# 每个 worker 一份 catalog。_SceneWatcher 线程定期 stat 轮询 question_pool (或 manifest 文件)，
+# 只重新读取增删改过的场景目录，然后整体替换 _catalog (读者拿到的永远是完整快照)，
+# 再通知 on_scenes_changed 注册的派生缓存。
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_listeners = []
+_watcher = None
+
+
+def get_scene_catalog():
+    """This worker's catalog: the manifest if there is one, else a scan of config.SCENES_ROOT."""
+    catalog = _catalog
+    # With a manifest or a running watcher nothing is stat'ed here
+    if catalog is not None and (catalog.manifest is not None or scene_watcher_active()
+                                or catalog.token == _stat_token(config.SCENES_ROOT)):
+        return catalog
+    with _catalog_lock:
+        catalog = _catalog
+        if catalog is None or (catalog.manifest is None and catalog.token != _stat_token(config.SCENES_ROOT)):
+            catalog = _load_locked()
+        return catalog
+
+
+def reload_scene_catalog():
+    """Reload the manifest / rescan the tree and swap the new catalog in."""
+    with _catalog_lock:
+        catalog = _load_locked()
+    _notify(None)
+    return catalog
+
+
+def on_scenes_changed(callback):
+    """
+    Register callback(changed) for caches derived from scene files. Called after a new
+    catalog is swapped in; changed is a set of (pool, name) keys, or None for a full reload.
+    """
+    _listeners.append(callback)
+
+
+def poll_scene_catalog():
+    """
+    One watcher pass. Rescans only what changed (or reloads a rebuilt manifest).
+
+    Returns:
+        set of changed (pool, name) keys, or None after a full reload
+    """
+    global _catalog
+    with _catalog_lock:
+        catalog = _catalog
+        manifest_token = _stat_token(config.SCENE_MANIFEST_FILE)
+        if catalog is None or catalog.manifest is not None or manifest_token is not None:
+            if catalog is not None and catalog.manifest is not None and catalog.token == manifest_token:
+                return set()
+            _load_locked()
+            changed = None
+        else:
+            new_catalog, changed = catalog.refreshed()
+            if new_catalog is catalog:
+                return changed
+            _catalog = new_catalog
+            if changed:
+                print(f"[CATALOG] Reloaded {len(changed)} changed scene(s); {len(new_catalog)} scenes "
+                      f"in {len(new_catalog.pool_ids)} pools")
+    if changed is None or changed:
+        _notify(changed)
+    return changed
+
+
+def _notify(changed):
+    for callback in list(_listeners):
+        try:
+            callback(changed)
+        except Exception as e:
+            print(f"[CATALOG] Scene change listener failed: {e}")
+
+
+def _load_locked():
+    global _catalog
+    manifest_file = config.SCENE_MANIFEST_FILE
+    manifest_token = _stat_token(manifest_file)
+    if manifest_token is not None:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            catalog = SceneCatalog.from_manifest(json.load(f), config.SCENES_ROOT, config.GUIDE_ROOT,
+                                                 token=manifest_token)
+        source = f"manifest {manifest_file.name} ({catalog.manifest})"
+    else:
+        catalog = SceneCatalog.scan(config.SCENES_ROOT, config.GUIDE_ROOT)
+        source = "directory scan"
+    _catalog = catalog
+    print(f"[CATALOG] Indexed {len(catalog)} scenes in {len(catalog.pool_ids)} pools from {source}")
+    return catalog
+
+
+class _SceneWatcher:
+    """Daemon thread running poll_scene_catalog() every `interval` seconds."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="scene-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                poll_scene_catalog()
+            except Exception as e:
+                print(f"[CATALOG] Scene watcher pass failed: {e}")
+
+
+def scene_watcher_active():
+    """Whether this process runs a watcher (one inherited over fork() has no thread here)."""
+    watcher = _watcher
+    return watcher is not None and watcher.pid == os.getpid()
+
+
+def start_scene_watcher(interval=None):
+    """
+    Start this worker's watcher (once per process; interval defaults to
+    config.SCENE_WATCH_INTERVAL_S, 0 = off). Cheap to call on every request.
+    """
+    global _watcher
+    if scene_watcher_active():
+        return _watcher
+    interval = config.SCENE_WATCH_INTERVAL_S if interval is None else interval
+    if interval <= 0:
+        return None
+    with _catalog_lock:
+        if not scene_watcher_active():
+            _watcher = _SceneWatcher(interval)
+    return _watcher
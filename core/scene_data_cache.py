@@ -0,0 +1,166 @@
+"""
+Scene Data Cache
+================
+Bounded LRU of parsed scene_data.json files, shared by the experiment page
+and the tutorial, so the participants of a pool (who all see the same ~24
+scenes) parse each file once per worker instead of on every page render.
+
+While this worker's scene watcher runs, question_pool entries are served
+without touching the file: the watcher drops them when their scene changes.
+Otherwise (no watcher, and always for the tutorial scenes, which it does not
+watch) entries are validated against the file's (inode, mtime_ns, size) on
+every lookup.
+The cap is on the approximate in-memory size of the parsed objects
+(SCENE_DATA_CACHE_MB); least recently used scenes are evicted first.
+
+Each entry also keeps the sha256 of the file bytes, the content address the
+projection cache keys on.
+
+Cached objects are shared between requests: treat them as read-only.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import config
+from core.scene_catalog import on_scenes_changed, scene_watcher_active
+
+
+def _approx_size(obj):
+    """Approximate memory held by a parsed JSON value (containers + leaves)."""
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return total
+
+
+class SceneDataCache:
+    """Thread-safe LRU {path: parsed JSON} with a memory cap and hit/miss counters."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> (stat token, data, sha256, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, path, validate=True):
+        """
+        Parsed contents of a JSON file, from the cache if the file is unchanged.
+
+        Args:
+            validate: stat the file to check a cached entry; False trusts the entry
+                      (the caller invalidates it when the file changes)
+
+        Returns:
+            tuple: (data, sha256 hex digest of the file)
+
+        Raises:
+            FileNotFoundError / json.JSONDecodeError like json.load on the file
+        """
+        key = os.fspath(path)
+        if not validate:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], entry[2]
+        st = os.stat(key)
+        token = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        with open(key, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        digest = hashlib.sha256(raw).hexdigest()
+        size = _approx_size(data)
+
+        with self._lock:
+            self._discard_locked(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (token, data, digest, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.bytes -= evicted[3]
+                    self.evictions += 1
+        return data, digest
+
+    def invalidate(self, path=None):
+        """Drop one file (or everything)."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.bytes = 0
+            else:
+                self._discard_locked(os.fspath(path))
+
+    def _discard_locked(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[3]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+_cache = SceneDataCache(int(config.SCENE_DATA_CACHE_MB * 1024 * 1024))
+_scenes_root = os.path.abspath(config.SCENES_ROOT)
+
+
+def load_scene_file(scene_dir):
+    """(parsed scene_data.json, its sha256) of a scene (or tutorial) directory, cached. Read-only."""
+    scene_dir = os.path.abspath(scene_dir)
+    # question_pool/{pool}/{scene} 由 watcher 负责失效; 教程场景不在它的监视范围内
+    watched = os.path.dirname(os.path.dirname(scene_dir)) == _scenes_root and scene_watcher_active()
+    return _cache.load(os.path.join(scene_dir, config.SCENE_DATA_FILENAME), validate=not watched)
+
+
+def load_scene_data(scene_dir):
+    """Parsed scene_data.json of a scene (or tutorial) directory, cached. Read-only."""
+    return load_scene_file(scene_dir)[0]
+
+
+def scene_data_cache_stats():
+    """Hit/miss counters and memory use of this worker's cache."""
+    return _cache.stats()
+
+
+def _on_scenes_changed(changed):
+    if changed is None:
+        _cache.invalidate()
+        return
+    for pool, name in changed:
+        _cache.invalidate(os.path.join(_scenes_root, pool, name, config.SCENE_DATA_FILENAME))
+
+
+on_scenes_changed(_on_scenes_changed)
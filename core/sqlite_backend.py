@@ -0,0 +1,612 @@
+"""
+SQLite Backend
+==============
+Optional SQLite storage for participant data (enabled with STORAGE_BACKEND=sqlite).
+The public functions in ownership_manager keep their signatures and dispatch here.
+
+Tables:
+    participants  - one row per user (record header + JSON for free-form fields)
+    experiments   - one row per (user, scene) with the scene's results as JSON
+    pool_status   - started/completed counters per pool
+    pool_state    - key/value allocator state (last_pool_index)
+    blocked_ips   - blocked IP addresses
+
+The database runs in WAL mode so readers never block the writer, and every
+read-modify-write happens inside a single BEGIN IMMEDIATE transaction, which
+serializes writers across threads *and* gunicorn worker processes.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    user_id             TEXT PRIMARY KEY,
+    participant_id_norm TEXT,
+    start_time          TEXT,
+    assigned_pool       TEXT,
+    status              TEXT,
+    is_blocked          INTEGER NOT NULL DEFAULT 0,
+    is_fully_completed  INTEGER NOT NULL DEFAULT 0,
+    demographics        TEXT NOT NULL DEFAULT '{}',
+    scene_order         TEXT NOT NULL DEFAULT '[]',
+    extra               TEXT NOT NULL DEFAULT '{}',
+    completed_count     INTEGER NOT NULL DEFAULT 0,
+    admin_status        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_participants_pid ON participants(participant_id_norm);
+CREATE INDEX IF NOT EXISTS idx_participants_pool ON participants(assigned_pool, is_fully_completed);
+
+CREATE TABLE IF NOT EXISTS experiments (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id         TEXT NOT NULL,
+    scene           TEXT NOT NULL,
+    save_timestamp  TEXT,
+    duration_ms     INTEGER,
+    results         TEXT NOT NULL DEFAULT '[]',
+    attention_check TEXT,
+    UNIQUE (user_id, scene)
+);
+
+CREATE TABLE IF NOT EXISTS pool_status (
+    pool_id   TEXT PRIMARY KEY,
+    started   INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS pool_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS blocked_ips (
+    ip         TEXT PRIMARY KEY,
+    reason     TEXT,
+    blocked_at TEXT
+);
+"""
+
+# Record keys stored in dedicated columns; everything else goes to `extra`
+_COLUMN_KEYS = {
+    "user_id", "start_time", "assigned_pool", "status", "is_blocked",
+    "is_fully_completed", "demographics", "scene_order",
+}
+# Keys derived from the experiments table, never stored in `extra`
+_DERIVED_KEYS = {"experiments", "completed_scenes"}
+
+
+# Admin table: participants.completed_count / admin_status (the status label of
+# summary_index.participant_status) are kept up to date by triggers, so the
+# status filter and sort are indexed columns instead of per-row subqueries.
+_STATUS_SQL = """CASE WHEN assigned_pool IS NULL THEN 'Tutorial'
+                      WHEN is_fully_completed THEN 'Completed'
+                      WHEN completed_count > 0 THEN 'In-Progress'
+                      ELSE 'Abandoned' END"""
+
+ADMIN_SCHEMA = f"""
+CREATE INDEX IF NOT EXISTS idx_participants_status_user ON participants(admin_status, user_id);
+CREATE INDEX IF NOT EXISTS idx_participants_status_start ON participants(admin_status, start_time, user_id);
+CREATE INDEX IF NOT EXISTS idx_participants_pool_user ON participants(assigned_pool, user_id);
+CREATE INDEX IF NOT EXISTS idx_participants_pool_start ON participants(assigned_pool, start_time, user_id);
+CREATE INDEX IF NOT EXISTS idx_participants_start ON participants(start_time, user_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_experiments_insert AFTER INSERT ON experiments BEGIN
+    UPDATE participants SET completed_count = completed_count + 1 WHERE user_id = NEW.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_experiments_delete AFTER DELETE ON experiments BEGIN
+    UPDATE participants SET completed_count = completed_count - 1 WHERE user_id = OLD.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_participants_insert AFTER INSERT ON participants BEGIN
+    UPDATE participants SET admin_status = {_STATUS_SQL} WHERE user_id = NEW.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_participants_status
+AFTER UPDATE OF assigned_pool, is_fully_completed, completed_count ON participants BEGIN
+    UPDATE participants SET admin_status = {_STATUS_SQL} WHERE user_id = NEW.user_id;
+END;
+"""
+
+_SORT_SQL = {"user_id": "p.user_id", "start_time": "p.start_time", "pool": "p.assigned_pool", "status": "p.admin_status"}
+
+
+def normalize_participant_id(participant_id):
+    """Normalized form used for duplicate-ID checks (empty -> None)."""
+    normalized = (participant_id or '').lower().strip()
+    return normalized or None
+
+
+def like_pattern(text):
+    """Substring LIKE pattern for `text` (use with ESCAPE '\\')."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+class SQLiteStore:
+    """
+    Base class for SQLite-backed stores: per-thread WAL connections
+    and an immediate-mode write transaction helper.
+    """
+
+    schema = ""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self.schema)
+
+    # ---------- connection / transaction helpers ----------
+
+    def _conn(self):
+        """Per-thread connection (sqlite3 connections must not be shared)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction; takes the database write lock up front."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class SQLiteBackend(SQLiteStore):
+    """Participant storage in a single SQLite database file."""
+
+    schema = SCHEMA
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self._add_admin_columns()
+        self._conn().executescript(ADMIN_SCHEMA)
+
+    def _add_admin_columns(self):
+        """Add and backfill completed_count / admin_status in a database created before they existed."""
+        with self._transaction() as conn:
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(participants)")}
+            if 'admin_status' in columns:
+                return
+            conn.execute("ALTER TABLE participants ADD COLUMN completed_count INTEGER NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE participants ADD COLUMN admin_status TEXT")
+            conn.execute("""UPDATE participants SET completed_count =
+                            (SELECT COUNT(*) FROM experiments e WHERE e.user_id = participants.user_id)""")
+            conn.execute(f"UPDATE participants SET admin_status = {_STATUS_SQL}")
+
+    # ---------- participants ----------
+
+    def participant_exists(self, user_id):
+        row = self._conn().execute(
+            "SELECT 1 FROM participants WHERE user_id = ?", (user_id,)).fetchone()
+        return row is not None
+
+    def participant_id_exists(self, participant_id):
+        normalized = normalize_participant_id(participant_id)
+        if normalized is None:
+            return False
+        row = self._conn().execute(
+            "SELECT 1 FROM participants WHERE participant_id_norm = ? LIMIT 1",
+            (normalized,)).fetchone()
+        return row is not None
+
+    def create_participant(self, data):
+        """
+        Insert a new participant record.
+
+        Raises:
+            ValueError: If the participant_id is already taken
+        """
+        participant_id = data.get('demographics', {}).get('participant_id', '')
+        normalized = normalize_participant_id(participant_id)
+        with self._transaction() as conn:
+            if normalized is not None and conn.execute(
+                    "SELECT 1 FROM participants WHERE participant_id_norm = ? LIMIT 1",
+                    (normalized,)).fetchone():
+                raise ValueError(f"Participant ID '{participant_id}' already exists. Please use a different ID.")
+            self._insert_participant(conn, data)
+
+    def _insert_participant(self, conn, data):
+        participant_id = data.get('demographics', {}).get('participant_id', '')
+        extra = {k: v for k, v in data.items() if k not in _COLUMN_KEYS and k not in _DERIVED_KEYS}
+        conn.execute(
+            """INSERT INTO participants
+               (user_id, participant_id_norm, start_time, assigned_pool, status, is_blocked,
+                is_fully_completed, demographics, scene_order, extra)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                data['user_id'],
+                normalize_participant_id(participant_id),
+                data.get('start_time'),
+                data.get('assigned_pool'),
+                data.get('status'),
+                int(bool(data.get('is_blocked', False))),
+                int(bool(data.get('is_fully_completed', False))),
+                json.dumps(data.get('demographics', {}), ensure_ascii=False),
+                json.dumps(data.get('scene_order', []), ensure_ascii=False),
+                json.dumps(extra, ensure_ascii=False),
+            ))
+
+    def update_participant(self, user_id, **fields):
+        """
+        Update record fields; unknown keys are merged into `extra`.
+
+        Returns:
+            bool: False if the participant does not exist
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT extra FROM participants WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                return False
+
+            assignments = []
+            params = []
+            extra = json.loads(row['extra'])
+            extra_changed = False
+            for key, value in fields.items():
+                if key in ('demographics', 'scene_order'):
+                    assignments.append(f"{key} = ?")
+                    params.append(json.dumps(value, ensure_ascii=False))
+                elif key in ('is_blocked', 'is_fully_completed'):
+                    assignments.append(f"{key} = ?")
+                    params.append(int(bool(value)))
+                elif key in ('start_time', 'assigned_pool', 'status'):
+                    assignments.append(f"{key} = ?")
+                    params.append(value)
+                else:
+                    extra[key] = value
+                    extra_changed = True
+            if extra_changed:
+                assignments.append("extra = ?")
+                params.append(json.dumps(extra, ensure_ascii=False))
+
+            if assignments:
+                conn.execute(
+                    f"UPDATE participants SET {', '.join(assignments)} WHERE user_id = ?",
+                    params + [user_id])
+            return True
+
+    def _row_to_record(self, row, experiments):
+        record = {
+            "user_id": row['user_id'],
+            "start_time": row['start_time'],
+            "assigned_pool": row['assigned_pool'],
+            "demographics": json.loads(row['demographics']),
+            "scene_order": json.loads(row['scene_order']),
+            "completed_scenes": [exp['scene'] for exp in experiments],
+            "experiments": experiments,
+            "is_fully_completed": bool(row['is_fully_completed']),
+        }
+        if row['status'] is not None:
+            record['status'] = row['status']
+        if row['is_blocked']:
+            record['is_blocked'] = True
+        record.update(json.loads(row['extra']))
+        return record
+
+    def _load_experiments(self, conn, user_id):
+        experiments = []
+        for exp in conn.execute(
+                """SELECT scene, save_timestamp, duration_ms, results, attention_check
+                   FROM experiments WHERE user_id = ? ORDER BY id""", (user_id,)):
+            entry = {
+                "scene": exp['scene'],
+                "save_timestamp": exp['save_timestamp'],
+                "duration_ms": exp['duration_ms'],
+                "results": json.loads(exp['results']),
+            }
+            if exp['attention_check'] is not None:
+                entry['attention_check'] = json.loads(exp['attention_check'])
+            experiments.append(entry)
+        return experiments
+
+    def load_record(self, user_id):
+        """Full participant record in the same shape as the JSON files, or None."""
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM participants WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        return self._row_to_record(row, self._load_experiments(conn, user_id))
+
+    def iter_records(self, pool_id=None, completed_only=False):
+        """Yield full records, optionally filtered by pool / completion."""
+        conn = self._conn()
+        query = "SELECT * FROM participants WHERE 1 = 1"
+        params = []
+        if pool_id is not None:
+            query += " AND assigned_pool = ?"
+            params.append(str(pool_id))
+        if completed_only:
+            query += " AND is_fully_completed = 1"
+        for row in conn.execute(query + " ORDER BY user_id", params).fetchall():
+            yield self._row_to_record(row, self._load_experiments(conn, row['user_id']))
+
+    def all_user_ids(self):
+        return [row['user_id'] for row in self._conn().execute(
+            "SELECT user_id FROM participants ORDER BY user_id")]
+
+    def get_progress(self, user_id):
+        """(scene_order, completed_scenes, assigned_pool) without loading any results, or None."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT scene_order, assigned_pool FROM participants WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        completed = [r['scene'] for r in conn.execute(
+            "SELECT scene FROM experiments WHERE user_id = ? ORDER BY id", (user_id,))]
+        return json.loads(row['scene_order']), completed, row['assigned_pool']
+
+    def participant_summaries(self, limit=50, offset=0, status=None, pool=None, q=None,
+                              sort="start_time", descending=True):
+        """
+        One page of rows for the admin table; same arguments as ParticipantSummaryIndex.page.
+
+        Returns:
+            (rows, total): the page and the number of matching participants
+        """
+        where, params = [], []
+        if status:
+            where.append("p.admin_status = ?")
+            params.append(status)
+        if pool:
+            where.append("p.assigned_pool = ?")
+            params.append(pool)
+        if q:
+            where.append("(p.user_id LIKE ? ESCAPE '\\' OR p.participant_id_norm LIKE ? ESCAPE '\\')")
+            params += [like_pattern(q)] * 2
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        direction = "DESC" if descending else "ASC"
+        column = _SORT_SQL[sort]
+        order = f"{column} {direction}, p.user_id {direction}" if sort != "user_id" else f"p.user_id {direction}"
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM participants p {clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"""SELECT p.user_id, p.assigned_pool, p.scene_order, p.is_fully_completed,
+                       p.start_time, p.demographics, p.completed_count
+                FROM participants p {clause} ORDER BY {order} LIMIT ? OFFSET ?""",
+            params + [limit, offset]).fetchall()
+        return [{
+            "user_id": row['user_id'],
+            "assigned_pool": row['assigned_pool'],
+            "completed_count": row['completed_count'],
+            "total_count": len(json.loads(row['scene_order'])),
+            "is_fully_completed": bool(row['is_fully_completed']),
+            "start_time": row['start_time'],
+            "demographics": json.loads(row['demographics']),
+        } for row in rows], total
+
+    def save_scene_entry(self, user_id, entry):
+        """
+        Upsert one scene's results (row-level write). A resubmitted scene is
+        deleted and re-inserted, so like on the JSON path it moves to the end.
+
+        Returns:
+            dict: {"status": "success"} or {"status": "rejected", "reason": str}
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT status, is_blocked FROM participants WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"Participant not found: {user_id}")
+            if row['status'] == 'terminated':
+                return {"status": "rejected", "reason": "User already terminated"}
+            if row['is_blocked']:
+                return {"status": "rejected", "reason": "User is blocked"}
+
+            attention_check = entry.get('attention_check')
+            # completed_count 由触发器维护: 删除 -1、插入 +1
+            conn.execute("DELETE FROM experiments WHERE user_id = ? AND scene = ?", (user_id, entry['scene']))
+            conn.execute(
+                """INSERT INTO experiments
+                   (user_id, scene, save_timestamp, duration_ms, results, attention_check)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    user_id, entry['scene'], entry.get('save_timestamp'), entry.get('duration_ms'),
+                    json.dumps(entry.get('results', []), ensure_ascii=False),
+                    json.dumps(attention_check, ensure_ascii=False) if attention_check is not None else None,
+                ))
+        return {"status": "success"}
+
+    def append_attention_failure(self, user_id, failure_record):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT extra FROM participants WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"Participant not found: {user_id}")
+            extra = json.loads(row['extra'])
+            extra.setdefault('attention_check_failures', []).append(failure_record)
+            conn.execute("UPDATE participants SET extra = ? WHERE user_id = ?",
+                         (json.dumps(extra, ensure_ascii=False), user_id))
+
+    def is_terminated(self, user_id):
+        row = self._conn().execute(
+            "SELECT status, is_blocked FROM participants WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return False
+        return row['status'] == 'terminated' or bool(row['is_blocked'])
+
+    def mark_completed(self, user_id):
+        """
+        Flip is_fully_completed and bump the pool's completed counter atomically.
+
+        Returns:
+            (pool_id, newly_marked), or (None, False) if the user does not exist
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT assigned_pool, is_fully_completed FROM participants WHERE user_id = ?",
+                (user_id,)).fetchone()
+            if row is None:
+                return None, False
+            pool_id = row['assigned_pool']
+            if row['is_fully_completed']:
+                return pool_id, False
+            conn.execute("UPDATE participants SET is_fully_completed = 1 WHERE user_id = ?", (user_id,))
+            if pool_id:
+                conn.execute("UPDATE pool_status SET completed = completed + 1 WHERE pool_id = ?", (pool_id,))
+            return pool_id, True
+
+    def delete_participant(self, user_id):
+        """
+        Delete a participant, its results and its pool contribution.
+
+        Returns:
+            (pool_id, was_completed), or None if the user does not exist
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT assigned_pool, is_fully_completed FROM participants WHERE user_id = ?",
+                (user_id,)).fetchone()
+            if row is None:
+                return None
+            pool_id = row['assigned_pool']
+            was_completed = bool(row['is_fully_completed'])
+            conn.execute("DELETE FROM experiments WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM participants WHERE user_id = ?", (user_id,))
+            if pool_id:
+                conn.execute(
+                    """UPDATE pool_status SET started = MAX(0, started - 1),
+                       completed = MAX(0, completed - ?) WHERE pool_id = ?""",
+                    (1 if was_completed else 0, pool_id))
+            return pool_id, was_completed
+
+    # ---------- pools ----------
+
+    def _ensure_pools(self, conn, available_pools):
+        conn.executemany(
+            "INSERT OR IGNORE INTO pool_status (pool_id, started, completed) VALUES (?, 0, 0)",
+            [(pid,) for pid in available_pools])
+
+    def _read_pool_status(self, conn):
+        return {row['pool_id']: {"started": row['started'], "completed": row['completed']}
+                for row in conn.execute("SELECT pool_id, started, completed FROM pool_status")}
+
+    def get_pool_status(self, available_pools):
+        """Pool counters. A plain read; the write lock is only taken to add pools the table lacks."""
+        status = self._read_pool_status(self._conn())
+        if any(pid not in status for pid in available_pools):
+            with self._transaction() as conn:
+                self._ensure_pools(conn, available_pools)
+                status = self._read_pool_status(conn)
+        return status
+
+    def update_pool_status(self, pool_id, action="started"):
+        if action not in ("started", "completed"):
+            raise ValueError(f"Unknown pool action: {action}")
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE pool_status SET {action} = {action} + 1 WHERE pool_id = ?",
+                         (str(pool_id),))
+
+    def reset_pool_status(self, available_pools):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM pool_status")
+            self._ensure_pools(conn, available_pools)
+            conn.execute("INSERT OR REPLACE INTO pool_state (key, value) VALUES ('last_pool_index', '-1')")
+            return self._read_pool_status(conn)
+
+    def allocate_pool(self, available_pools, choose_pool):
+        """
+        Pick a pool and count it as started in one transaction.
+
+        Args:
+            available_pools: Pool ids detected on disk
+            choose_pool: callable(status, last_index) -> (pool_id, new_index or None)
+
+        Returns:
+            (pool_id, status snapshot used for the decision)
+        """
+        with self._transaction() as conn:
+            self._ensure_pools(conn, available_pools)
+            status = self._read_pool_status(conn)
+            row = conn.execute("SELECT value FROM pool_state WHERE key = 'last_pool_index'").fetchone()
+            last_index = int(row['value']) if row else -1
+
+            best_pool, new_index = choose_pool(status, last_index)
+            if new_index is not None:
+                conn.execute("INSERT OR REPLACE INTO pool_state (key, value) VALUES ('last_pool_index', ?)",
+                             (str(new_index),))
+            conn.execute("UPDATE pool_status SET started = started + 1 WHERE pool_id = ?", (best_pool,))
+            return best_pool, status
+
+    # ---------- blocked IPs ----------
+
+    def blocked_list_detailed(self):
+        return [{"ip": row['ip'], "reason": row['reason'], "blocked_at": row['blocked_at']}
+                for row in self._conn().execute("SELECT ip, reason, blocked_at FROM blocked_ips ORDER BY rowid")]
+
+    def _bump_blocked_version(self, conn):
+        conn.execute(
+            """INSERT INTO pool_state (key, value) VALUES ('blocked_version', '1')
+               ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1""")
+
+    def blocked_version(self):
+        """Change counter for blocked_ips (lets workers cache the blocked set)."""
+        row = self._conn().execute("SELECT value FROM pool_state WHERE key = 'blocked_version'").fetchone()
+        return row['value'] if row else '0'
+
+    def block_ip(self, ip_address, reason, blocked_at):
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO blocked_ips (ip, reason, blocked_at) VALUES (?, ?, ?)",
+                                  (ip_address, reason, blocked_at))
+            if cursor.rowcount:
+                self._bump_blocked_version(conn)
+
+    def unblock_ip(self, ip_address):
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM blocked_ips WHERE ip = ?", (ip_address,))
+            if cursor.rowcount:
+                self._bump_blocked_version(conn)
+            return cursor.rowcount > 0
+
+    # ---------- migration ----------
+
+    def import_record(self, data):
+        """
+        Import (or replace) a full JSON-shaped participant record.
+        Used by `python manage.py migrate-sqlite`.
+        """
+        user_id = data['user_id']
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM experiments WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM participants WHERE user_id = ?", (user_id,))
+            self._insert_participant(conn, data)
+            for exp in data.get('experiments', []):
+                attention_check = exp.get('attention_check')
+                conn.execute(
+                    """INSERT OR REPLACE INTO experiments
+                       (user_id, scene, save_timestamp, duration_ms, results, attention_check)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (
+                        user_id, exp.get('scene'), exp.get('save_timestamp'), exp.get('duration_ms'),
+                        json.dumps(exp.get('results', []), ensure_ascii=False),
+                        json.dumps(attention_check, ensure_ascii=False) if attention_check is not None else None,
+                    ))
+            # INSERT OR REPLACE of a repeated scene does not fire the delete trigger: recount
+            conn.execute(
+                """UPDATE participants SET completed_count =
+                   (SELECT COUNT(*) FROM experiments WHERE user_id = ?) WHERE user_id = ?""",
+                (user_id, user_id))
+
+    def import_pool_state(self, pool_status, last_pool_index):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM pool_status")
+            conn.executemany(
+                "INSERT INTO pool_status (pool_id, started, completed) VALUES (?, ?, ?)",
+                [(str(pid), s.get('started', 0), s.get('completed', 0)) for pid, s in pool_status.items()])
+            conn.execute("INSERT OR REPLACE INTO pool_state (key, value) VALUES ('last_pool_index', ?)",
+                         (str(last_pool_index),))
@@ -0,0 +1,209 @@
+"""
+Summary Index
+=============
+Materialized admin summary for the JSON storage backend.
+
+One row per participant (user_id, pool, completed/total counts, status,
+start_time, ...) kept in participants_data/summary.db and updated by every
+state-changing call in ownership_manager, so the admin dashboard and
+/api/pool_status query an indexed table instead of parsing every record.
+Pages use LIMIT/OFFSET: SQLite still steps over the skipped index entries,
+so a page costs O(offset + page size) and the total is a COUNT over all
+matching entries; cheap at this table's size, but not constant.
+Recreate it from the records with `python manage.py rebuild-summary`.
+"""
+import json
+
+from core.sqlite_backend import SQLiteStore, like_pattern
+
+
+SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS participant_summary (
+    user_id            TEXT PRIMARY KEY,
+    participant_id     TEXT,
+    pool               TEXT,
+    completed          INTEGER NOT NULL DEFAULT 0,
+    total              INTEGER NOT NULL DEFAULT 0,
+    is_fully_completed INTEGER NOT NULL DEFAULT 0,
+    is_terminated      INTEGER NOT NULL DEFAULT 0,
+    status             TEXT NOT NULL,
+    start_time         TEXT,
+    demographics       TEXT NOT NULL DEFAULT '{}'
+);
+-- (filter, sort key) pairs so a filtered admin page in user_id or start_time order
+-- is read straight off an index
+CREATE INDEX IF NOT EXISTS idx_summary_status_user ON participant_summary(status, user_id);
+CREATE INDEX IF NOT EXISTS idx_summary_status_start ON participant_summary(status, start_time, user_id);
+CREATE INDEX IF NOT EXISTS idx_summary_pool_user ON participant_summary(pool, user_id);
+CREATE INDEX IF NOT EXISTS idx_summary_pool_start ON participant_summary(pool, start_time, user_id);
+CREATE INDEX IF NOT EXISTS idx_summary_start ON participant_summary(start_time, user_id);
+
+-- Distinct completed scenes, so repeated submissions don't double count
+CREATE TABLE IF NOT EXISTS summary_scenes (
+    user_id TEXT NOT NULL,
+    scene   TEXT NOT NULL,
+    PRIMARY KEY (user_id, scene)
+);
+
+CREATE TABLE IF NOT EXISTS summary_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+PARTICIPANT_STATUSES = ("Tutorial", "Completed", "In-Progress", "Abandoned")
+
+# Admin table sort keys -> summary columns
+SORT_COLUMNS = {"user_id": "user_id", "start_time": "start_time", "pool": "pool", "status": "status"}
+
+
+def participant_status(pool, is_completed, completed_count):
+    """Status label shown in the admin participants table."""
+    if pool is None:
+        return "Tutorial"
+    elif is_completed:
+        return "Completed"
+    elif completed_count > 0:
+        return "In-Progress"
+    else:
+        return "Abandoned"
+
+
+class ParticipantSummaryIndex(SQLiteStore):
+    """Incrementally maintained participant summary rows."""
+
+    schema = SUMMARY_SCHEMA
+
+    def is_built(self):
+        row = self._conn().execute("SELECT value FROM summary_meta WHERE key = 'built'").fetchone()
+        return row is not None
+
+    def _refresh_status(self, conn, user_id):
+        row = conn.execute(
+            "SELECT pool, is_fully_completed, completed FROM participant_summary WHERE user_id = ?",
+            (user_id,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE participant_summary SET status = ? WHERE user_id = ?",
+                         (participant_status(row['pool'], row['is_fully_completed'], row['completed']), user_id))
+
+    def _upsert_record(self, conn, record):
+        user_id = record['user_id']
+        completed_scenes = record.get('completed_scenes', [])
+        demographics = record.get('demographics', {})
+        conn.execute("DELETE FROM summary_scenes WHERE user_id = ?", (user_id,))
+        conn.executemany("INSERT OR IGNORE INTO summary_scenes (user_id, scene) VALUES (?, ?)",
+                         [(user_id, scene) for scene in completed_scenes])
+        completed = conn.execute(
+            "SELECT COUNT(*) FROM summary_scenes WHERE user_id = ?", (user_id,)).fetchone()[0]
+        pool = record.get('assigned_pool')
+        is_completed = bool(record.get('is_fully_completed', False))
+        conn.execute(
+            """INSERT OR REPLACE INTO participant_summary
+               (user_id, participant_id, pool, completed, total, is_fully_completed,
+                is_terminated, status, start_time, demographics)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                user_id,
+                demographics.get('participant_id'),
+                pool,
+                completed,
+                len(record.get('scene_order', [])),
+                int(is_completed),
+                int(record.get('status') == 'terminated' or bool(record.get('is_blocked', False))),
+                participant_status(pool, is_completed, completed),
+                record.get('start_time'),
+                json.dumps(demographics, ensure_ascii=False),
+            ))
+
+    def upsert_record(self, record):
+        """Insert or fully refresh the row for a (merged) participant record."""
+        with self._transaction() as conn:
+            self._upsert_record(conn, record)
+
+    def set_fields(self, user_id, **fields):
+        """Update pool / total / is_fully_completed / is_terminated and recompute status."""
+        allowed = ('pool', 'total', 'is_fully_completed', 'is_terminated')
+        assignments = [f"{key} = ?" for key in fields if key in allowed]
+        if not assignments:
+            return
+        params = [fields[key] for key in fields if key in allowed]
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE participant_summary SET {', '.join(assignments)} WHERE user_id = ?",
+                         params + [user_id])
+            self._refresh_status(conn, user_id)
+
+    def record_scene(self, user_id, scene):
+        """Count a completed scene (idempotent for resubmissions)."""
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO summary_scenes (user_id, scene) VALUES (?, ?)",
+                                  (user_id, scene))
+            if cursor.rowcount:
+                conn.execute("UPDATE participant_summary SET completed = completed + 1 WHERE user_id = ?",
+                             (user_id,))
+                self._refresh_status(conn, user_id)
+
+    def delete(self, user_id):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM summary_scenes WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM participant_summary WHERE user_id = ?", (user_id,))
+
+    def rebuild(self, records):
+        """Replace every row from an iterable of merged records. Returns the row count."""
+        count = 0
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM summary_scenes")
+            conn.execute("DELETE FROM participant_summary")
+            for record in records:
+                self._upsert_record(conn, record)
+                count += 1
+            conn.execute("INSERT OR REPLACE INTO summary_meta (key, value) VALUES ('built', '1')")
+        return count
+
+    def page(self, limit=50, offset=0, status=None, pool=None, q=None, sort="start_time", descending=True):
+        """
+        One page of summary rows, filtered and sorted in SQL.
+
+        Args:
+            status: one of PARTICIPANT_STATUSES
+            pool: pool id
+            q: substring of the user_id or participant_id
+            sort: key of SORT_COLUMNS (ties broken by user_id)
+
+        Returns:
+            (rows, total): the page and the number of matching participants
+            (LIMIT/OFFSET + COUNT: cost grows with offset and matching rows)
+        """
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if pool:
+            where.append("pool = ?")
+            params.append(pool)
+        if q:
+            where.append("(user_id LIKE ? ESCAPE '\\' OR participant_id LIKE ? ESCAPE '\\')")
+            params += [like_pattern(q)] * 2
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        direction = "DESC" if descending else "ASC"
+        order = f"{SORT_COLUMNS[sort]} {direction}, user_id {direction}" if sort != "user_id" else f"user_id {direction}"
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM participant_summary {clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM participant_summary {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit, offset]).fetchall()
+        return [self._row_to_dict(row) for row in rows], total
+
+    @staticmethod
+    def _row_to_dict(row):
+        return {
+            "user_id": row['user_id'],
+            "assigned_pool": row['pool'],
+            "completed_count": row['completed'],
+            "total_count": row['total'],
+            "is_fully_completed": bool(row['is_fully_completed']),
+            "status": row['status'],
+            "start_time": row['start_time'],
+            "demographics": json.loads(row['demographics']),
+        }
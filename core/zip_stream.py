@@ -0,0 +1,63 @@
+"""
+ZIP Stream
+==========
+Build a ZIP archive incrementally and hand it out chunk by chunk, so an
+export response starts immediately and memory stays at roughly one entry
+no matter how many participants are in the archive.
+
+zipfile already supports unseekable outputs (it writes data descriptors
+instead of seeking back), so the sink below only needs to collect bytes.
+
+Entries that are already compressed (*.gz, *.xz) are stored as is rather
+than deflated a second time.
+"""
+import io
+import zipfile
+
+
+# Already-compressed payloads: deflating again costs CPU and saves nothing
+STORED_SUFFIXES = ('.gz', '.xz')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer drained after every entry."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """
+    Yield the bytes of a ZIP archive built from (arcname, data) pairs.
+
+    Args:
+        entries: iterable of (arcname, bytes or str); consumed lazily
+        compression: zipfile compression method for the other entries
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression) as zf:
+        for arcname, data in entries:
+            if arcname.endswith(STORED_SUFFIXES):
+                zf.writestr(arcname, data, compress_type=zipfile.ZIP_STORED)
+            else:
+                zf.writestr(arcname, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    # Central directory, written on close
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
@@ -3,21 +3,78 @@ Admin Dashboard Generator
 =========================
 Generates the admin dashboard for monitoring pool status and participant progress.
 """
+import json
 import sys
+from html import escape
 from pathlib import Path
+from urllib.parse import urlencode
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from core.summary_index import PARTICIPANT_STATUSES
 from core.ui_components import render_common_css
 
 
-def generate_admin_html(pool_status, participants_summary, config_info):
+SORT_OPTIONS = (("start_time", "Start Time"), ("user_id", "User ID"), ("pool", "Pool"), ("status", "Status"))
+PAGE_SIZES = (25, 50, 100, 200)
+
+
+def _render_participants_toolbar(participants_page, pool_ids, admin_key):
+    """Filter / sort form and pager for the participants table (plain GET links, server-side paging)."""
+    filters = participants_page.get('filters', {})
+    page = participants_page.get('page', 1)
+    pages = participants_page.get('pages', 1)
+    size = participants_page.get('size', 50)
+
+    def option(value, label, selected):
+        return f'<option value="{escape(str(value))}"{" selected" if selected else ""}>{escape(str(label))}</option>'
+
+    status_options = option('', 'All statuses', not filters.get('status')) + "".join(
+        option(st, st, filters.get('status') == st) for st in PARTICIPANT_STATUSES)
+    pool_options = option('', 'All pools', not filters.get('pool')) + "".join(
+        option(pid, f"Pool {pid}", filters.get('pool') == pid) for pid in pool_ids)
+    sort_options = "".join(option(key, label, filters.get('sort', 'start_time') == key) for key, label in SORT_OPTIONS)
+    order_options = option('desc', '↓', filters.get('order') != 'asc') + option('asc', '↑', filters.get('order') == 'asc')
+    size_options = "".join(option(n, f"{n} / page", size == n) for n in PAGE_SIZES)
+
+    def page_link(target, label, enabled):
+        if not enabled:
+            return f'<span class="pager-link disabled">{label}</span>'
+        params = {"key": admin_key, "page": target, "size": size}
+        params.update({k: v for k, v in filters.items() if v})
+        return f'<a class="pager-link" href="/admin?{escape(urlencode(params))}">{label}</a>'
+
+    return f"""
+        <form class="table-toolbar" method="get" action="/admin">
+            <input type="hidden" name="key" value="{escape(admin_key)}">
+            <input type="text" name="q" placeholder="Search participant / user ID" value="{escape(filters.get('q') or '')}">
+            <select name="status">{status_options}</select>
+            <select name="pool">{pool_options}</select>
+            <select name="sort">{sort_options}</select>
+            <select name="order">{order_options}</select>
+            <select name="size">{size_options}</select>
+            <button type="submit" class="view-btn">Apply</button>
+        </form>
+        """, f"""
+        <div class="pager">
+            {page_link(1, '« First', page > 1)}
+            {page_link(page - 1, '‹ Prev', page > 1)}
+            <span>Page {page} of {pages} ({participants_page.get('total', 0)} participants)</span>
+            {page_link(page + 1, 'Next ›', page < pages)}
+            {page_link(pages, 'Last »', page < pages)}
+        </div>
+        """
+
+
+def generate_admin_html(pool_status, participants_page, config_info, admin_key):
     """
     Generate admin dashboard HTML.
     
     Args:
         pool_status: Dict with pool stats {"1": {"started": 5, "completed": 3}, ...}
-        participants_summary: List of participant info dicts
+        participants_page: One page of participants, as returned by
+            ownership_manager.get_participants_page ({"participants": [...], "page", "pages", ...})
         config_info: Dict with config information
+        admin_key: Key the page was opened with, carried into its links, forms and API calls
     """
     common_css = render_common_css()
     
@@ -157,6 +214,30 @@ def generate_admin_html(pool_status, participants_summary, config_info):
         .status-abandoned { background: #fed7d7; color: #c53030; }
         .status-tutorial { background: #e9d8fd; color: #6b46c1; }
         
+        .table-toolbar {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 8px;
+            margin-bottom: 12px;
+        }
+        .table-toolbar input, .table-toolbar select {
+            padding: 6px 10px;
+            border: 1px solid #cbd5e0;
+            border-radius: 6px;
+            font-size: 14px;
+        }
+        .table-toolbar input[type="text"] { min-width: 240px; }
+        .pager {
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            gap: 12px;
+            margin: 12px 0 24px;
+            color: #4a5568;
+        }
+        .pager-link { color: #667eea; text-decoration: none; font-weight: 600; }
+        .pager-link.disabled { color: #cbd5e0; }
+        
         /* ... (保留之后的样式: .summary-cards, .modal 等) ... */
         .summary-cards {
             display: grid;
@@ -404,7 +485,7 @@ def generate_admin_html(pool_status, participants_summary, config_info):
     
     # Build participants table HTML
     participants_rows = ""
-    for p in participants_summary:
+    for p in participants_page.get('participants', []):
         # Extract participant_id from demographics for display
         participant_id = p.get('demographics', {}).get('participant_id', '-')
         user_id_full = p.get('user_id', '')
@@ -426,15 +507,18 @@ def generate_admin_html(pool_status, participants_summary, config_info):
         """
     
     if not participants_rows:
-        participants_rows = '<tr><td colspan="7" style="text-align:center; color:#718096;">No participants yet</td></tr>'
+        participants_rows = '<tr><td colspan="7" style="text-align:center; color:#718096;">No participants found</td></tr>'
+    
+    participants_toolbar, participants_pager = _render_participants_toolbar(
+        participants_page, sorted(pool_status.keys(), key=int), admin_key)
     
     total_abandoned = total_started - total_completed
     completion_rate = (total_completed/total_started*100) if total_started > 0 else 0
     
     # JavaScript for modal functionality
-    modal_js = """
-    const ADMIN_KEY = 'brain2026';
-    
+    modal_js = f"""
+    const ADMIN_KEY = {json.dumps(admin_key)};
+""" + """    
     function showModal(title) {
         document.getElementById('modalTitle').textContent = title;
         document.getElementById('modalBody').innerHTML = '<div class="modal-loading">Loading...</div>';
@@ -759,7 +843,7 @@ def generate_admin_html(pool_status, participants_summary, config_info):
     <div class="header">
         <h1>📊 Admin Dashboard</h1>
         <div class="header-actions">
-            <a href="/admin/download_zip?key=brain2026" class="download-btn">📥 Download All Data (ZIP)</a>
+            <a href="/admin/download_zip?{escape(urlencode({'key': admin_key}))}" class="download-btn">📥 Download All Data (ZIP)</a>
             <button class="refresh-btn" onclick="location.reload()">🔄 Refresh</button>
         </div>
     </div>
@@ -797,8 +881,8 @@ def generate_admin_html(pool_status, participants_summary, config_info):
             {pool_cards_html}
         </div>
         
-        <h2 class="section-title">Recent Participants</h2>
-        
+        <h2 class="section-title">Participants</h2>
+        {participants_toolbar}
         <div class="table-scroll-wrapper">
             <table class="participants-table">
                 <thead>
@@ -817,7 +901,7 @@ def generate_admin_html(pool_status, participants_summary, config_info):
                 </tbody>
             </table>
         </div>
-        
+        {participants_pager}
         <div class="blocked-section">
             <h2>🚫 Blocked IPs/Users</h2>
             <div id="blocked-list">
@@ -11,7 +11,7 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.data_processor import process_scene_data
+from core.projection_cache import project_scene
 from core.translations import get_text
 from core.ui_components import render_common_css, render_left_panel_html, render_right_panel_html, render_core_script
 
@@ -21,7 +21,7 @@ def generate_guide_html(ctx_1, ctx_2, ctx_3, lang='en'): # 接收三个场景 +
     # 定义处理函数 (with language support)
     def proc(ctx):
         if not ctx: return [], [], []
-        return process_scene_data(ctx['scene_data'], ctx['camera_data'], use_display_mapping=False, filter_empty_plates=False, lang=lang)
+        return project_scene(ctx['scene_data'], ctx['camera_data'], scene_digest=ctx.get('scene_digest'), use_display_mapping=False, filter_empty_plates=False, lang=lang)
 
     # 处理数据
     obj1, agt1, lbl1 = proc(ctx_1)
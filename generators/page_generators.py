@@ -11,7 +11,7 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.data_processor import process_scene_data
+from core.projection_cache import project_scene
 from core.translations import get_text
 from core.ui_components import render_common_css, render_left_panel_html, render_right_panel_html, render_core_script
 import config
@@ -34,17 +34,21 @@ def should_inject_attention_check(current_idx):
     return current_idx in config.ATTENTION_CHECK_INDICES
 
 
-def generate_html_page(scene_data, camera_data, image_filename, image_url, scene_name, current_idx, total_count, lang='en'):
+def generate_html_page(scene_data, camera_data, image_filename, image_url, scene_name, current_idx, total_count, lang='en', scene_digest=None):
     """
     Generate complete HTML page.
+
+    scene_digest (sha256 of scene_data.json) enables the projection cache.
     """
-    # Use centralized data processor with language support
-    objects_data, agents_data, agent_labels = process_scene_data(
-        scene_data, camera_data, 
+    # Use centralized data processor with language support (cached per scene file + camera + lang)
+    objects_data, agents_data, agent_labels = project_scene(
+        scene_data, camera_data, scene_digest=scene_digest,
         use_display_mapping=True, 
         filter_empty_plates=True,
         lang=lang
     )
+    # 缓存结果是共享的，下面插入陷阱题前先复制列表
+    objects_data = list(objects_data)
     
     # --- Attention Check Injection Logic ---
     attention_check_meta = {}  # Will be passed to JS for validation
@@ -0,0 +1,192 @@
+"""
+Manage
+======
+Command-line maintenance tasks for participant data.
+
+Usage:
+    python manage.py compact [--user USER_ID]
+    python manage.py migrate-sqlite [--db PATH]
+    python manage.py rebuild-id-index
+    python manage.py rebuild-summary
+    python manage.py rebuild-pool-stats [--verify]
+    python manage.py migrate-records-layout {flat,sharded}
+    python manage.py recompress-records [{none,gzip,lzma}]
+    python manage.py build-manifest [--output FILE]
+    python manage.py warm-projections [--lang en zh]
+    python manage.py export [--since CURSOR|ISO_TIMESTAMP] [--output FILE]
+    python manage.py export-columns [--output annotations.npz|DIR] [--compress]
+"""
+import argparse
+from datetime import datetime
+
+import config
+from core import ownership_manager
+from core.scene_catalog import build_manifest, write_manifest
+from core.projection_cache import warm_projection_cache
+from core.zip_stream import iter_zip
+from core.columnar_export import write_annotation_columns
+
+
+def cmd_compact(args):
+    """Fold pending scene journals back into the canonical records."""
+    if args.user:
+        changed = ownership_manager.compact_participant_record(args.user)
+        print(f"[COMPACT] {args.user}: {'compacted' if changed else 'nothing to do'}")
+    else:
+        count = ownership_manager.compact_all_participant_records()
+        print(f"[COMPACT] Compacted {count} participant journal(s)")
+
+
+def cmd_migrate_sqlite(args):
+    """Import the JSON records into the SQLite database."""
+    count = ownership_manager.migrate_json_to_sqlite(args.db)
+    print(f"[MIGRATE] Imported {count} participant record(s) into {args.db or config.SQLITE_DB_PATH}")
+    print("[MIGRATE] Set STORAGE_BACKEND=sqlite to serve from the database.")
+
+
+def cmd_rebuild_id_index(args):
+    """Recreate the participant-ID uniqueness index from the records."""
+    count = ownership_manager.rebuild_participant_id_index()
+    print(f"[ID INDEX] Indexed {count} participant ID(s)")
+
+
+def cmd_rebuild_summary(args):
+    """Recreate the admin participant summary from the records."""
+    count = ownership_manager.rebuild_participant_summary()
+    print(f"[SUMMARY] Rebuilt {count} summary row(s)")
+
+
+def cmd_rebuild_pool_stats(args):
+    """Recompute the Welford pool statistics, optionally checking them against a full scan."""
+    count = ownership_manager.rebuild_pool_aggregate_stats()
+    print(f"[POOL STATS] Rebuilt from {count} completed participant(s)")
+    if not args.verify:
+        return
+
+    mismatches = 0
+    for pool_id in ownership_manager._detect_available_pools():
+        fast = ownership_manager.get_pool_aggregate_stats(pool_id)
+        full = ownership_manager.compute_pool_aggregate_stats(pool_id)
+        for scene, objects in full.items():
+            for obj_id, expected in objects.items():
+                actual = fast.get(scene, {}).get(obj_id)
+                if (actual is None or actual['n'] != expected['n']
+                        or abs(actual['mean'] - expected['mean']) > 0.011
+                        or abs(actual['std_dev'] - expected['std_dev']) > 0.011):
+                    mismatches += 1
+                    print(f"[MISMATCH] pool {pool_id} {scene}/{obj_id}: {actual} != {expected}")
+        extra = sum(len(objs) for objs in fast.values()) - sum(len(objs) for objs in full.values())
+        if extra:
+            mismatches += abs(extra)
+            print(f"[MISMATCH] pool {pool_id}: object count differs by {extra}")
+    print(f"[POOL STATS] Verification {'passed' if mismatches == 0 else f'found {mismatches} mismatch(es)'}")
+
+
+def cmd_migrate_records_layout(args):
+    """Move participant records between the flat and sharded directory layouts."""
+    moved = ownership_manager.migrate_records_layout(args.layout)
+    print(f"[LAYOUT] Moved {moved} participant record(s) to the {args.layout} layout")
+    if config.RECORDS_LAYOUT != args.layout:
+        print(f"[LAYOUT] Set RECORDS_LAYOUT={args.layout} before starting the server.")
+
+
+def cmd_recompress_records(args):
+    """Rewrite participant records with the configured (or given) compression."""
+    compression = args.compression or config.RECORD_COMPRESSION
+    converted = ownership_manager.recompress_records(compression)
+    print(f"[COMPRESSION] Rewrote {converted} participant record(s) as {compression}")
+    if config.RECORD_COMPRESSION != compression:
+        print(f"[COMPRESSION] Set RECORD_COMPRESSION={compression} so new records match.")
+
+
+def cmd_build_manifest(args):
+    """Walk question_pool/ and guide_data/ once and write the scene manifest loaded by the server."""
+    manifest = build_manifest()
+    path = write_manifest(manifest, args.output)
+    print(f"[MANIFEST] {len(manifest['scenes'])} scenes in {len(manifest['pools'])} pools, "
+          f"{len(manifest['guides'])} tutorial scenes -> {path}")
+    if args.output and args.output != str(config.SCENE_MANIFEST_FILE):
+        print(f"[MANIFEST] Set SCENE_MANIFEST_FILE={path} for the server to load it.")
+
+
+def cmd_warm_projections(args):
+    """Precompute the projection cache for every scene and tutorial page, so no render projects."""
+    computed, cached, skipped = warm_projection_cache(args.lang)
+    print(f"[PROJECTION] Computed {computed}, already cached {cached} (languages: {', '.join(args.lang)})")
+    if skipped:
+        print(f"[PROJECTION] Skipped {skipped} scene(s) without their camera in scene_data.json")
+    print(f"[PROJECTION] Cache directory: {config.PROJECTION_CACHE_DIR or '(memory only)'}")
+
+
+def cmd_export(args):
+    """Write the participant ZIP export (optionally only changes since a cursor) to a file."""
+    entries, cursor = ownership_manager.export_participants(args.since)
+    output = args.output or f"participants_{'data' if args.since is None else 'changes'}_{datetime.now():%Y%m%d_%H%M%S}.zip"
+    with open(output, 'wb') as f:
+        for chunk in iter_zip(entries):
+            f.write(chunk)
+    print(f"[EXPORT] Wrote {output}")
+    print(f"[EXPORT] Next cursor: {cursor} (use --since {cursor})")
+
+
+def cmd_export_columns(args):
+    """Flatten all annotations into typed NumPy columns (.npz or a directory of .npy)."""
+    rows = write_annotation_columns(ownership_manager._iter_participant_records(), args.output, args.compress)
+    print(f"[EXPORT] Wrote {rows} annotation row(s) to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ownership tool maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p_compact = subparsers.add_parser("compact", help="Compact participant journals into records")
+    p_compact.add_argument("--user", help="Only compact this user_id")
+    p_compact.set_defaults(func=cmd_compact)
+
+    p_migrate = subparsers.add_parser("migrate-sqlite", help="Import JSON records into SQLite")
+    p_migrate.add_argument("--db", help="Database path (default: config.SQLITE_DB_PATH)")
+    p_migrate.set_defaults(func=cmd_migrate_sqlite)
+
+    p_id_index = subparsers.add_parser("rebuild-id-index", help="Rebuild the participant-ID index")
+    p_id_index.set_defaults(func=cmd_rebuild_id_index)
+
+    p_summary = subparsers.add_parser("rebuild-summary", help="Rebuild the admin participant summary")
+    p_summary.set_defaults(func=cmd_rebuild_summary)
+
+    p_pool_stats = subparsers.add_parser("rebuild-pool-stats", help="Rebuild the pool statistics accumulators")
+    p_pool_stats.add_argument("--verify", action="store_true", help="Compare against a full scan of the records")
+    p_pool_stats.set_defaults(func=cmd_rebuild_pool_stats)
+
+    p_layout = subparsers.add_parser("migrate-records-layout", help="Move records to the flat or sharded layout")
+    p_layout.add_argument("layout", choices=ownership_manager.RECORDS_LAYOUTS)
+    p_layout.set_defaults(func=cmd_migrate_records_layout)
+
+    p_recompress = subparsers.add_parser("recompress-records", help="Rewrite records with RECORD_COMPRESSION")
+    p_recompress.add_argument("compression", nargs="?", choices=tuple(ownership_manager.RECORD_SUFFIXES))
+    p_recompress.set_defaults(func=cmd_recompress_records)
+
+    p_manifest = subparsers.add_parser("build-manifest", help="Write the precompiled scene manifest")
+    p_manifest.add_argument("--output", help=f"Manifest file (default: {config.SCENE_MANIFEST_FILE})")
+    p_manifest.set_defaults(func=cmd_build_manifest)
+
+    p_warm = subparsers.add_parser("warm-projections", help="Precompute the scene projection cache")
+    p_warm.add_argument("--lang", nargs="+", default=["en", "zh"], help="Languages to cache (default: en zh)")
+    p_warm.set_defaults(func=cmd_warm_projections)
+
+    p_export = subparsers.add_parser("export", help="Export participant records as a ZIP")
+    p_export.add_argument("--since", help="Only participants changed after this cursor or ISO timestamp")
+    p_export.add_argument("--output", help="ZIP file to write (default: timestamped name in the current directory)")
+    p_export.set_defaults(func=cmd_export)
+
+    p_columns = subparsers.add_parser("export-columns", help="Export annotations as typed NumPy columns")
+    p_columns.add_argument("--output", default="annotations.npz",
+                           help="A .npz file, or a directory for one memory-mappable .npy per column")
+    p_columns.add_argument("--compress", action="store_true", help="Use savez_compressed for .npz output")
+    p_columns.set_defaults(func=cmd_export_columns)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,14 +4,10 @@ Server
 Flask entry point.
 Includes Session Management for Participants.
 """
-from flask import Flask, request, jsonify, send_from_directory, session, redirect, url_for, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory, session, redirect, url_for
 from flask_cors import CORS
 import json
-import re
-from pathlib import Path
 import os
-import io
-import zipfile
 from datetime import datetime
 
 import config
@@ -25,26 +21,37 @@ from core.ownership_manager import (
     save_participant_results, 
     get_next_scene,
     get_upcoming_scenes,
+    get_assigned_pool,
     assign_pool_strategy,
     mark_user_completed,
     block_user, 
     is_blocked,
     get_admin_stats,
+    get_pool_status,
+    get_participants_page,
     reset_pool_status,
     get_participant_details,
     get_pool_aggregate_stats,
-    get_all_participant_files,
     check_participant_id_exists,
     delete_participant,
     get_blocked_list_detailed,
     unblock_user,
     save_payment_to_summary,
+    payment_already_submitted,
     save_attention_check_failure,
     mark_user_terminated,
     is_user_terminated,
-    PARTICIPANTS_DIR
+    participant_exists,
+    save_participant_payment,
+    get_lock_stats,
+    export_participants
 )
 from core.translations import get_text
+from core.zip_stream import iter_zip
+from core.scene_catalog import get_scene_catalog, image_url, start_scene_watcher
+from core.scene_data_cache import load_scene_file, scene_data_cache_stats
+from core.projection_cache import projection_cache_stats
+from core.data_processor import find_camera
 
 app = Flask(__name__)
 CORS(app)
@@ -59,22 +66,15 @@ REPO_NAME = "Ownership"
 app.secret_key = config.SECRET_KEY
 # ===================================================
 
-def parse_camera_id(filename):
-    name = filename.replace('.png', '').replace('.jpg', '')
-    name = re.sub(r'_(rgb|depth|seg|normal)$', '', name)
-    return name
+# 导入时建好场景索引 (有 scene_manifest.json 时直接读清单，不扫描目录)
+get_scene_catalog()
 
-def find_camera(scene_data, camera_id):
-    for camera in scene_data.get('cameras', []):
-        if camera.get('id') == camera_id:
-            return camera
-    return None
 
-def get_first_image(scene_path):
-    for img in sorted(scene_path.glob('*.png')):
-        if 'TopCamera' not in img.name:
-            return img.name
-    return None
+@app.before_request
+def _start_worker_threads():
+    # 热更新线程 (SCENE_WATCH_INTERVAL_S) 在处理请求的进程里启动: 预加载 (fork 前导入) 时
+    # 主进程的线程不会被子进程继承，按 PID 判断每个 worker 各起一个
+    start_scene_watcher()
 
 
 def get_client_ip():
@@ -113,10 +113,9 @@ def start_main_experiment():
     user_id = session['user_id']
     print(f"[INFO] start_main_experiment called for user: {user_id}")
     
-    # 检查用户文件是否存在
-    user_file = PARTICIPANTS_DIR / f"{user_id}.json"
-    if not user_file.exists():
-        print(f"[ERROR] User file not found: {user_file}. Session is stale, clearing...")
+    # 检查用户记录是否存在
+    if not participant_exists(user_id):
+        print(f"[ERROR] User record not found: {user_id}. Session is stale, clearing...")
         session.clear()
         return jsonify({"error": "Session expired - please login again", "action": "redirect_login"}), 401
     
@@ -318,37 +317,25 @@ def index():
         </html>
         """
     
-    # 加载场景数据
-    scenes = config.scan_scenes(config.SCENES_ROOT)
-    scene_info = next((s for s in scenes if s['name'] == scene_name), None)
+    # 加载场景数据 (场景索引: 路径 / 图片 / 相机 id 都是 O(1) 查找)
+    # 按 (pool, name) 查找: 不同池里可能有同名场景
+    scene_info = get_scene_catalog().get(scene_name, pool=get_assigned_pool(user_id))
     
     if not scene_info:
         return f"Error: Scene {scene_name} not found on server.", 404
 
-    scene_path = scene_info['path']
-    scene_data_path = scene_path / config.SCENE_DATA_FILENAME
-    
-    with open(scene_data_path, 'r', encoding='utf-8') as f:
-        scene_data = json.load(f)
+    # 解析结果按 (路径, mtime) 缓存，同池参与者共享；digest 是投影缓存的 key
+    scene_data, scene_digest = load_scene_file(scene_info.path)
         
-    image_name = get_first_image(scene_path)
-    camera_id = parse_camera_id(image_name)
-    camera_data = find_camera(scene_data, camera_id)
-    
-    # === 关键修改 ===
-    # 获取该场景所属的 pool (例如 "1", "2")
-    pool_id = scene_info.get('pool', '1')
-    
-    # 构建 URL 时加入 pool_id
-    image_url = f"/scenes/{pool_id}/{scene_name}/{image_name}"
-
-
+    image_name = scene_info.image
+    camera_data = find_camera(scene_data, scene_info.camera_id)
 
     html = generate_html_page(
-        scene_data, camera_data, image_name, image_url,
+        scene_data, camera_data, image_name, image_url(scene_info),
         scene_name, 
         current_idx, total_count,
-        lang=lang
+        lang=lang,
+        scene_digest=scene_digest
     )
     return html
 
@@ -360,22 +347,19 @@ def tutorial():
     
     lang = session.get('lang', config.DEFAULT_LANGUAGE)
         
+    catalog = get_scene_catalog()
+        
     def load_scene_context(scene_dir_name):
-        base_path = Path(__file__).parent / 'guide_data' / scene_dir_name
-        data_path = base_path / 'scene_data.json'
-        if not data_path.exists(): return None
-        with open(data_path, 'r', encoding='utf-8') as f:
-            scene_data = json.load(f)
-        image_files = list(base_path.glob('*.png')) + list(base_path.glob('*.jpg'))
-        if not image_files: return None
-        image_name = image_files[0].name
-        camera_id = parse_camera_id(image_name)
-        camera_data = find_camera(scene_data, camera_id)
+        guide = catalog.guide(scene_dir_name)
+        if guide is None or guide.image is None: return None
+        scene_data, scene_digest = load_scene_file(guide.path)
+        camera_data = find_camera(scene_data, guide.camera_id)
         if not camera_data: return None
         return {
             'scene_data': scene_data,
+            'scene_digest': scene_digest,
             'camera_data': camera_data,
-            'image_url': f"/guide_images/{scene_dir_name}/{image_name}" 
+            'image_url': f"/guide_images/{scene_dir_name}/{guide.image}" 
         }
 
     ctx_1 = load_scene_context('guide_1')
@@ -531,26 +515,34 @@ def api_preload_images():
     if not upcoming:
         return jsonify({"urls": []})
     
-    # 查找每个场景的图片 URL
-    scenes = config.scan_scenes(config.SCENES_ROOT)
-    scene_map = {s['name']: s for s in scenes}
-    
+    # 查找每个场景的图片 URL (同样按参与者所在的池查找)
+    catalog = get_scene_catalog()
+    pool = get_assigned_pool(user_id)
     urls = []
     for scene_name in upcoming:
-        scene_info = scene_map.get(scene_name)
-        if scene_info:
-            scene_path = scene_info['path']
-            image_name = get_first_image(scene_path)
-            if image_name:
-                pool_id = scene_info.get('pool', '1')
-                url = f"/scenes/{pool_id}/{scene_name}/{image_name}"
-                urls.append(url)
+        url = image_url(catalog.get(scene_name, pool=pool))
+        if url:
+            urls.append(url)
     
     return jsonify({"urls": urls})
 
 
 # ==================== ADMIN ROUTES ====================
 
+def _participant_page_args():
+    """?page=&size=&status=&pool=&q=&sort=&order= -> get_participants_page kwargs (ValueError if malformed)"""
+    args = request.args
+    return {
+        "page": int(args.get('page', 1)),
+        "size": int(args.get('size', 50)),
+        "status": args.get('status') or None,
+        "pool": args.get('pool') or None,
+        "q": args.get('q') or None,
+        "sort": args.get('sort', 'start_time'),
+        "descending": args.get('order', 'desc').lower() != 'asc',
+    }
+
+
 @app.route('/admin')
 def admin_dashboard():
     """管理员仪表板 - 查看所有池子状态和用户进度"""
@@ -559,8 +551,24 @@ def admin_dashboard():
     if admin_key != 'brain2026':  # 你可以改成环境变量
         return "Unauthorized. Use ?key=YOUR_ADMIN_KEY", 401
     
-    pool_status, participants, config_info = get_admin_stats()
-    return generate_admin_html(pool_status, participants, config_info)
+    try:
+        pool_status, participants_page, config_info = get_admin_stats(**_participant_page_args())
+    except ValueError as e:
+        return f"Bad request: {e}", 400
+    return generate_admin_html(pool_status, participants_page, config_info, admin_key)
+
+
+@app.route('/admin/api/participants')
+def admin_api_participants():
+    """API: 分页/筛选/排序的参与者列表 (?page=&size=&status=&pool=&q=&sort=&order=)"""
+    admin_key = request.args.get('key', '')
+    if admin_key != 'brain2026':
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    try:
+        return jsonify(get_participants_page(**_participant_page_args()))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 
 @app.route('/admin/reset', methods=['POST'])
@@ -630,8 +638,7 @@ def admin_unblock():
 @app.route('/api/pool_status')
 def api_pool_status():
     """API: 获取池子状态 JSON"""
-    pool_status, _, _ = get_admin_stats()
-    return jsonify(pool_status)
+    return jsonify(get_pool_status())
 
 
 @app.route('/admin/download_zip')
@@ -641,26 +648,25 @@ def admin_download_zip():
     if admin_key != 'brain2026':
         return jsonify({"error": "Unauthorized"}), 401
     
-    # Create in-memory ZIP file
-    memory_file = io.BytesIO()
-    
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        participant_files = get_all_participant_files()
-        for file_path in participant_files:
-            # Add file to ZIP with just the filename (not full path)
-            zf.write(file_path, file_path.name)
-    
-    memory_file.seek(0)
+    # ?since=<cursor|ISO timestamp>: 只导出该游标之后有变化的参与者
+    since = request.args.get('since') or None
+    try:
+        entries, cursor = export_participants(since)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Generate timestamp for filename
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"participants_data_{timestamp}.zip"
+    filename = f"participants_data_{timestamp}.zip" if since is None else f"participants_changes_{timestamp}.zip"
     
-    return send_file(
-        memory_file,
+    # 边压缩边发送: 内存只占一个参与者, 首字节立即返回
+    return Response(
+        iter_zip(entries),
         mimetype='application/zip',
-        as_attachment=True,
-        download_name=filename
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Export-Cursor": str(cursor),
+        }
     )
 
 
@@ -689,6 +695,36 @@ def api_pool_aggregate_stats(pool_id):
     return jsonify(stats)
 
 
+@app.route('/admin/api/lock_stats')
+def admin_lock_stats():
+    """API: 本 worker 的锁等待时间统计"""
+    admin_key = request.args.get('key', '')
+    if admin_key != 'brain2026':
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    return jsonify(get_lock_stats())
+
+
+@app.route('/admin/api/scene_cache_stats')
+def admin_scene_cache_stats():
+    """API: 本 worker 的 scene_data.json 缓存命中率 / 内存占用"""
+    admin_key = request.args.get('key', '')
+    if admin_key != 'brain2026':
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    return jsonify(scene_data_cache_stats())
+
+
+@app.route('/admin/api/projection_cache_stats')
+def admin_projection_cache_stats():
+    """API: 本 worker 的投影缓存命中率"""
+    admin_key = request.args.get('key', '')
+    if admin_key != 'brain2026':
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    return jsonify(projection_cache_stats())
+
+
 # ==================== COMPLETION ROUTES ====================
 
 @app.route('/completion')
@@ -716,7 +752,7 @@ def completion_page():
 def submit_payment_info():
     """
     API endpoint to save payment information for successful participants.
-    Saves payment info to the participant's JSON file and the central summary file.
+    Saves payment info to the participant's JSON file and the central payment ledger.
     """
     user_id = session.get('user_id')
     if not user_id:
@@ -735,26 +771,22 @@ def submit_payment_info():
             "submitted_at": datetime.now().isoformat()
         }
         
-        # Load participant file and add payment info
-        participant_file = PARTICIPANTS_DIR / f"{user_id}.json"
-        
-        if participant_file.exists():
-            with open(participant_file, 'r', encoding='utf-8') as f:
-                participant_data = json.load(f)
-            
-            participant_data['payment_info'] = payment_info
-            participant_data['payment_submitted'] = True
-            
-            with open(participant_file, 'w', encoding='utf-8') as f:
-                json.dump(participant_data, f, indent=2, ensure_ascii=False)
-            
-            # Also save to central payment summary file
-            save_payment_to_summary(user_id, payment_info)
-            
-            print(f"[PAYMENT] Saved payment info for user {user_id}")
-            return jsonify({"status": "success", "message": "Payment info saved"})
-        else:
+        if not participant_exists(user_id):
             return jsonify({"error": "Participant file not found"}), 404
+        
+        # A repeated submit (double click / retry after success) stops here
+        if payment_already_submitted(user_id):
+            return jsonify({"status": "success", "message": "Payment info already submitted"})
+        
+        # Participant record first (idempotent): if the ledger append below fails,
+        # the retry is not mistaken for a duplicate and both end up written
+        save_participant_payment(user_id, payment_info)
+        
+        if not save_payment_to_summary(user_id, payment_info):
+            return jsonify({"status": "success", "message": "Payment info already submitted"})
+        
+        print(f"[PAYMENT] Saved payment info for user {user_id}")
+        return jsonify({"status": "success", "message": "Payment info saved"})
             
     except Exception as e:
         print(f"[PAYMENT ERROR] User {user_id}: {str(e)}")
@@ -773,8 +805,7 @@ def fail_attention_legacy():
 
 @app.route('/guide_images/<path:subpath>')
 def serve_guide_image(subpath):
-    base_dir = Path(__file__).parent / 'guide_data'
-    return send_from_directory(base_dir, subpath)
+    return send_from_directory(config.GUIDE_ROOT, subpath)
 
 @app.route('/scenes/<path:filepath>')
 def serve_scene_file(filepath):
@@ -782,8 +813,7 @@ def serve_scene_file(filepath):
 
 @app.route('/api/scenes')
 def list_scenes():
-    scenes = config.scan_scenes(config.SCENES_ROOT)
-    return jsonify({"scenes": [s['name'] for s in scenes]})
+    return jsonify({"scenes": [scene.name for scene in get_scene_catalog()]})
 
 def get_local_ip():
     """Get the local IP address for LAN access."""
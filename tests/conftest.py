@@ -0,0 +1,47 @@
+"""
+Shared pytest setup.
+
+Every test run works in its own temporary DATA_ROOT (JSON backend, no
+write-behind / group commit / compression), so the participant data in the
+repo is never touched. config reads the environment at import time, so it
+is set here, before any test module imports config or core.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_DATA_ROOT = tempfile.mkdtemp(prefix="ownership-tests-")
+os.environ.update({
+    "DATA_ROOT": _DATA_ROOT,
+    "SQLITE_DB_PATH": os.path.join(_DATA_ROOT, "ownership.db"),
+    "PROJECTION_CACHE_DIR": os.path.join(_DATA_ROOT, "projection_cache"),
+    "STORAGE_BACKEND": "json",
+    "RECORD_COMPRESSION": "none",
+    "SAVE_WRITE_BEHIND": "false",
+    "GROUP_COMMIT_WINDOW_MS": "0",
+    "SCENE_WATCH_INTERVAL_S": "0",
+})
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_DATA_ROOT, ignore_errors=True)
+
+
+@pytest.fixture
+def om():
+    """core.ownership_manager, running against the temporary DATA_ROOT."""
+    from core import ownership_manager
+    return ownership_manager
+
+
+@pytest.fixture
+def participant(om):
+    """A new participant with a pool and scene order assigned. Returns the user_id."""
+    user_id = om.init_participant_file({"participant_id": f"test{os.urandom(4).hex()}"})
+    om.assign_pool_strategy(user_id)
+    return user_id
@@ -0,0 +1,65 @@
+"""Per-participant result journal: crash-torn tails and corrupt lines."""
+import pytest
+
+
+def _save(om, user_id, value=50):
+    scene, _, _ = om.get_next_scene(user_id)
+    result = om.save_participant_results(user_id, scene, [{"object_id": "obj_1", "slider_value": value}], 1000)
+    assert result == {"status": "success"}
+    return scene
+
+
+def test_saves_are_journaled_in_order(om, participant):
+    scenes = [_save(om, participant, value) for value in (10, 20, 30)]
+
+    assert [entry["scene"] for entry in om._read_journal(participant)] == scenes
+    record = om.load_participant_record(participant)
+    assert [exp["scene"] for exp in record["experiments"]] == scenes
+    assert om.get_next_scene(participant)[1] == 4
+
+
+def test_partial_tail_is_ignored_then_truncated(om, participant):
+    first = _save(om, participant)
+    journal = om._journal_path(participant)
+    with open(journal, 'ab') as f:
+        f.write(b'{"scene": "torn')  # crash mid-append: never acknowledged
+
+    # Readers skip the unterminated line ...
+    assert [entry["scene"] for entry in om._read_journal(participant)] == [first]
+
+    # ... and the next append cuts it off instead of gluing onto it
+    second = _save(om, participant)
+    assert journal.read_bytes().count(b"torn") == 0
+    assert [entry["scene"] for entry in om._read_journal(participant)] == [first, second]
+
+
+def test_resubmitted_scene_replaces_the_old_result(om, participant):
+    first = _save(om, participant, 10)
+    _save(om, participant, 20)
+    om.save_participant_results(participant, first, [{"object_id": "obj_1", "slider_value": 99}], 1000)
+
+    experiments = om.load_participant_record(participant)["experiments"]
+    assert [exp["scene"] for exp in experiments][-1] == first
+    assert len(experiments) == 2
+    assert experiments[-1]["results"][0]["slider_value"] == 99
+
+
+@pytest.mark.parametrize("garbage", [b"{not json\n", b"\xff\xfe\n"])
+def test_corrupt_complete_line_raises(om, participant, garbage):
+    _save(om, participant)
+    journal = om._journal_path(participant)
+    journal.write_bytes(garbage + journal.read_bytes())
+
+    with pytest.raises(ValueError, match="Corrupt journal line 1"):
+        om._read_journal(participant)
+
+
+def test_compaction_folds_the_journal_into_the_record(om, participant):
+    scenes = [_save(om, participant, value) for value in (10, 20)]
+
+    om.compact_participant_record(participant)
+
+    assert om._read_journal(participant) == []
+    record = om.load_participant_record(participant)
+    assert [exp["scene"] for exp in record["experiments"]] == scenes
+    assert record["completed_scenes"] == scenes
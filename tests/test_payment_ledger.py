@@ -0,0 +1,74 @@
+"""Append-only payment ledger: duplicate detection across workers and torn tails."""
+import os
+
+import pytest
+
+
+PAYMENT = {"real_name": "Test", "phone": "000", "id_number": "1", "bank_branch": "b", "bank_account": "2"}
+
+
+def _user():
+    return f"payer_{os.urandom(4).hex()}"
+
+
+def _forget_index(om):
+    """Drop this process's ledger index, as if another worker read the file."""
+    om._payment_index.update(offset=0, user_ids=None)
+
+
+def test_second_submission_is_rejected(om):
+    user_id = _user()
+    assert not om.payment_already_submitted(user_id)
+
+    assert om.save_payment_to_summary(user_id, PAYMENT) is True
+    assert om.save_payment_to_summary(user_id, PAYMENT) is False
+
+    assert om.payment_already_submitted(user_id)
+    assert [entry["user_id"] for entry in om.get_payment_summary()].count(user_id) == 1
+
+
+def test_duplicates_are_detected_from_the_file(om):
+    user_id = _user()
+    om.save_payment_to_summary(user_id, PAYMENT)
+
+    _forget_index(om)
+    assert om.payment_already_submitted(user_id)
+    assert om.save_payment_to_summary(user_id, PAYMENT) is False
+
+
+def test_lines_appended_by_another_worker_are_picked_up(om):
+    first, second = _user(), _user()
+    om.save_payment_to_summary(first, PAYMENT)
+    offset = om._payment_index["offset"]
+
+    # Another worker appends behind this process's back
+    with open(om.PAYMENT_LEDGER_FILE, 'ab') as f:
+        f.write(om.json_codec.dumps_line({"user_id": second, **PAYMENT}))
+
+    assert om.payment_already_submitted(second)
+    assert om._payment_index["offset"] > offset
+    assert om.save_payment_to_summary(second, PAYMENT) is False
+
+
+def test_torn_tail_is_not_an_entry_and_is_repaired(om):
+    torn, user_id = _user(), _user()
+    with open(om.PAYMENT_LEDGER_FILE, 'ab') as f:
+        f.write(om.json_codec.dumps_line({"user_id": torn, **PAYMENT})[:-10])
+    _forget_index(om)
+
+    assert not om.payment_already_submitted(torn)
+    assert om.save_payment_to_summary(user_id, PAYMENT) is True
+
+    _forget_index(om)
+    users = [entry["user_id"] for entry in om.get_payment_summary()]
+    assert user_id in users and torn not in users
+    assert om.save_payment_to_summary(torn, PAYMENT) is True
+
+
+def test_corrupt_complete_line_raises(om, tmp_path, monkeypatch):
+    ledger = tmp_path / "payment_ledger.jsonl"
+    ledger.write_bytes(b'{"user_id": "a"}\n{broken\n')
+    monkeypatch.setattr(om, "PAYMENT_LEDGER_FILE", ledger)
+
+    with pytest.raises(ValueError, match="Corrupt payment ledger line at byte 17"):
+        list(om._iter_ledger_lines())
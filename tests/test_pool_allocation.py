@@ -0,0 +1,57 @@
+"""Strict round-robin pool allocation."""
+import os
+from collections import Counter
+
+import config
+
+
+def _status(completed):
+    return {pool: {"started": 0, "completed": count} for pool, count in completed.items()}
+
+
+def test_round_robin_from_the_last_index(om):
+    status = _status({"1": 0, "2": 0, "3": 0})
+    last, order = -1, []
+    for _ in range(7):
+        pool, last = om._choose_pool(status, last)
+        order.append(pool)
+    assert order == ["1", "2", "3", "1", "2", "3", "1"]
+
+
+def test_pools_sort_numerically(om):
+    status = _status({"10": 0, "2": 0, "1": 0})
+    assert om._choose_pool(status, -1) == ("1", 0)
+    assert om._choose_pool(status, 0) == ("2", 1)
+    assert om._choose_pool(status, 1) == ("10", 2)
+
+
+def test_full_pools_are_skipped(om):
+    target = om.TARGET_COMPLETED_PER_POOL
+    status = _status({"1": 0, "2": target, "3": 0})
+    assert om._choose_pool(status, 0) == ("3", 2)
+
+
+def test_all_full_falls_back_to_least_completed_without_moving_the_index(om):
+    target = om.TARGET_COMPLETED_PER_POOL
+    status = _status({"1": target + 2, "2": target, "3": target + 1})
+    assert om._choose_pool(status, 1) == ("2", None)
+
+
+def test_assignment_invariants(om):
+    om.reset_pool_status()
+    pools = om._detect_available_pools()
+    users = [om.init_participant_file({"participant_id": f"alloc{os.urandom(4).hex()}"}) for _ in range(2 * len(pools) + 1)]
+
+    assigned = [om.assign_pool_strategy(user_id) for user_id in users]
+
+    # Strict rotation through the pools, starting from the first
+    assert assigned == [pools[i % len(pools)] for i in range(len(users))]
+    # Every assignment is counted exactly once
+    status = om.get_pool_status()
+    assert {pool: counts["started"] for pool, counts in status.items()} == {
+        pool: Counter(assigned)[pool] for pool in pools}
+    # Each participant gets a shuffled copy of exactly their pool's scenes
+    for user_id, pool in zip(users, assigned):
+        record = om.load_participant_record(user_id)
+        assert record["assigned_pool"] == pool
+        assert sorted(record["scene_order"]) == sorted(config.get_scenes_in_pool(pool))
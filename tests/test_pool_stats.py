@@ -0,0 +1,106 @@
+"""Welford pool accumulators must match a full scan after any sequence of adds and removes."""
+import random
+import statistics
+
+import pytest
+
+from core.pool_stats import PoolStatsAccumulator, format_moments
+
+
+def _record(user_id, pool, values):
+    """A completed participant: values is {(scene, object_id): slider_value}."""
+    experiments = {}
+    for (scene, obj_id), value in values.items():
+        experiments.setdefault(scene, []).append({"object_id": obj_id, "slider_value": value})
+    return {"user_id": user_id, "assigned_pool": pool,
+            "experiments": [{"scene": scene, "results": results} for scene, results in experiments.items()]}
+
+
+def _full_scan(records, pool):
+    values = {}
+    for record in records:
+        if record["assigned_pool"] != pool:
+            continue
+        for experiment in record["experiments"]:
+            for result in experiment["results"]:
+                values.setdefault((experiment["scene"], result["object_id"]), []).append(result["slider_value"])
+    expected = {}
+    for (scene, obj_id), series in values.items():
+        std_dev = statistics.stdev(series) if len(series) > 1 else 0.0
+        expected.setdefault(scene, {})[obj_id] = {
+            "mean": round(statistics.fmean(series), 2), "std_dev": round(std_dev, 2), "n": len(series)}
+    return expected
+
+
+def _assert_matches(actual, expected):
+    assert actual.keys() == expected.keys()
+    for scene, objects in expected.items():
+        assert actual[scene].keys() == objects.keys()
+        for obj_id, moments in objects.items():
+            assert actual[scene][obj_id]["n"] == moments["n"]
+            assert actual[scene][obj_id]["mean"] == pytest.approx(moments["mean"], abs=0.011)
+            assert actual[scene][obj_id]["std_dev"] == pytest.approx(moments["std_dev"], abs=0.011)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PoolStatsAccumulator(tmp_path / "pool_stats.db")
+
+
+@pytest.fixture
+def records():
+    rng = random.Random(2026)
+    keys = [(f"scene_{s}", f"obj_{o}") for s in range(3) for o in range(4)]
+    return [_record(f"user_{i}", str(1 + i % 2), {key: rng.randint(0, 100) for key in keys if rng.random() < 0.8})
+            for i in range(40)]
+
+
+def test_adds_match_full_scan(store, records):
+    for record in records:
+        assert store.add_record(record)
+    for pool in ("1", "2"):
+        _assert_matches(store.pool_stats(pool), _full_scan(records, pool))
+
+
+def test_removes_match_full_scan(store, records):
+    for record in records:
+        store.add_record(record)
+    removed, kept = records[::3], [record for record in records if record not in records[::3]]
+    for record in removed:
+        assert store.remove_record(record)
+    for pool in ("1", "2"):
+        _assert_matches(store.pool_stats(pool), _full_scan(kept, pool))
+
+
+def test_interleaved_adds_and_removes_match_rebuild(store, records, tmp_path):
+    rng = random.Random(7)
+    present = []
+    for record in records:
+        store.add_record(record)
+        present.append(record)
+        if rng.random() < 0.4:
+            victim = present.pop(rng.randrange(len(present)))
+            store.remove_record(victim)
+
+    rebuilt = PoolStatsAccumulator(tmp_path / "rebuilt.db")
+    assert rebuilt.rebuild(present) == len(present)
+    for pool in ("1", "2"):
+        _assert_matches(store.pool_stats(pool), rebuilt.pool_stats(pool))
+        _assert_matches(store.pool_stats(pool), _full_scan(present, pool))
+
+
+def test_each_participant_is_counted_once(store, records):
+    record = records[0]
+    assert store.add_record(record) is True
+    assert store.add_record(record) is False
+    assert store.remove_record(record) is True
+    assert store.remove_record(record) is False
+    assert store.pool_stats(record["assigned_pool"]) == {}
+
+
+def test_format_moments_uses_sample_std_dev():
+    series = [10, 20, 60]
+    mean = statistics.fmean(series)
+    m2 = sum((value - mean) ** 2 for value in series)
+    assert format_moments(3, mean, m2) == {"mean": 30.0, "std_dev": round(statistics.stdev(series), 2), "n": 3}
+    assert format_moments(1, 42.0, 0.0) == {"mean": 42.0, "std_dev": 0.0, "n": 1}
@@ -0,0 +1,53 @@
+"""gzip / lzma record files round-trip through json_codec and recompress_records."""
+import gzip
+import lzma
+
+import pytest
+
+from core import json_codec
+
+
+DATA = {"user_id": "u", "demographics": {"name": "参与者"}, "experiments": [{"scene": "s", "results": [1, 2, 3]}]}
+
+
+@pytest.mark.parametrize("suffix, decompress", [(".json.gz", gzip.decompress), (".json.xz", lzma.decompress)])
+def test_compressed_file_round_trip(tmp_path, suffix, decompress):
+    path = tmp_path / f"record{suffix}"
+    path.write_bytes(json_codec.encode_file(path, DATA))
+
+    assert json_codec.loads(decompress(path.read_bytes())) == DATA
+    assert json_codec.read_raw(path) == json_codec.dumps(DATA)
+    assert json_codec.load_file(path) == DATA
+
+
+def test_plain_json_is_not_compressed(tmp_path):
+    path = tmp_path / "record.json"
+    path.write_bytes(json_codec.encode_file(path, DATA))
+    assert path.read_bytes() == json_codec.dumps(DATA)
+
+
+def test_gzip_output_is_deterministic(tmp_path):
+    path = tmp_path / "record.json.gz"
+    assert json_codec.encode_file(path, DATA) == json_codec.encode_file(path, DATA)
+
+
+@pytest.mark.parametrize("compression", ["gzip", "lzma"])
+def test_recompress_records_round_trip(om, participant, compression):
+    scene, _, _ = om.get_next_scene(participant)
+    om.save_participant_results(participant, scene, [{"object_id": "obj_1", "slider_value": 70}], 500)
+    om.compact_participant_record(participant)
+    before = om.load_participant_record(participant)
+
+    om.recompress_records(compression)
+    path = om._record_path(participant)
+    assert path.name.endswith(om.RECORD_SUFFIXES[compression])
+    assert om.load_participant_record(participant) == before
+
+    # Saves keep working on the compressed record, and converting back is lossless
+    next_scene, _, _ = om.get_next_scene(participant)
+    om.save_participant_results(participant, next_scene, [{"object_id": "obj_1", "slider_value": 10}], 500)
+    om.compact_participant_record(participant)
+    om.recompress_records("none")
+    record = om.load_participant_record(participant)
+    assert om._record_path(participant).name == f"{participant}.json"
+    assert [exp["scene"] for exp in record["experiments"]] == [scene, next_scene]